@@ -20,9 +20,22 @@ app.autodiscover_tasks()
 
 # Add periodic tasks
 app.conf.beat_schedule = {
-    "detect-suspicious-activity-hourly": {
-        "task": "ip_tracking.tasks.detect_suspicious_activity",
-        "schedule": 3600.0,  # Every hour
+    # Also folds new RequestLog rows into RequestRollup before detecting
+    "detect-suspicious-activity": {
+        "task": "detect_suspicious_activity",
+        "schedule": 60.0,  # Every minute
+    },
+    "expire-blocks": {
+        "task": "expire_blocks",
+        "schedule": 60.0,  # Every minute
+    },
+    "enrich-request-log-geolocation": {
+        "task": "enrich_request_log_geolocation",
+        "schedule": 60.0,  # Every minute
+    },
+    "purge-request-logs": {
+        "task": "purge_request_logs",
+        "schedule": 60.0 * 60,  # Every hour
     },
 }
 
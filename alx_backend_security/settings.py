@@ -67,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "ip_tracking.middleware.IPLoggingMiddleware",  # IP tracking Middleware
+    "ip_tracking.middleware.RateLimitMiddleware",
 ]
 
 ROOT_URLCONF = "alx_backend_security.urls"
@@ -142,9 +143,20 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Rate limiting settings
-RATELIMIT_VIEW = "ip_tracking.views.rate_limit_error"
+# Enforced by ip_tracking.middleware.RateLimitMiddleware; atomic across
+# workers when RATELIMIT_USE_CACHE is a django-redis cache
 RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = "default"
+# Reverse proxies in front of the app that append to X-Forwarded-For.
+# Anonymous clients are limited per REMOTE_ADDR while this is 0.
+RATELIMIT_TRUSTED_PROXIES = 0
+
+# Longest matching PREFIX wins. RATE is fixed ("5/m", "100/10s"); without
+# it the group's handler below picks the rate per identity tier.
+RATELIMIT_RULES = [
+    {"PREFIX": "/ip-tracking/login/", "GROUP": "login", "METHODS": ["POST"]},
+    {"PREFIX": "/ip-tracking/test-geo/", "GROUP": "geo_test"},
+]
 
 # Rate limit groups
 RATELIMIT_GROUP_HANDLERS = {
@@ -153,12 +165,41 @@ RATELIMIT_GROUP_HANDLERS = {
 }
 
 # Cache Configuration
-
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+# The caches are shared by every worker process: Redis when REDIS_CACHE_URL
+# is set, otherwise file-based stand-ins (single host, e.g. tests).
+# "ip_tracking_state" holds the few keys that must not be evicted: metrics
+# counters, blocklist version stamps and staff IPs.
+REDIS_CACHE_URL = env("REDIS_CACHE_URL", default=None)
+if REDIS_CACHE_URL:
+    CACHES = {
+        alias: {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+        for alias in ("default", "ip_tracking_state")
     }
-}
+else:
+    CACHE_DIR = Path(env("CACHE_DIR", default=str(BASE_DIR / ".cache")))
+    CACHES = {
+        # Culls a third of its files at random past MAX_ENTRIES
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(CACHE_DIR / "default"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+        # A few hundred keys; the limit is raised from 300 so it is never culled
+        "ip_tracking_state": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(CACHE_DIR / "state"),
+            "OPTIONS": {"MAX_ENTRIES": 1000000},
+        },
+    }
+
+# Two-tier caches used by ip_tracking (see ip_tracking/cache.py)
+IP_TRACKING_CACHE = "default"
+IP_TRACKING_STATE_CACHE = "ip_tracking_state"
+IP_TRACKING_L1_CACHE_SIZE = 10000  # entries per worker
 
 # Sensitive paths for anomaly detection
 SUSPICIOUS_REQUEST_THRESHOLD = 100  # requests per hour
@@ -169,6 +210,113 @@ SENSITIVE_PATHS = [
     # Add other sensitive paths
 ]
 
+# Per-minute RequestRollup maintained by the compact_request_rollups task
+REQUEST_ROLLUP_BATCH_SIZE = 50000  # RequestLog rows folded per transaction
+REQUEST_ROLLUP_SETTLE_SECONDS = 10  # skip rows younger than this
+REQUEST_ROLLUP_RETENTION_DAYS = 7
+
+# Seconds analytics API responses are cached for
+ANALYTICS_CACHE_TTL = 15
+
+# Results `manage.py benchmark` compares against, recorded with --save
+BENCHMARK_BASELINE_PATH = BASE_DIR / "benchmark_baseline.json"
+
+# Archival of old request logs (see the purge_request_logs command)
+REQUEST_LOG_RETENTION_DAYS = 30
+REQUEST_LOG_ARCHIVE_DIR = BASE_DIR / "archive"
+REQUEST_LOG_PURGE_BATCH_SIZE = 5000  # rows archived and deleted per chunk
+REQUEST_LOG_PURGE_MAX_ROWS_PER_SECOND = None  # None disables throttling
+
+# Local IP geolocation database built with `manage.py compile_geoip`.
+# When unset, lookups fall back to the ip-api.com HTTP API.
+GEOIP_DATABASE_PATH = env("GEOIP_DATABASE_PATH", default=None)
+
+# Geolocation backend, see ip_tracking/geolocation.py
+if GEOIP_DATABASE_PATH:
+    GEOLOCATION_PROVIDER = {
+        "BACKEND": "ip_tracking.geolocation.LocalDatabaseProvider",
+        "OPTIONS": {"path": GEOIP_DATABASE_PATH},
+    }
+else:
+    GEOLOCATION_PROVIDER = {
+        "BACKEND": "ip_tracking.geolocation.IPAPIProvider",
+        "OPTIONS": {
+            "base_url": env("GEOLOCATION_API_URL", default="http://ip-api.com"),
+            "connect_timeout": 1.0,  # seconds
+            "read_timeout": 2.0,  # seconds
+            "pool_size": 10,
+            "batch_size": 100,  # ip-api.com's /batch limit
+        },
+    }
+
+# Two-tier geolocation cache (per-process LRU in front of CACHES["default"])
+GEOLOCATION_CACHE_TTL = 60 * 60 * 24  # seconds
+GEOLOCATION_NEGATIVE_CACHE_TTL = 300  # seconds to remember failed lookups
+GEOLOCATION_LOCAL_CACHE_SIZE = 10000  # entries per worker
+
+# Write RequestLog rows without geolocation and let the
+# enrich_request_log_geolocation task fill them in
+GEOLOCATION_DEFERRED = False
+GEOLOCATION_ENRICHMENT_BATCH_SIZE = 1000  # distinct IPs per task run
+
+# In-request sliding-window detection, see ip_tracking/streaming.py
+STREAMING_DETECTION_ENABLED = False
+STREAMING_DETECTION_BUCKET_SECONDS = 60  # window resolution
+STREAMING_DETECTION_MAX_TRACKED_IPS = 100000  # per worker, LRU evicted
+STREAMING_DETECTION_FLUSH_INTERVAL = 1.0  # seconds between SuspiciousIP writes
+
+# Promote suspicious IPs to temporary blocks after each detection run.
+# Each repeat offence moves one step along the durations (in seconds).
+BLOCK_ESCALATION_ENABLED = False
+BLOCK_ESCALATION_DURATIONS = [
+    15 * 60,  # 15 minutes
+    60 * 60,  # 1 hour
+    24 * 60 * 60,  # 1 day
+    7 * 24 * 60 * 60,  # 1 week
+]
+# Only these SuspiciousIP reasons are escalated; a visit to a sensitive
+# path on its own is not enough
+BLOCK_ESCALATION_REASONS = ["high_volume", "multiple"]
+# Never blocked automatically, and neither are IPs staff users were seen on
+# in the last BLOCK_ESCALATION_STAFF_IP_TTL seconds
+BLOCK_ESCALATION_EXEMPT_NETWORKS = [
+    "127.0.0.0/8",
+    "10.0.0.0/8",
+    "172.16.0.0/12",
+    "192.168.0.0/16",
+    "::1/128",
+    "fc00::/7",
+]
+BLOCK_ESCALATION_STAFF_IP_TTL = 7 * 24 * 60 * 60
+
+# Seconds between checks of the shared blocklist version stamp
+BLOCKLIST_VERSION_CHECK_INTERVAL = 1.0
+
+# IPLoggingMiddleware stage timings, see ip_tracking/metrics.py. Workers
+# publish to the shared cache, or to per-process files in
+# METRICS_MULTIPROCESS_DIR when it is set; /metrics serves the totals.
+METRICS_ENABLED = True
+METRICS_PUBLISH_INTERVAL = 10.0  # seconds
+METRICS_MULTIPROCESS_DIR = env("METRICS_MULTIPROCESS_DIR", default=None)
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]  # Prometheus scrapers
+SERVER_TIMING_ENABLED = DEBUG  # add a Server-Timing header to responses
+
+# Write-behind RequestLog persistence
+REQUEST_LOG_WRITE_BEHIND = True
+REQUEST_LOG_BATCH_SIZE = 500  # rows per bulk_create
+REQUEST_LOG_FLUSH_INTERVAL = 2.0  # seconds
+REQUEST_LOG_MAX_QUEUE_SIZE = 10000  # records held in memory per worker
+REQUEST_LOG_OVERFLOW_POLICY = "drop_newest"  # drop_newest, drop_oldest or block
+
+# Which requests get a RequestLog row, see ip_tracking/logging_policy.py
+REQUEST_LOG_POLICY = {
+    "SKIP_PREFIXES": ["/static/", "/favicon.ico", "/metrics"],
+    "SAMPLE_RATES": {},  # e.g. {"/api/poll/": 0.05}
+    "ALWAYS_LOG_PREFIXES": SENSITIVE_PATHS,
+    "ALWAYS_LOG_FLAGGED_IPS": True,  # blocked and suspicious IPs
+    "LOG_BLOCKED": True,  # also log requests rejected with 403
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
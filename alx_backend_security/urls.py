@@ -18,7 +18,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from ip_tracking.views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("ip-tracking/", include("ip_tracking.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
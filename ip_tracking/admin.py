@@ -1,24 +1,37 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 
-from ip_tracking.models import BlockedIP, RequestLog
+from ip_tracking.blocklist import blocklist
+from ip_tracking.fields import in_network, pack_ip
+from ip_tracking.models import BlockedIP, BlockedNetwork, RequestLog
+from ip_tracking.pagination import EstimatedCountPaginator, KeysetChangeList
 
 
 @admin.register(BlockedIP)
 class BlockedIPAdmin(admin.ModelAdmin):
-    list_display = ("ip_address", "created_at", "reason_short", "is_active")
-    list_filter = ("created_at",)
+    list_display = (
+        "ip_address",
+        "created_at",
+        "expires_at",
+        "block_count",
+        "reason_short",
+        "is_active",
+    )
+    list_filter = ("created_at", "expires_at")
     search_fields = ("ip_address", "reason")
-    readonly_fields = ("created_at",)
+    readonly_fields = ("created_at", "block_count")
     date_hierarchy = "created_at"
     list_per_page = 20
     actions = ["unblock_ips"]
     fieldsets = (
-        ("IP Information", {"fields": ("ip_address", "is_active")}),
+        ("IP Information", {"fields": ("ip_address", "is_active", "expires_at")}),
         (
             "Details",
             {
-                "fields": ("created_at", "reason"),
+                "fields": ("created_at", "reason", "block_count"),
                 "classes": ("collapse",),
             },
         ),
@@ -47,19 +60,119 @@ class BlockedIPAdmin(admin.ModelAdmin):
     def unblock_ips(self, request, queryset):
         """Action to unblock selected IPs"""
         updated = queryset.update(is_active=False)
+        blocklist.invalidate()
         self.message_user(request, f"Successfully unblocked {updated} IP address(es).")
 
     unblock_ips.short_description = "Unblock selected IPs"
 
+    def delete_queryset(self, request, queryset):
+        """Bulk deletes bypass BlockedIP.delete, so invalidate here"""
+        super().delete_queryset(request, queryset)
+        blocklist.invalidate()
+
+
+@admin.register(BlockedNetwork)
+class BlockedNetworkAdmin(admin.ModelAdmin):
+    list_display = ("network", "created_at", "reason", "is_active")
+    list_filter = ("is_active", "created_at")
+    search_fields = ("network", "reason")
+    readonly_fields = ("created_at",)
+    list_per_page = 20
+    actions = ["unblock_networks"]
+
+    def unblock_networks(self, request, queryset):
+        """Action to unblock selected networks"""
+        updated = queryset.update(is_active=False)
+        blocklist.invalidate()
+        self.message_user(request, f"Successfully unblocked {updated} network(s).")
+
+    unblock_networks.short_description = "Unblock selected networks"
+
+    def delete_queryset(self, request, queryset):
+        """Bulk deletes bypass BlockedNetwork.delete, so invalidate here"""
+        super().delete_queryset(request, queryset)
+        blocklist.invalidate()
+
+
+class RecentRequestsFilter(admin.SimpleListFilter):
+    """Relative time windows, each a range scan on the timestamp index"""
+
+    title = "timestamp"
+    parameter_name = "within"
+    windows = {
+        "1h": ("Last hour", timedelta(hours=1)),
+        "24h": ("Last 24 hours", timedelta(days=1)),
+        "7d": ("Last 7 days", timedelta(days=7)),
+        "30d": ("Last 30 days", timedelta(days=30)),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _) in self.windows.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.windows:
+            _, window = self.windows[self.value()]
+            return queryset.filter(timestamp__gte=timezone.now() - window)
+        return queryset
+
+
+class MethodFilter(admin.SimpleListFilter):
+    """Fixed choices, so rendering the filter does not SELECT DISTINCT"""
+
+    title = "method"
+    parameter_name = "method"
+
+    def lookups(self, request, model_admin):
+        methods = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+        return [(method, method) for method in methods]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(method=self.value())
+        return queryset
+
 
 @admin.register(RequestLog)
 class RequestLogAdmin(admin.ModelAdmin):
+    """
+    Changelist built for very large tables: counts stop at ``count_cap``,
+    pages follow a (timestamp, id) cursor instead of an OFFSET, and search
+    only uses indexed lookups.
+    """
+
     list_display = ("ip_address", "path", "method", "timestamp", "user_agent_short")
-    list_filter = ("method", "timestamp")
-    search_fields = ("ip_address", "path", "user_agent")
+    list_filter = (RecentRequestsFilter, MethodFilter)
+    search_fields = ("path",)
+    search_help_text = "Exact IP address, CIDR network or path prefix"
     readonly_fields = ("ip_address", "path", "method", "timestamp", "user_agent")
-    date_hierarchy = "timestamp"
+    ordering = ("-timestamp", "-id")
+    sortable_by = ()
+    show_full_result_count = False
     list_per_page = 50
+    count_cap = 10000
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_paginator(self, request, queryset, per_page, **kwargs):
+        return EstimatedCountPaginator(
+            queryset, per_page, count_cap=self.count_cap, **kwargs
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match an exact IP, a CIDR network or a path prefix"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        packed = pack_ip(term)
+        if packed is not None:
+            return queryset.filter(ip_packed=packed), False
+        if "/" in term and not term.startswith("/"):
+            try:
+                return queryset.filter(in_network(term)), False
+            except ValueError:
+                pass
+        return queryset.filter(path__startswith=term), False
 
     def user_agent_short(self, obj):
         """Display a shortened version of the user agent"""
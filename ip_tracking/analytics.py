@@ -0,0 +1,91 @@
+# ip_tracking/analytics.py
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+from django.utils import timezone
+
+from ip_tracking.cache import get_cache
+from ip_tracking.models import RequestRollup, TrafficRollup
+
+WINDOWS = {
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "24h": timedelta(days=1),
+    "7d": timedelta(days=7),
+}
+# Default time-series step for each window, in minutes
+SERIES_STEPS = {"15m": 1, "1h": 1, "6h": 5, "24h": 15, "7d": 60}
+MAX_LIMIT = 100
+
+
+def window_bounds(window):
+    """
+    ``(start, end)`` of the named window, aligned to whole minutes so all
+    requests within a minute share a cache entry.
+    """
+    end = timezone.now().replace(second=0, microsecond=0)
+    return end - WINDOWS[window], end
+
+
+def top_ips(start, end, limit):
+    rows = (
+        RequestRollup.objects.filter(bucket__gte=start, bucket__lt=end)
+        .values("ip_address")
+        .annotate(requests=Sum("request_count"))
+        .order_by("-requests")[:limit]
+    )
+    return [
+        {"ip_address": row["ip_address"], "requests": row["requests"]} for row in rows
+    ]
+
+
+def top_values(dimension, start, end, limit):
+    rows = (
+        TrafficRollup.objects.filter(
+            dimension=dimension, bucket__gte=start, bucket__lt=end
+        )
+        .values("value")
+        .annotate(requests=Sum("request_count"))
+        .order_by("-requests")[:limit]
+    )
+    return [{"value": row["value"], "requests": row["requests"]} for row in rows]
+
+
+def request_rate(start, end, step_minutes):
+    """Requests per ``step_minutes`` bucket, with empty buckets as zero"""
+    step = timedelta(minutes=step_minutes)
+    counts = {}
+    for bucket, count in TrafficRollup.objects.filter(
+        dimension=TrafficRollup.Dimension.TOTAL, bucket__gte=start, bucket__lt=end
+    ).values_list("bucket", "request_count"):
+        slot = start + (bucket - start) // step * step
+        counts[slot] = counts.get(slot, 0) + count
+
+    series = []
+    slot = start
+    while slot < end:
+        series.append({"time": slot, "requests": counts.get(slot, 0)})
+        slot += step
+    return series
+
+
+def cached_payload(key, build):
+    """
+    Return ``(body, etag)`` for ``key``, building the JSON body with
+    ``build()`` at most once per ``ANALYTICS_CACHE_TTL`` seconds.
+    """
+    ttl = getattr(settings, "ANALYTICS_CACHE_TTL", 15)
+    cache_key = f"ip_tracking_analytics:{key}"
+    cached = get_cache().get(cache_key)
+    if cached is not None:
+        return cached
+
+    body = json.dumps(build(), cls=DjangoJSONEncoder).encode("utf-8")
+    etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+    get_cache().set(cache_key, (body, etag), ttl)
+    return body, etag
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class IpTrackingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ip_tracking'
+
+    def ready(self):
+        from ip_tracking.ratelimit import check_rate_limiter
+
+        checks.register(check_rate_limiter, checks.Tags.security)
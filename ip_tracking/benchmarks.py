@@ -0,0 +1,346 @@
+# ip_tracking/benchmarks.py
+"""
+Benchmarks for the ip_tracking hot paths, run by ``manage.py benchmark``.
+
+Each ``bench_*`` function returns ``{name: metrics}``. Repeated
+operations report ``ops_per_second``, ``p50_ms`` and ``p99_ms``; one-shot
+operations report ``seconds``; database-bound ones also report
+``queries``. ``compare`` checks a run against a saved baseline.
+"""
+import ipaddress
+import platform
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ip_tracking.detection import detect_suspicious_activity
+from ip_tracking.geo_stub import StubGeolocationServer
+from ip_tracking.geocache import get_geolocation_cache
+from ip_tracking.geolocation import reset_geolocation_provider
+from ip_tracking.log_writer import get_log_writer
+from ip_tracking.middleware import IPLoggingMiddleware
+from ip_tracking.models import (
+    BlockedIP,
+    ProcessingCursor,
+    RequestLog,
+    RequestRollup,
+    SuspiciousIP,
+    TrafficRollup,
+)
+from ip_tracking.rollups import ROLLUP_CURSOR, compact_request_logs
+
+LOWER_IS_BETTER = ("p50_ms", "p99_ms", "seconds", "queries")
+HIGHER_IS_BETTER = ("ops_per_second",)
+# Slowdowns smaller than this are treated as noise whatever the tolerance
+NOISE_FLOORS = {"p50_ms": 0.01, "p99_ms": 0.1, "seconds": 0.05}
+
+# Synthetic addresses count up from 11.0.0.0, clear of the private prefixes
+SYNTHETIC_IP_BASE = int(ipaddress.IPv4Address("11.0.0.0"))
+SYNTHETIC_PATHS = ["/", "/api/items/", "/api/orders/", "/search/", "/static/app.js"]
+SYNTHETIC_METHODS = ["GET", "GET", "GET", "POST", "PUT"]
+POPULATE_BATCH_SIZE = 10000
+
+
+@contextmanager
+def throwaway_database(suffix="benchmark", keepdb=False):
+    """
+    Point the default connection at a test database for the duration of
+    the block, so synthetic rows never reach the configured one. SQLite
+    gets a file named after the configured database and ``suffix`` rather
+    than the in-memory default, which would neither hold the larger tables
+    nor be visible to forked processes.
+    """
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    if connection.vendor == "sqlite" and not old_test_name:
+        test_settings["NAME"] = f"{Path(old_name).with_suffix('')}_{suffix}.sqlite3"
+    try:
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+    finally:
+        test_settings["NAME"] = old_test_name
+
+
+def synthetic_ip(n):
+    return str(ipaddress.IPv4Address(SYNTHETIC_IP_BASE + n))
+
+
+def time_calls(func, iterations, warmup=None):
+    """
+    Call ``func(i)`` ``iterations`` times after ``warmup`` untimed calls
+    (a tenth of ``iterations`` by default) and summarise the latencies.
+    """
+    warmup = iterations // 10 if warmup is None else warmup
+    for i in range(warmup):
+        func(i)
+    durations = []
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return {
+        "ops_per_second": round(len(durations) / sum(durations), 1),
+        "p50_ms": round(_percentile(durations, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(durations, 0.99) * 1000, 4),
+    }
+
+
+def time_once(func):
+    """Run ``func()`` once, recording wall time and the queries it made"""
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+    return {"seconds": round(elapsed, 3), "queries": len(queries)}
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[round(fraction * (len(sorted_values) - 1))]
+
+
+def stub_provider_settings(server):
+    return {
+        "BACKEND": "ip_tracking.geolocation.IPAPIProvider",
+        "OPTIONS": {"base_url": server.url},
+    }
+
+
+def bench_middleware(iterations, geo_latency=0.0):
+    """
+    ``IPLoggingMiddleware`` around a view that does nothing, so the
+    latencies are the middleware's own overhead. Geolocation misses are
+    answered by a local stub of the ip-api.com API.
+    """
+    factory = RequestFactory()
+    blocked_ip = synthetic_ip(0)
+    BlockedIP.objects.create(ip_address=blocked_ip, reason="benchmark")
+
+    def run(ip_for):
+        middleware = IPLoggingMiddleware(lambda request: HttpResponse("ok"))
+
+        def call(i):
+            middleware(factory.get("/api/items/", REMOTE_ADDR=ip_for(i)))
+
+        return time_calls(call, iterations)
+
+    results = {}
+    with StubGeolocationServer(latency=geo_latency) as server:
+        with override_settings(GEOLOCATION_PROVIDER=stub_provider_settings(server)):
+            reset_geolocation_provider()
+            results["middleware.blocked"] = run(lambda i: blocked_ip)
+            with override_settings(GEOLOCATION_DEFERRED=True):
+                results["middleware.unblocked"] = run(lambda i: synthetic_ip(1))
+            results["middleware.geo_hit"] = run(lambda i: synthetic_ip(2))
+            # Fresh addresses, so every request misses both cache tiers
+            results["middleware.geo_miss"] = run(lambda i: synthetic_ip(1000 + i))
+        reset_geolocation_provider()
+
+    get_log_writer().flush()
+    BlockedIP.objects.filter(ip_address=blocked_ip).delete()
+    RequestLog.objects.all().delete()
+    return results
+
+
+def bench_geolocation(iterations, geo_latency=0.0):
+    """``RequestLog.get_geolocation_data`` from each cache tier and on a miss"""
+    geo_cache = get_geolocation_cache()
+    results = {}
+    with StubGeolocationServer(latency=geo_latency) as server:
+        with override_settings(GEOLOCATION_PROVIDER=stub_provider_settings(server)):
+            reset_geolocation_provider()
+            ip_address = synthetic_ip(3)
+            results["geolocation.local_hit"] = time_calls(
+                lambda i: RequestLog.get_geolocation_data(ip_address), iterations
+            )
+
+            def shared_hit(i):
+                geo_cache.clear_local()
+                RequestLog.get_geolocation_data(ip_address)
+
+            results["geolocation.shared_hit"] = time_calls(shared_hit, iterations)
+            results["geolocation.miss"] = time_calls(
+                lambda i: RequestLog.get_geolocation_data(synthetic_ip(200000 + i)),
+                iterations,
+            )
+        reset_geolocation_provider()
+    return results
+
+
+def reset_request_logs(rows, seed=0):
+    """
+    Leave exactly ``rows`` synthetic RequestLog rows spread over the last
+    hour, and no rollups or SuspiciousIP rows derived from them. The
+    table is only rebuilt when its size differs or rows have aged out of
+    the detection window. The rollup cursor is left just behind the first
+    row, so compaction batches line up the same way on every run.
+    """
+    RequestRollup.objects.all().delete()
+    TrafficRollup.objects.all().delete()
+    ProcessingCursor.objects.all().delete()
+    SuspiciousIP.objects.all().delete()
+    stale = RequestLog.objects.filter(
+        timestamp__lt=timezone.now() - timedelta(minutes=58)
+    )
+    if RequestLog.objects.count() != rows or stale.exists():
+        RequestLog.objects.all().delete()
+        add_request_logs(rows, seed=seed)
+    first = RequestLog.objects.order_by("id").values_list("id", flat=True).first()
+    ProcessingCursor.set_position(ROLLUP_CURSOR, (first or 1) - 1)
+
+
+def add_request_logs(rows, seed=0, newest=None, span=timedelta(minutes=55)):
+    """
+    Insert ``rows`` synthetic RequestLog rows timestamped within ``span``
+    before ``newest``, rounded down to the minute. About one IP per 100
+    rows, with a heavy tail so some IPs cross the request threshold, and
+    1% sensitive paths.
+    """
+    rng = random.Random(seed)
+    # Minute-aligned, so rows fall into the same rollup buckets every run
+    newest = (newest or timezone.now() - timedelta(minutes=1)).replace(
+        second=0, microsecond=0
+    )
+    ip_count = max(rows // 100, 1)
+    paths = SYNTHETIC_PATHS + list(getattr(settings, "SENSITIVE_PATHS", []))[:1]
+    weights = [99 / len(SYNTHETIC_PATHS)] * len(SYNTHETIC_PATHS) + [1]
+    span_seconds = span.total_seconds()
+
+    for start in range(0, rows, POPULATE_BATCH_SIZE):
+        batch = [
+            RequestLog(
+                ip_address=synthetic_ip(int(ip_count * rng.random() ** 3)),
+                path=rng.choices(paths, weights)[0],
+                method=rng.choice(SYNTHETIC_METHODS),
+                timestamp=newest - timedelta(seconds=rng.random() * span_seconds),
+                user_agent="benchmark",
+            )
+            for _ in range(min(POPULATE_BATCH_SIZE, rows - start))
+        ]
+        with transaction.atomic():
+            RequestLog.objects.bulk_create(batch)
+
+
+def bench_detection(rows):
+    """
+    On a table of ``rows`` fresh RequestLog rows: folding them into the
+    rollups, a full detection pass, then an incremental pass after 1000
+    new rows arrive.
+    """
+    reset_request_logs(rows)
+    settle = getattr(settings, "REQUEST_ROLLUP_SETTLE_SECONDS", 10)
+    results = {
+        f"detection.compaction[{rows}]": time_once(compact_request_logs),
+        f"detection.full[{rows}]": time_once(
+            lambda: detect_suspicious_activity(incremental=False)
+        ),
+    }
+    add_request_logs(
+        1000,
+        seed=1,
+        newest=timezone.now() - timedelta(seconds=settle + 1),
+        span=timedelta(seconds=30),
+    )
+    results[f"detection.incremental[{rows}]"] = time_once(
+        lambda: detect_suspicious_activity(incremental=True)
+    )
+    return results
+
+
+def bench_admin(rows, iterations):
+    """
+    Rendering the RequestLog changelist over ``rows`` rows: the newest
+    page, a page half way down, IP and path searches and a filtered view.
+    """
+    reset_request_logs(rows)
+    user = get_user_model().objects.filter(username="benchmark").first()
+    if user is None:
+        user = get_user_model().objects.create_superuser("benchmark", "", None)
+    model_admin = site._registry[RequestLog]
+    factory = RequestFactory()
+
+    middle = (
+        RequestLog.objects.order_by("-timestamp", "-id")
+        .values_list("timestamp", "id", "ip_address")[rows // 2 : rows // 2 + 1]
+        .get()
+    )
+    cases = {
+        "admin.newest_page": {},
+        "admin.deep_page": {"cursor": f"{middle[0].isoformat()}_{middle[1]}"},
+        "admin.search_ip": {"q": middle[2]},
+        "admin.search_path": {"q": "/api/"},
+        "admin.filter": {"method": "POST", "within": "1h"},
+    }
+
+    def render(params):
+        request = factory.get("/admin/ip_tracking/requestlog/", params)
+        request.user = user
+        model_admin.changelist_view(request).render()
+
+    results = {}
+    for name, params in cases.items():
+        results[name] = time_calls(lambda i: render(params), iterations)
+        with CaptureQueriesContext(connection) as queries:
+            render(params)
+        results[name]["queries"] = len(queries)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(baseline, results, tolerance):
+    """
+    Regressions of ``results`` against ``baseline["results"]`` as
+    messages. Timings may be ``tolerance`` (a fraction) worse than the
+    baseline, or less than their ``NOISE_FLOORS`` entry worse; query
+    counts may not grow at all. Benchmarks missing from either side are
+    skipped.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            if metric not in base:
+                continue
+            allowed = 0 if metric == "queries" else tolerance
+            if metric in LOWER_IS_BETTER:
+                regressed = value > base[metric] * (1 + allowed) and (
+                    value - base[metric] > NOISE_FLOORS.get(metric, 0)
+                )
+            elif metric in HIGHER_IS_BETTER:
+                regressed = value < base[metric] * (1 - allowed)
+            else:
+                continue
+            if regressed:
+                regressions.append(
+                    f"{name} {metric}: {value} (baseline {base[metric]})"
+                )
+    return regressions
@@ -0,0 +1,156 @@
+# ip_tracking/blocking.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ip_tracking.blocklist import (
+    NetworkMatcher,
+    blocklist,
+    bulk_upsert_and_invalidate,
+    packed_ip,
+    suspicious_ips,
+)
+from ip_tracking.cache import get_state_cache
+from ip_tracking.iputils import network_to_bytes
+from ip_tracking.models import BlockedIP, SuspiciousIP
+
+ESCALATION_CHUNK_SIZE = 1000
+DEFAULT_ESCALATION_DURATIONS = [15 * 60, 60 * 60, 24 * 60 * 60, 7 * 24 * 60 * 60]
+DEFAULT_ESCALATION_REASONS = [
+    SuspiciousIP.SuspicionReason.HIGH_REQUEST_VOLUME,
+    SuspiciousIP.SuspicionReason.MULTIPLE_VIOLATIONS,
+]
+DEFAULT_EXEMPT_NETWORKS = [
+    "127.0.0.0/8",
+    "10.0.0.0/8",
+    "172.16.0.0/12",
+    "192.168.0.0/16",
+    "::1/128",
+    "fc00::/7",
+]
+STAFF_IP_KEY_PREFIX = "ip_tracking_staff_ip"
+
+
+def block_duration(previous_blocks):
+    """
+    Length of the next temporary block for an IP blocked
+    ``previous_blocks`` times before, from BLOCK_ESCALATION_DURATIONS
+    (seconds); repeat offenders stay at the last step.
+    """
+    durations = getattr(
+        settings, "BLOCK_ESCALATION_DURATIONS", DEFAULT_ESCALATION_DURATIONS
+    )
+    return timedelta(seconds=durations[min(previous_blocks, len(durations) - 1)])
+
+
+def _staff_ip_key(ip_address):
+    address = packed_ip(ip_address)
+    return f"{STAFF_IP_KEY_PREFIX}:{address.hex()}" if address else None
+
+
+def remember_staff_ip(ip_address):
+    """
+    Record that a staff user was seen on ``ip_address``, which keeps it
+    from being escalated for BLOCK_ESCALATION_STAFF_IP_TTL seconds. Repeat
+    calls within a minute stay in this process.
+    """
+    key = _staff_ip_key(ip_address)
+    if key is None:
+        return
+    cache = get_state_cache()
+    if cache.local.get(key) is None:
+        ttl = getattr(settings, "BLOCK_ESCALATION_STAFF_IP_TTL", 7 * 24 * 60 * 60)
+        cache.set(key, True, ttl, l1_ttl=min(ttl, 60))
+
+
+def escalation_exempt_ips(ip_addresses):
+    """
+    The subset of ``ip_addresses`` that must never be blocked
+    automatically: those in BLOCK_ESCALATION_EXEMPT_NETWORKS (loopback and
+    private ranges by default) and those staff users were seen on.
+    """
+    networks = NetworkMatcher(
+        sorted(
+            network_to_bytes(network)
+            for network in getattr(
+                settings, "BLOCK_ESCALATION_EXEMPT_NETWORKS", DEFAULT_EXEMPT_NETWORKS
+            )
+        )
+    )
+    keys = {ip: _staff_ip_key(ip) for ip in ip_addresses}
+    staff = get_state_cache().get_many([key for key in keys.values() if key])
+    return {ip for ip, key in keys.items() if ip in networks or (key and key in staff)}
+
+
+def escalate_suspicious_ips():
+    """
+    Promote active SuspiciousIPs that are not currently blocked to
+    temporary blocks, each one longer than the IP's previous block.
+
+    Only reasons listed in BLOCK_ESCALATION_REASONS are promoted (high
+    volume, alone or with other violations, by default), and
+    ``escalation_exempt_ips`` are skipped; both stay flagged.
+    Promoted SuspiciousIPs are deactivated; detection re-activates them if
+    the IP misbehaves again, which leads to a longer block next time.
+    Returns the number of IPs blocked.
+    """
+    now = timezone.now()
+    reasons = getattr(settings, "BLOCK_ESCALATION_REASONS", DEFAULT_ESCALATION_REASONS)
+    candidates = list(
+        SuspiciousIP.objects.filter(is_active=True, reason__in=reasons)
+        .exclude(ip_address__in=BlockedIP.active(now).values("ip_address"))
+        .values_list("ip_address", "reason")
+    )
+    exempt = escalation_exempt_ips([ip for ip, _ in candidates])
+    candidates = [(ip, reason) for ip, reason in candidates if ip not in exempt]
+
+    for start in range(0, len(candidates), ESCALATION_CHUNK_SIZE):
+        chunk = candidates[start : start + ESCALATION_CHUNK_SIZE]
+        chunk_ips = [ip for ip, _ in chunk]
+        with transaction.atomic():
+            previous_blocks = dict(
+                BlockedIP.objects.filter(ip_address__in=chunk_ips).values_list(
+                    "ip_address", "block_count"
+                )
+            )
+            blocks = []
+            for ip, reason in chunk:
+                count = previous_blocks.get(ip, 0)
+                blocks.append(
+                    BlockedIP(
+                        ip_address=ip,
+                        reason=f"Automatic block after suspicious activity ({reason})",
+                        is_active=True,
+                        expires_at=now + block_duration(count),
+                        block_count=count + 1,
+                    )
+                )
+            bulk_upsert_and_invalidate(
+                blocklist,
+                BlockedIP,
+                blocks,
+                unique_fields=["ip_address"],
+                update_fields=["reason", "is_active", "expires_at", "block_count"],
+                batch_size=ESCALATION_CHUNK_SIZE,
+            )
+            SuspiciousIP.objects.filter(ip_address__in=chunk_ips).update(
+                is_active=False
+            )
+            suspicious_ips.invalidate()
+    return len(candidates)
+
+
+def expire_blocks():
+    """
+    Deactivate blocks whose expiry has passed. Walks the
+    (is_active, expires_at) index from the oldest expiry, so the cost
+    depends on the number of lapsed blocks, not the table size.
+    """
+    expired = BlockedIP.objects.filter(
+        is_active=True, expires_at__lte=timezone.now()
+    ).update(is_active=False)
+    if expired:
+        blocklist.invalidate()
+    return expired
@@ -0,0 +1,273 @@
+# ip_tracking/blocklist.py
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate, islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from ip_tracking.cache import get_state_cache
+from ip_tracking.fields import pack_ip
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "ip_tracking_blocklist_version"
+SUSPICIOUS_VERSION_CACHE_KEY = "ip_tracking_suspicious_version"
+
+# Clients keep coming back, so their packed form is worth remembering
+packed_ip = lru_cache(maxsize=65536)(pack_ip)
+
+
+class VersionedIPSet:
+    """
+    Per-process, in-memory set of IP addresses loaded from the database.
+
+    Addresses are held in their 16-byte ``pack_ip`` form, so every
+    spelling of an IPv6 address matches, and membership checks are a set
+    lookup. Workers notice changes made by other processes through a
+    version stamp kept in the shared cache, which is re-read at most every
+    ``BLOCKLIST_VERSION_CHECK_INTERVAL`` seconds. Subclasses set
+    ``version_key`` and implement ``_load``.
+
+    Only the first load, and the first after this process invalidated its
+    own copy, run on the request thread. When another process changes the
+    version, a background thread rebuilds the set while lookups keep
+    using the previous one, so requests never wait on a full reload.
+    """
+
+    version_key = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ips = frozenset()
+        self._version = None
+        self._loaded = False
+        self._checked_at = 0.0
+        # Bumped whenever the local copy is dropped, so a background
+        # reload that started before that does not install stale rows
+        self._generation = 0
+        self._reload_thread = None
+
+    def contains(self, ip_address):
+        self._refresh_if_stale()
+        return self._match(ip_address)
+
+    async def acontains(self, ip_address):
+        """Async variant; only leaves the event loop when a reload is due"""
+        if self._is_stale():
+            await sync_to_async(self._refresh_if_stale)()
+        return self._match(ip_address)
+
+    def invalidate(self):
+        """
+        Publish a new version stamp and drop this process's copy once the
+        current transaction commits, so no worker can reload the old rows
+        under the new version. Outside a transaction this happens at once.
+        """
+        transaction.on_commit(self._publish_version)
+
+    def clear_local(self):
+        """Drop this process's copy; the next check reloads it"""
+        with self._lock:
+            self._loaded = False
+            self._generation += 1
+
+    def _publish_version(self):
+        get_state_cache().set(self.version_key, uuid.uuid4().hex, None)
+        self.clear_local()
+
+    def _is_stale(self):
+        interval = getattr(settings, "BLOCKLIST_VERSION_CHECK_INTERVAL", 1.0)
+        return not self._loaded or time.monotonic() - self._checked_at >= interval
+
+    def _refresh_if_stale(self):
+        if not self._is_stale():
+            return
+
+        with self._lock:
+            if not self._is_stale():
+                return
+            version = get_state_cache().get(self.version_key)
+            if not self._loaded:
+                self._ips = self._load()
+                self._version = version
+                self._loaded = True
+            elif version != self._version and not self._reloading():
+                self._start_reload(version, self._generation)
+            self._checked_at = time.monotonic()
+
+    def _reloading(self):
+        return self._reload_thread is not None and self._reload_thread.is_alive()
+
+    def _start_reload(self, version, generation):
+        self._reload_thread = threading.Thread(
+            target=self._reload_in_background,
+            args=(version, generation),
+            name=f"{type(self).__name__.lower()}-reload",
+            daemon=True,
+        )
+        self._reload_thread.start()
+
+    def _reload_in_background(self, version, generation):
+        try:
+            self._reload(version, generation)
+        finally:
+            connections.close_all()
+
+    def _reload(self, version, generation):
+        """Install a fresh copy unless the local one was dropped meanwhile"""
+        try:
+            ips = self._load()
+        except Exception as e:
+            # Keep the previous copy; the next check tries again
+            logger.error(f"Failed to reload {type(self).__name__}: {e}")
+            return
+        with self._lock:
+            if self._generation == generation:
+                self._ips = ips
+                self._version = version
+
+    def _match(self, ip_address):
+        return packed_ip(ip_address) in self._ips
+
+    def _load(self):
+        raise NotImplementedError
+
+
+def bulk_upsert_and_invalidate(
+    ip_set, model, rows, unique_fields, update_fields, batch_size=1000
+):
+    """
+    Insert or update ``rows``, any iterable of ``model`` instances, with
+    ``INSERT ... ON CONFLICT DO UPDATE`` ``batch_size`` at a time, and
+    return how many were written. ``bulk_create`` bypasses ``model.save``,
+    which is what normally invalidates ``ip_set``, so it is invalidated
+    here: once, and even if a later batch fails.
+    """
+    written = 0
+    rows = iter(rows)
+    try:
+        while batch := list(islice(rows, batch_size)):
+            model.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+            )
+            written += len(batch)
+    finally:
+        if written:
+            ip_set.invalidate()
+    return written
+
+
+def packed_ips(queryset, *fields):
+    """
+    Rows of ``queryset`` as ``(packed_ip, *fields)`` tuples, reading the
+    ``ip_packed`` column and only parsing ``ip_address`` where it is
+    empty. Rows whose address does not parse are skipped.
+    """
+    for packed, ip_address, *values in queryset.values_list(
+        "ip_packed", "ip_address", *fields
+    ):
+        # Some backends return memoryview objects, which are not hashable
+        address = bytes(packed) if packed is not None else pack_ip(ip_address)
+        if address is not None:
+            yield (address, *values)
+
+
+class NetworkMatcher:
+    """
+    Address ranges compiled for O(log n) membership tests.
+
+    Takes ``(start, end)`` pairs of 16-byte addresses sorted by start.
+    Alongside the starts it keeps the running maximum of the ends, which
+    describes the same coverage as the merged intervals: an address is
+    covered iff the furthest end among the ranges starting at or before
+    it reaches it. Both lists are built at C speed, so compiling a
+    million ranges is dominated by reading them from the database.
+    """
+
+    def __init__(self, ranges):
+        ranges = list(ranges)
+        self._starts = [start for start, _ in ranges]
+        self._reach = list(accumulate((end for _, end in ranges), max))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, ip_address):
+        return self.contains_packed(packed_ip(ip_address))
+
+    def contains_packed(self, address):
+        """Membership test for an address already in ``pack_ip`` form"""
+        if not self._starts or address is None:
+            return False
+        index = bisect_right(self._starts, address) - 1
+        return index >= 0 and self._reach[index] >= address
+
+
+class Blocklist(VersionedIPSet):
+    """
+    In-memory view of the active ``BlockedIP`` and ``BlockedNetwork`` rows.
+
+    Maps each blocked IP, packed, to its expiry as a Unix timestamp (None
+    for permanent blocks), so lapsed blocks stop matching on time without a
+    query even before ``expire_blocks`` deactivates them. Addresses that
+    are not blocked individually are then checked against the networks.
+    """
+
+    version_key = VERSION_CACHE_KEY
+
+    def is_blocked(self, ip_address):
+        """Return True if the IP address is actively blocked"""
+        return self.contains(ip_address)
+
+    async def ais_blocked(self, ip_address):
+        return await self.acontains(ip_address)
+
+    def _match(self, ip_address):
+        ips, networks = self._ips
+        address = packed_ip(ip_address)
+        expires_at = ips.get(address, False)
+        if expires_at is None or (expires_at and expires_at > time.time()):
+            return True
+        return networks.contains_packed(address)
+
+    def _load(self):
+        from ip_tracking.models import BlockedIP, BlockedNetwork
+
+        ips = {
+            address: expires_at.timestamp() if expires_at else None
+            for address, expires_at in packed_ips(BlockedIP.active(), "expires_at")
+        }
+        networks = NetworkMatcher(
+            (bytes(start), bytes(end))
+            for start, end in BlockedNetwork.objects.filter(is_active=True)
+            .order_by("network_start")
+            .values_list("network_start", "network_end")
+        )
+        return ips, networks
+
+
+class SuspiciousIPSet(VersionedIPSet):
+    """In-memory view of the active ``SuspiciousIP`` rows"""
+
+    version_key = SUSPICIOUS_VERSION_CACHE_KEY
+
+    def _load(self):
+        from ip_tracking.models import SuspiciousIP
+
+        return frozenset(
+            address
+            for address, in packed_ips(SuspiciousIP.objects.filter(is_active=True))
+        )
+
+
+blocklist = Blocklist()
+suspicious_ips = SuspiciousIPSet()
@@ -0,0 +1,207 @@
+# ip_tracking/cache.py
+"""
+Two-tier cache used across ip_tracking.
+
+L1 is a small per-process LRU; L2 is a shared Django cache (Redis in
+production, a file-based cache as a stand-in). ``get_cache()`` serves
+data that may be evicted, over ``IP_TRACKING_CACHE``; ``get_state_cache()``
+serves counters, version stamps and staff IPs, which must not be, over
+``IP_TRACKING_STATE_CACHE``. How long L1 may hold a value depends on the
+kind of data:
+
+* Geolocation results rarely change, so L1 keeps them for the caller's
+  TTL (empty results only for the negative TTL).
+* Counters are never cached in L1; every increment goes to L2. Only
+  Redis makes them exact across workers: increments there are atomic and
+  pipelined, while other backends fall back to add() then incr(), a read
+  and a write that can lose concurrent increments from other processes.
+* Version stamps (the blocklist's) are held in L1 for at most
+  ``BLOCKLIST_VERSION_CHECK_INTERVAL`` seconds, so other processes
+  observe a change within that interval. The writer updates L2 and drops
+  its own L1 entry, so it sees the change at once.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU whose entries expire individually"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredCache:
+    """
+    L1 ``LocalLRU`` in front of a shared Django cache. Reads fill L1 for
+    ``l1_ttl`` seconds when one is given; without it values only live in
+    L2. See the module docstring for the rules per kind of data.
+    """
+
+    def __init__(self, alias="default", max_entries=10000):
+        self.alias = alias
+        self.local = LocalLRU(max_entries)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get(self, key, l1_ttl=None):
+        if l1_ttl:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        value = self.shared.get(key)
+        if value is not None and l1_ttl:
+            self.local.set(key, value, l1_ttl)
+        return value
+
+    def get_many(self, keys, l1_ttl=None):
+        """``{key: value}`` for the keys found, in one L2 round-trip"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key) if l1_ttl else None
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing)
+            if l1_ttl:
+                for key, value in shared.items():
+                    self.local.set(key, value, l1_ttl)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, ttl, l1_ttl=None):
+        """Write through to L2; a ``ttl`` of None never expires"""
+        self.shared.set(key, value, ttl)
+        if l1_ttl:
+            self.local.set(key, value, l1_ttl)
+        else:
+            self.local.delete(key)
+
+    def set_many(self, mapping, ttl, l1_ttl=None):
+        self.shared.set_many(mapping, ttl)
+        for key, value in mapping.items():
+            if l1_ttl:
+                self.local.set(key, value, l1_ttl)
+            else:
+                self.local.delete(key)
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    def incr_many(self, amounts, ttl):
+        """
+        Add ``{key: amount}`` to L2 counters, creating missing ones with a
+        ``ttl`` second expiry. Redis runs all of it in one pipeline round
+        trip; other caches fall back to add()+incr() per key, which is not
+        atomic across processes. Returns the new values.
+        """
+        if not amounts:
+            return {}
+        client = self._redis_client()
+        if client is None:
+            totals = {}
+            for key, amount in amounts.items():
+                self.shared.add(key, 0, ttl)
+                totals[key] = self.shared.incr(key, amount)
+            return totals
+
+        shared = self.shared
+        pipe = client.pipeline(transaction=False)
+        for key, amount in amounts.items():
+            redis_key = shared.make_and_validate_key(key)
+            pipe.incrby(redis_key, amount)
+            pipe.expire(redis_key, ttl, nx=True)
+        results = pipe.execute()
+        return dict(zip(amounts, results[::2]))
+
+    def _redis_client(self):
+        backend = settings.CACHES[self.alias]["BACKEND"]
+        if not backend.startswith("django_redis."):
+            return None
+        from django_redis import get_redis_connection
+
+        return get_redis_connection(self.alias)
+
+
+_cache = None
+_state_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide tiered cache over the ``IP_TRACKING_CACHE`` alias"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredCache(
+                    alias=getattr(settings, "IP_TRACKING_CACHE", "default"),
+                    max_entries=getattr(settings, "IP_TRACKING_L1_CACHE_SIZE", 10000),
+                )
+    return _cache
+
+
+def get_state_cache():
+    """
+    Process-wide tiered cache over the ``IP_TRACKING_STATE_CACHE`` alias
+    (``IP_TRACKING_CACHE`` when unset), for keys that must not be evicted
+    """
+    global _state_cache
+    if _state_cache is None:
+        with _cache_lock:
+            if _state_cache is None:
+                _state_cache = TieredCache(
+                    alias=getattr(
+                        settings,
+                        "IP_TRACKING_STATE_CACHE",
+                        getattr(settings, "IP_TRACKING_CACHE", "default"),
+                    ),
+                    max_entries=getattr(settings, "IP_TRACKING_L1_CACHE_SIZE", 10000),
+                )
+    return _state_cache
@@ -0,0 +1,123 @@
+# ip_tracking/detection.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from ip_tracking.blocklist import bulk_upsert_and_invalidate, suspicious_ips
+from ip_tracking.models import (
+    ProcessingCursor,
+    RequestLog,
+    RequestRollup,
+    SuspiciousIP,
+)
+from ip_tracking.rollups import ROLLUP_CURSOR, compact_request_logs
+
+DETECTION_CURSOR = "suspicious_activity_detection"
+UPSERT_CHUNK_SIZE = 1000
+
+
+def detect_suspicious_activity(window=timedelta(hours=1), incremental=True):
+    """
+    Flag IPs whose activity over the trailing ``window`` breaks a rule.
+
+    New RequestLog rows are first folded into the per-minute
+    RequestRollup, which acts as the sliding-window state. In incremental
+    mode only IPs with rows past the detection watermark are evaluated:
+    an IP's windowed totals can only grow through new rows, so everything
+    else has already been judged. That keeps each run's cost proportional
+    to the recently active IPs, so it can run every minute.
+
+    Each rule is one grouped query over RequestRollup, and the flagged
+    IPs are upserted into SuspiciousIP in chunks, so the number of
+    queries does not depend on how many IPs are flagged. An IP that
+    breaks several rules is recorded with ``MULTIPLE_VIOLATIONS``.
+    Returns the number of active suspicious IPs.
+    """
+    request_threshold = getattr(settings, "SUSPICIOUS_REQUEST_THRESHOLD", 100)
+    sensitive_paths = getattr(settings, "SENSITIVE_PATHS", ["/admin/", "/login/"])
+
+    # Bring the per-minute rollup up to date, then read from it
+    compact_request_logs()
+    folded_upto = ProcessingCursor.get_position(ROLLUP_CURSOR)
+    window_start = (timezone.now() - window).replace(second=0, microsecond=0)
+    recent = RequestRollup.objects.filter(bucket__gte=window_start).order_by()
+
+    if incremental:
+        detected_upto = ProcessingCursor.get_position(DETECTION_CURSOR)
+        if detected_upto >= folded_upto:
+            return SuspiciousIP.objects.filter(is_active=True).count()
+        active_ips = (
+            RequestLog.objects.filter(id__gt=detected_upto, id__lte=folded_upto)
+            .order_by()
+            .values("ip_address")
+            .distinct()
+        )
+        recent = recent.filter(ip_address__in=active_ips)
+
+    findings = {}
+
+    # Detect high volume requests
+    high_volume = (
+        recent.values("ip_address")
+        .annotate(request_count=Sum("request_count"))
+        .filter(request_count__gt=request_threshold)
+        .values_list("ip_address", "request_count")
+    )
+    for ip, request_count in high_volume:
+        finding = findings.setdefault(ip, {"reasons": [], "details": {}})
+        finding["reasons"].append(SuspiciousIP.SuspicionReason.HIGH_REQUEST_VOLUME)
+        finding["details"]["request_count"] = request_count
+        finding["details"]["threshold"] = request_threshold
+
+    # Detect access to sensitive paths
+    sensitive_hits = (
+        recent.filter(path_class__in=sensitive_paths)
+        .values_list("ip_address", "path_class")
+        .distinct()
+    )
+    for ip, path in sensitive_hits:
+        finding = findings.setdefault(ip, {"reasons": [], "details": {}})
+        if SuspiciousIP.SuspicionReason.SENSITIVE_PATH not in finding["reasons"]:
+            finding["reasons"].append(SuspiciousIP.SuspicionReason.SENSITIVE_PATH)
+        finding["details"].setdefault("paths_accessed", []).append(path)
+
+    upsert_suspicious_ips(findings)
+    ProcessingCursor.set_position(DETECTION_CURSOR, folded_upto)
+    return SuspiciousIP.objects.filter(is_active=True).count()
+
+
+def upsert_suspicious_ips(findings):
+    """
+    Insert or refresh SuspiciousIP rows for ``{ip: {"reasons", "details"}}``
+    with chunked ``INSERT ... ON CONFLICT DO UPDATE`` statements.
+    """
+    if not findings:
+        return 0
+
+    detected_at = timezone.now().isoformat()
+    rows = []
+    for ip, finding in findings.items():
+        reasons = finding["reasons"]
+        rows.append(
+            SuspiciousIP(
+                ip_address=ip,
+                reason=(
+                    reasons[0]
+                    if len(reasons) == 1
+                    else SuspiciousIP.SuspicionReason.MULTIPLE_VIOLATIONS
+                ),
+                details={**finding["details"], "detected_at": detected_at},
+                is_active=True,
+            )
+        )
+
+    return bulk_upsert_and_invalidate(
+        suspicious_ips,
+        SuspiciousIP,
+        rows,
+        unique_fields=["ip_address"],
+        update_fields=["reason", "details", "is_active", "last_detected"],
+        batch_size=UPSERT_CHUNK_SIZE,
+    )
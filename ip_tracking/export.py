@@ -0,0 +1,144 @@
+# ip_tracking/export.py
+import csv
+import json
+import zlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ip_tracking.models import RequestLog, SuspiciousIP
+
+# dataset name -> (model, time field filtered on, exported fields)
+DATASETS = {
+    "requests": (
+        RequestLog,
+        "timestamp",
+        (
+            "id",
+            "timestamp",
+            "ip_address",
+            "method",
+            "path",
+            "user_agent",
+            "country",
+            "city",
+            "latitude",
+            "longitude",
+            "sample_weight",
+        ),
+    ),
+    "suspicious": (
+        SuspiciousIP,
+        "last_detected",
+        (
+            "id",
+            "ip_address",
+            "reason",
+            "first_detected",
+            "last_detected",
+            "is_active",
+            "details",
+        ),
+    ),
+}
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Bytes gathered before handing a piece to the writer or response
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def parse_export_time(value):
+    """Parse an ISO date or datetime; naive values use the current timezone"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(f"Invalid date or datetime: {value}")
+        parsed = datetime.combine(date, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_rows(dataset, since=None, until=None, chunk_size=None):
+    """
+    Return ``(fields, rows)`` for ``dataset`` in id order, where ``rows``
+    lazily yields value tuples through a chunked (server-side where the
+    database supports it) cursor.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    model, time_field, fields = DATASETS[dataset]
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+    queryset = model.objects.order_by("id")
+    if since is not None:
+        queryset = queryset.filter(**{f"{time_field}__gte": since})
+    if until is not None:
+        queryset = queryset.filter(**{f"{time_field}__lt": until})
+    return fields, queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """File-like object whose ``write`` hands back the line csv produced"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(
+            [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in row
+            ]
+        )
+
+
+def stream_export(
+    dataset, format="ndjson", compress=False, since=None, until=None, chunk_size=None
+):
+    """
+    Yield the export as byte chunks of roughly ``WRITE_BUFFER_SIZE``,
+    gzip-compressed on the fly when ``compress`` is set. Memory use does
+    not depend on the number of rows exported.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    fields, rows = export_rows(dataset, since, until, chunk_size)
+    lines = iter_csv(fields, rows) if format == "csv" else iter_ndjson(fields, rows)
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= WRITE_BUFFER_SIZE:
+            data = b"".join(buffer)
+            buffer = []
+            size = 0
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+    data = b"".join(buffer)
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
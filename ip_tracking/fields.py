@@ -0,0 +1,71 @@
+# ip_tracking/fields.py
+from django.db import models
+
+from ip_tracking.iputils import ip_to_bytes, network_to_bytes
+
+
+class PackedIPField(models.BinaryField):
+    """
+    Fixed 16-byte form of another IP field on the same model (see
+    ``iputils.ip_to_bytes``), filled in on every insert or save, including
+    ``bulk_create``. IPv4 addresses are mapped into ``::ffff:0:0/96`` so
+    both families share one ordering and a subnet is a contiguous range.
+    """
+
+    def __init__(self, *args, source_field="ip_address", **kwargs):
+        self.source_field = source_field
+        kwargs.setdefault("max_length", 16)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source_field != "ip_address":
+            kwargs["source_field"] = self.source_field
+        if kwargs.get("max_length") == 16:
+            del kwargs["max_length"]
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = pack_ip(getattr(model_instance, self.source_field))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def pack_ip(ip_address):
+    """16-byte form of ``ip_address``, or None if it is empty or malformed"""
+    if not ip_address:
+        return None
+    try:
+        return ip_to_bytes(ip_address)
+    except ValueError:
+        return None
+
+
+def in_network(network, field_name="ip_packed"):
+    """
+    Q object matching rows whose packed IP lies in the CIDR ``network``,
+    answered as a range scan on the packed-IP index.
+    """
+    start, end = network_to_bytes(network)
+    return models.Q(**{f"{field_name}__gte": start, f"{field_name}__lte": end})
+
+
+def ips_matching(ip_addresses, field_name="ip_packed"):
+    """
+    Q object matching rows for any of ``ip_addresses`` through the packed
+    column, falling back to ``ip_address`` for values that do not parse.
+    """
+    packed = []
+    malformed = []
+    for ip_address in ip_addresses:
+        value = pack_ip(ip_address)
+        if value is None:
+            malformed.append(ip_address)
+        else:
+            packed.append(value)
+
+    query = models.Q(**{f"{field_name}__in": packed})
+    if malformed:
+        query |= models.Q(ip_address__in=malformed)
+    return query
@@ -0,0 +1,100 @@
+# ip_tracking/geo_stub.py
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+STUB_COUNTRIES = ["Kenya", "Nigeria", "Germany", "Brazil", "Japan", "Canada"]
+
+
+def stub_geolocation(ip_address):
+    """Deterministic fake ip-api.com answer for an address"""
+    digest = zlib.crc32(ip_address.encode())
+    return {
+        "status": "success",
+        "country": STUB_COUNTRIES[digest % len(STUB_COUNTRIES)],
+        "city": f"City {digest % 100}",
+        "lat": (digest % 18000) / 100 - 90,
+        "lon": (digest % 36000) / 100 - 180,
+        "query": ip_address,
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if not path.startswith("/json/"):
+            return self._send(404, {"status": "fail", "message": "not found"})
+        self.server.record("json", 1)
+        return self._send(200, stub_geolocation(path[len("/json/") :]))
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/batch":
+            return self._send(404, {"status": "fail", "message": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        ip_addresses = json.loads(self.rfile.read(length) or b"[]")
+        if len(ip_addresses) > 100:
+            return self._send(422, {"status": "fail", "message": "too many IPs"})
+        self.server.record("batch", len(ip_addresses))
+        return self._send(200, [stub_geolocation(ip) for ip in ip_addresses])
+
+    def _send(self, status, payload):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGeolocationServer(ThreadingHTTPServer):
+    """
+    Local stand-in for ip-api.com's ``/json/<ip>`` and ``/batch`` endpoints,
+    for exercising ``IPAPIProvider`` offline. ``latency`` adds a fixed
+    delay in seconds to every response to mimic a remote API.
+
+    Usable as a context manager that serves on a background thread::
+
+        with StubGeolocationServer(latency=0.02) as server:
+            provider = IPAPIProvider(base_url=server.url)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        super().__init__((host, port), _StubHandler)
+        self.latency = latency
+        self.calls = {"json": 0, "batch": 0}
+        self.ips_served = 0
+        self._calls_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, endpoint, ip_count):
+        with self._calls_lock:
+            self.calls[endpoint] += 1
+            self.ips_served += ip_count
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,207 @@
+# ip_tracking/geocache.py
+import logging
+import threading
+
+from django.conf import settings
+
+from ip_tracking.cache import LocalLRU, get_cache
+
+logger = logging.getLogger(__name__)
+
+
+def geo_cache_key(ip_address):
+    return f"ip_geo_{ip_address}"
+
+
+class _Flight:
+    """A lookup in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = {}
+
+
+class GeolocationCache:
+    """
+    Two-tier cache for geolocation results.
+
+    A bounded per-process LRU sits in front of the shared cache (L2 of
+    ``ip_tracking.cache``).
+    Answers from the provider, including "no data" answers, are kept for
+    ``ttl`` seconds; provider errors are cached as empty results for
+    ``negative_ttl`` seconds so a failing IP is not retried on every
+    request. Concurrent misses for the same IP within a process share a
+    single lookup; waiters give up with an empty result after
+    ``wait_timeout`` seconds.
+    """
+
+    def __init__(
+        self, max_entries=10000, ttl=60 * 60 * 24, negative_ttl=300, wait_timeout=5.0
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.wait_timeout = wait_timeout
+        self._local = LocalLRU(max_entries)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "shared_hits": 0,
+            "misses": 0,
+            "negative_stores": 0,
+            "coalesced": 0,
+        }
+
+    def get(self, ip_address, loader):
+        """Cached geolocation for one IP; ``loader(ip)`` resolves misses"""
+        geo_data = self._get_local(ip_address)
+        if geo_data is not None:
+            return geo_data
+
+        with self._lock:
+            flight = self._inflight.get(ip_address)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[ip_address] = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait(self.wait_timeout)
+            return flight.result
+
+        try:
+            flight.result = self._get_shared_or_load(ip_address, loader)
+        finally:
+            with self._lock:
+                del self._inflight[ip_address]
+            flight.event.set()
+        return flight.result
+
+    def get_many(self, ip_addresses, loader, raise_errors=False):
+        """
+        Batched get: returns ``{ip: geo_data}`` for every IP, with empty
+        dicts for unresolved ones. ``loader(ips)`` returns a dict of the
+        IPs it resolved.
+
+        With ``raise_errors``, a failing ``loader`` raises instead of being
+        cached as empty results, and empty results already cached, which
+        may be such failures, are looked up again. Empty dicts in the
+        result are then real "no data" answers.
+        """
+        results = {}
+        misses = []
+        for ip_address in dict.fromkeys(ip_addresses):
+            geo_data = self._get_local(ip_address)
+            if geo_data is None or (raise_errors and not geo_data):
+                misses.append(ip_address)
+            else:
+                results[ip_address] = geo_data
+        if not misses:
+            return results
+
+        shared = get_cache().shared.get_many([geo_cache_key(ip) for ip in misses])
+        to_load = []
+        for ip_address in misses:
+            geo_data = shared.get(geo_cache_key(ip_address))
+            if geo_data is None or (raise_errors and not geo_data):
+                to_load.append(ip_address)
+            else:
+                self._incr("shared_hits")
+                self._set_local(ip_address, geo_data, self._local_ttl(geo_data))
+                results[ip_address] = geo_data
+        if not to_load:
+            return results
+
+        self._incr("misses", len(to_load))
+        try:
+            loaded = loader(to_load)
+            ttl = self.ttl
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Failed to get geolocation for {len(to_load)} IPs: {e}")
+            loaded = {}
+            ttl = self.negative_ttl
+            self._incr("negative_stores", len(to_load))
+
+        to_store = {ip: loaded.get(ip) or {} for ip in to_load}
+        get_cache().shared.set_many(
+            {geo_cache_key(ip): v for ip, v in to_store.items()}, ttl
+        )
+        for ip_address, geo_data in to_store.items():
+            self._set_local(ip_address, geo_data, ttl)
+        results.update(to_store)
+        return results
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["local_hits"] = self._local.hits
+        stats["evictions"] = self._local.evictions
+        stats["local_entries"] = len(self._local)
+        return stats
+
+    def clear_local(self):
+        self._local.clear()
+
+    def _get_shared_or_load(self, ip_address, loader):
+        shared = get_cache().shared
+        cache_key = geo_cache_key(ip_address)
+        geo_data = shared.get(cache_key)
+        if geo_data is not None:
+            self._incr("shared_hits")
+            self._set_local(ip_address, geo_data, self._local_ttl(geo_data))
+            return geo_data
+
+        self._incr("misses")
+        try:
+            geo_data = loader(ip_address) or {}
+            ttl = self.ttl
+        except Exception as e:
+            # Log error but don't fail the request
+            logger.error(f"Failed to get geolocation for {ip_address}: {str(e)}")
+            geo_data = {}
+            ttl = self.negative_ttl
+            self._incr("negative_stores")
+
+        shared.set(cache_key, geo_data, ttl)
+        self._set_local(ip_address, geo_data, ttl)
+        return geo_data
+
+    def _local_ttl(self, geo_data):
+        # The shared entry's remaining TTL is unknown; never keep a possibly
+        # negative entry locally for longer than a negative TTL
+        return self.ttl if geo_data else self.negative_ttl
+
+    def _get_local(self, ip_address):
+        return self._local.get(ip_address)
+
+    def _set_local(self, ip_address, geo_data, ttl):
+        self._local.set(ip_address, geo_data, ttl)
+
+    def _incr(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+_geo_cache = None
+_geo_cache_lock = threading.Lock()
+
+
+def get_geolocation_cache():
+    """Process-wide cache configured by the GEOLOCATION_*CACHE* settings"""
+    global _geo_cache
+    if _geo_cache is None:
+        with _geo_cache_lock:
+            if _geo_cache is None:
+                _geo_cache = GeolocationCache(
+                    max_entries=getattr(
+                        settings, "GEOLOCATION_LOCAL_CACHE_SIZE", 10000
+                    ),
+                    ttl=getattr(settings, "GEOLOCATION_CACHE_TTL", 60 * 60 * 24),
+                    negative_ttl=getattr(
+                        settings, "GEOLOCATION_NEGATIVE_CACHE_TTL", 300
+                    ),
+                )
+    return _geo_cache
@@ -0,0 +1,159 @@
+# ip_tracking/geoip.py
+import bisect
+import math
+import mmap
+import os
+import struct
+
+from ip_tracking.iputils import ip_to_bytes
+
+# File layout (all integers little-endian unless noted):
+#
+#   header   magic, record count, string count
+#   starts   record count x 16-byte big-endian range starts, sorted
+#   records  record count x (16-byte big-endian range end, country index,
+#            city index, latitude, longitude)
+#   offsets  (string count + 1) x uint32 offsets into the string blob
+#   strings  UTF-8 blob; string 0 is the empty string
+MAGIC = b"IPGEO001"
+HEADER = struct.Struct("<8sII")
+START_SIZE = 16
+RECORD = struct.Struct("<16sIIdd")
+OFFSET = struct.Struct("<I")
+
+
+class GeoIPDatabaseError(Exception):
+    pass
+
+
+class _RangeStarts:
+    """Sequence view over the sorted range starts, for use with bisect"""
+
+    def __init__(self, buffer, offset, count):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        position = self._offset + index * START_SIZE
+        return self._buffer[position : position + START_SIZE]
+
+
+class GeoIPDatabase:
+    """
+    Read-only, memory-mapped IP range database built by ``compile_geoip``.
+
+    Lookups bisect the sorted range starts directly in the mapped file,
+    so opening the database costs nothing and memory is shared between
+    worker processes through the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise GeoIPDatabaseError(f"{self.path} is not a geoip database")
+        magic, self.record_count, self.string_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise GeoIPDatabaseError(f"{self.path} is not a geoip database")
+
+        self._starts_offset = HEADER.size
+        self._records_offset = self._starts_offset + self.record_count * START_SIZE
+        self._offsets_offset = self._records_offset + self.record_count * RECORD.size
+        self._strings_offset = self._offsets_offset + (
+            (self.string_count + 1) * OFFSET.size
+        )
+        self._starts = _RangeStarts(self._mmap, self._starts_offset, self.record_count)
+
+    def lookup(self, ip_address):
+        """Return geolocation data for the address, or None if not covered"""
+        try:
+            key = ip_to_bytes(ip_address)
+        except ValueError:
+            return None
+
+        index = bisect.bisect_right(self._starts, key) - 1
+        if index < 0:
+            return None
+
+        end, country, city, latitude, longitude = RECORD.unpack_from(
+            self._mmap, self._records_offset + index * RECORD.size
+        )
+        if key > end:
+            return None
+
+        return {
+            "country": self._string(country),
+            "city": self._string(city),
+            "latitude": None if math.isnan(latitude) else latitude,
+            "longitude": None if math.isnan(longitude) else longitude,
+        }
+
+    def close(self):
+        self._mmap.close()
+
+    def _string(self, index):
+        if not index:
+            return None
+        position = self._offsets_offset + index * OFFSET.size
+        start, end = struct.unpack_from("<II", self._mmap, position)
+        return self._mmap[
+            self._strings_offset + start : self._strings_offset + end
+        ].decode("utf-8")
+
+
+def write_database(path, ranges):
+    """
+    Write ranges of ``(start, end, country, city, latitude, longitude)``,
+    with start/end as 16-byte keys from ``ip_to_bytes``, to ``path``.
+
+    Raises GeoIPDatabaseError if any two ranges overlap.
+    """
+    ranges = sorted(ranges, key=lambda r: r[0])
+    for previous, current in zip(ranges, ranges[1:]):
+        if current[0] <= previous[1]:
+            raise GeoIPDatabaseError("IP ranges overlap")
+
+    strings = [""]
+    string_index = {"": 0}
+
+    def intern(value):
+        value = value or ""
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    records = bytearray()
+    for start, end, country, city, latitude, longitude in ranges:
+        records += RECORD.pack(
+            end,
+            intern(country),
+            intern(city),
+            math.nan if latitude is None else latitude,
+            math.nan if longitude is None else longitude,
+        )
+
+    offsets = bytearray()
+    blob = bytearray()
+    offsets += OFFSET.pack(0)
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets += OFFSET.pack(len(blob))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ranges), len(strings)))
+        for start, *_ in ranges:
+            f.write(start)
+        f.write(records)
+        f.write(offsets)
+        f.write(blob)
+    # Atomic swap so running workers never map a half-written file
+    os.replace(tmp_path, path)
+    return len(ranges)
@@ -0,0 +1,149 @@
+# ip_tracking/geolocation.py
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ip_tracking.geoip import GeoIPDatabase
+
+IP_API_FIELDS = "status,message,country,city,lat,lon,query"
+
+
+class GeolocationProvider:
+    """
+    Base class for geolocation backends.
+
+    ``lookup_many`` returns a dict of ``{ip_address: geo_data}`` holding
+    only the addresses that resolved; ``geo_data`` has the ``country``,
+    ``city``, ``latitude`` and ``longitude`` keys used by ``RequestLog``.
+    Providers raise on transport errors and leave logging to the caller.
+    """
+
+    # Whether results are worth keeping in the Django cache
+    cacheable = True
+
+    def lookup(self, ip_address):
+        return self.lookup_many([ip_address]).get(ip_address, {})
+
+    def lookup_many(self, ip_addresses):
+        raise NotImplementedError
+
+
+class IPAPIProvider(GeolocationProvider):
+    """
+    ip-api.com client over a pooled keep-alive session.
+
+    Single lookups use ``/json/<ip>``; ``lookup_many`` posts up to
+    ``batch_size`` addresses per call to ``/batch``.
+    """
+
+    def __init__(
+        self,
+        base_url="http://ip-api.com",
+        connect_timeout=1.0,
+        read_timeout=2.0,
+        pool_size=10,
+        batch_size=100,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.batch_size = batch_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def lookup(self, ip_address):
+        response = self.session.get(
+            f"{self.base_url}/json/{ip_address}",
+            params={"fields": IP_API_FIELDS},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return self._parse(response.json()) or {}
+
+    def lookup_many(self, ip_addresses):
+        ip_addresses = list(dict.fromkeys(ip_addresses))
+        results = {}
+        for start in range(0, len(ip_addresses), self.batch_size):
+            response = self.session.post(
+                f"{self.base_url}/batch",
+                params={"fields": IP_API_FIELDS},
+                json=ip_addresses[start : start + self.batch_size],
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            for data in response.json():
+                geo_data = self._parse(data)
+                if geo_data:
+                    results[data.get("query")] = geo_data
+        return results
+
+    def _parse(self, data):
+        if data.get("status") != "success":
+            return None
+        return {
+            "country": data.get("country"),
+            "city": data.get("city"),
+            "latitude": data.get("lat"),
+            "longitude": data.get("lon"),
+        }
+
+
+class LocalDatabaseProvider(GeolocationProvider):
+    """Lookups against a database compiled with ``compile_geoip``"""
+
+    # Local lookups are cheaper than a cache round-trip
+    cacheable = False
+
+    def __init__(self, path=None):
+        self.database = GeoIPDatabase(path or settings.GEOIP_DATABASE_PATH)
+
+    def lookup(self, ip_address):
+        return self.database.lookup(ip_address) or {}
+
+    def lookup_many(self, ip_addresses):
+        results = {}
+        for ip_address in ip_addresses:
+            geo_data = self.database.lookup(ip_address)
+            if geo_data:
+                results[ip_address] = geo_data
+        return results
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_geolocation_provider():
+    """
+    Process-wide provider configured by ``GEOLOCATION_PROVIDER``, a dict
+    with a dotted ``BACKEND`` path and ``OPTIONS`` keyword arguments.
+    Defaults to the local database when ``GEOIP_DATABASE_PATH`` is set and
+    to ip-api.com otherwise.
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                config = getattr(settings, "GEOLOCATION_PROVIDER", None)
+                if config is None:
+                    if getattr(settings, "GEOIP_DATABASE_PATH", None):
+                        config = {
+                            "BACKEND": "ip_tracking.geolocation.LocalDatabaseProvider"
+                        }
+                    else:
+                        config = {"BACKEND": "ip_tracking.geolocation.IPAPIProvider"}
+                backend = import_string(config["BACKEND"])
+                _provider = backend(**config.get("OPTIONS", {}))
+    return _provider
+
+
+def reset_geolocation_provider():
+    """Drop the cached provider, e.g. after changing settings"""
+    global _provider
+    with _provider_lock:
+        _provider = None
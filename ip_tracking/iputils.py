@@ -0,0 +1,43 @@
+# ip_tracking/iputils.py
+import ipaddress
+
+# IPv4 addresses are mapped into ::ffff:0:0/96 so both families share one
+# 128-bit integer space and sort together.
+IPV4_MAPPED_PREFIX = 0xFFFF << 32
+
+# Address prefixes that are never sent for geolocation
+PRIVATE_IP_PREFIXES = ("127.", "10.", "192.168.", "172.")
+
+
+def is_private_ip(ip_address):
+    """Cheap prefix check used to skip geolocation for internal addresses"""
+    return ip_address.startswith(PRIVATE_IP_PREFIXES)
+
+
+def ip_to_int(ip_address):
+    """Convert an IPv4 or IPv6 address to its 128-bit integer form"""
+    address = ipaddress.ip_address(ip_address)
+    if address.version == 4:
+        return IPV4_MAPPED_PREFIX | int(address)
+    return int(address)
+
+
+def int_to_ip(value):
+    """Inverse of ip_to_int; IPv4-mapped integers come back as IPv4"""
+    if value >> 32 == 0xFFFF:
+        return str(ipaddress.IPv4Address(value & 0xFFFFFFFF))
+    return str(ipaddress.IPv6Address(value))
+
+
+def ip_to_bytes(ip_address):
+    """16-byte big-endian form of ip_to_int, which sorts like the integer"""
+    return ip_to_int(ip_address).to_bytes(16, "big")
+
+
+def network_to_bytes(network):
+    """First and last address of a CIDR network, in ip_to_bytes form"""
+    network = ipaddress.ip_network(network, strict=False)
+    return (
+        ip_to_bytes(network.network_address),
+        ip_to_bytes(network.broadcast_address),
+    )
@@ -0,0 +1,436 @@
+# ip_tracking/loadgen.py
+"""
+Traffic generation and access-log replay for load testing, used by the
+``loadtest`` management command.
+
+A traffic source is an iterator of events, dicts with the ``offset`` in
+seconds from the start of the run plus ``ip_address``, ``method``,
+``path`` and ``user_agent``. ``run_load`` sends them through the full
+Django middleware stack in-process with ``django.test.Client``, paced by
+their offsets, and returns a ``LoadReport``.
+"""
+import bisect
+import heapq
+import ipaddress
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.utils.dateparse import parse_datetime
+
+from ip_tracking.log_writer import get_log_writer
+from ip_tracking.models import SuspiciousIP
+
+NORMAL_PATHS = [
+    "/",
+    "/ip-tracking/test-geo/",
+    "/products/",
+    "/products/42/",
+    "/search/?q=shoes",
+    "/static/css/app.css",
+]
+NORMAL_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Gecko/20100101 Firefox/128.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 Safari/605",
+    "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 Chrome/126.0 Mobile",
+]
+SCANNER_PATHS = [
+    "/wp-login.php",
+    "/.env",
+    "/.git/config",
+    "/phpmyadmin/",
+    "/cgi-bin/test.cgi",
+    "/backup.zip",
+]
+SCANNER_USER_AGENT = "masscan/1.3 (https://github.com/robertdavidgraham/masscan)"
+
+# Each traffic class draws its addresses from its own /8
+NORMAL_IP_BASE = int(ipaddress.IPv4Address("11.0.0.0"))
+SCANNER_IP_BASE = int(ipaddress.IPv4Address("12.0.0.0"))
+PROBER_IP_BASE = int(ipaddress.IPv4Address("13.0.0.0"))
+
+COMBINED_LOG_PATTERN = re.compile(
+    r'^(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)'
+    r'[^"]*" \d{3} \S+(?: "[^"]*" "(?P<user_agent>[^"]*)")?'
+)
+COMBINED_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class SyntheticTraffic:
+    """
+    Reproducible traffic mix over ``duration`` seconds:
+
+    * ``rate`` requests per second (Poisson arrivals) from ``ip_count``
+      normal users whose activity follows a Zipf law with exponent
+      ``zipf``, so a few users make most requests;
+    * ``scanners`` IPs that each send ``scanner_requests`` requests to
+      junk paths within a ``burst_seconds`` burst;
+    * ``probers`` IPs that each send ``probe_requests`` requests to the
+      ``SENSITIVE_PATHS``.
+
+    ``attackers`` maps each injected scanner or prober IP to the reason
+    detection should flag it for.
+    """
+
+    def __init__(
+        self,
+        duration=60.0,
+        rate=20.0,
+        ip_count=10000,
+        zipf=0.9,
+        scanners=5,
+        scanner_requests=300,
+        burst_seconds=10.0,
+        probers=5,
+        probe_requests=3,
+        seed=0,
+    ):
+        self.duration = duration
+        self.rate = rate
+        self.ip_count = ip_count
+        self.zipf = zipf
+        self.scanners = scanners
+        self.scanner_requests = scanner_requests
+        self.burst_seconds = min(burst_seconds, duration)
+        self.probers = probers
+        self.probe_requests = probe_requests
+        self.seed = seed
+
+    @property
+    def attackers(self):
+        attackers = {}
+        threshold = getattr(settings, "SUSPICIOUS_REQUEST_THRESHOLD", 100)
+        if self.scanner_requests > threshold:
+            for n in range(self.scanners):
+                attackers[_ip(SCANNER_IP_BASE, n)] = (
+                    SuspiciousIP.SuspicionReason.HIGH_REQUEST_VOLUME
+                )
+        if self.probe_requests:
+            for n in range(self.probers):
+                attackers[_ip(PROBER_IP_BASE, n)] = (
+                    SuspiciousIP.SuspicionReason.SENSITIVE_PATH
+                )
+        return attackers
+
+    def __iter__(self):
+        return heapq.merge(
+            self._normal(), self._scanners(), self._probers(), key=_offset
+        )
+
+    def _normal(self):
+        rng = random.Random(self.seed)
+        cumulative = []
+        total = 0.0
+        for rank in range(1, self.ip_count + 1):
+            total += rank**-self.zipf
+            cumulative.append(total)
+        offset = rng.expovariate(self.rate) if self.rate > 0 else self.duration
+        while offset < self.duration:
+            user = bisect.bisect(cumulative, rng.random() * total)
+            yield _event(
+                offset,
+                _ip(NORMAL_IP_BASE, min(user, self.ip_count - 1)),
+                rng.choice(NORMAL_PATHS),
+                rng.choice(NORMAL_USER_AGENTS),
+            )
+            offset += rng.expovariate(self.rate)
+
+    def _scanners(self):
+        rng = random.Random(self.seed + 1)
+        events = []
+        for n in range(self.scanners):
+            start = rng.uniform(0, self.duration - self.burst_seconds)
+            for _ in range(self.scanner_requests):
+                events.append(
+                    _event(
+                        start + rng.random() * self.burst_seconds,
+                        _ip(SCANNER_IP_BASE, n),
+                        rng.choice(SCANNER_PATHS),
+                        SCANNER_USER_AGENT,
+                    )
+                )
+        return sorted(events, key=_offset)
+
+    def _probers(self):
+        rng = random.Random(self.seed + 2)
+        paths = list(getattr(settings, "SENSITIVE_PATHS", ["/admin/", "/login/"]))
+        events = [
+            _event(
+                rng.uniform(0, self.duration),
+                _ip(PROBER_IP_BASE, n),
+                rng.choice(paths),
+                rng.choice(NORMAL_USER_AGENTS),
+            )
+            for n in range(self.probers)
+            for _ in range(self.probe_requests)
+        ]
+        return sorted(events, key=_offset)
+
+
+def read_access_log(path):
+    """
+    Events from a JSONL or combined-format access log, timed relative to
+    its first entry. JSONL records need ``ip_address`` (or ``ip`` or
+    ``remote_addr``) and ``path``; ``method``, ``user_agent`` and an ISO
+    8601 or Unix ``timestamp`` are optional. Entries that cannot be parsed
+    are skipped; entries without a time go out with the entry before.
+    """
+    first = None
+    offset = 0.0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            parsed = _parse_json_line(line) if line[0] == "{" else _parse_line(line)
+            if parsed is None:
+                continue
+            timestamp, event = parsed
+            if timestamp is not None:
+                if first is None:
+                    first = timestamp
+                offset = max((timestamp - first).total_seconds(), 0.0)
+            event["offset"] = offset
+            yield event
+
+
+def _parse_json_line(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    ip_address = (
+        record.get("ip_address") or record.get("ip") or record.get("remote_addr")
+    )
+    if not ip_address or not record.get("path"):
+        return None
+
+    timestamp = record.get("timestamp")
+    if isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+    elif isinstance(timestamp, str):
+        try:
+            timestamp = parse_datetime(timestamp)
+        except ValueError:
+            timestamp = None
+        if timestamp is not None and timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+    else:
+        timestamp = None
+    return timestamp, _event(
+        0.0,
+        ip_address,
+        record["path"],
+        record.get("user_agent") or "",
+        record.get("method") or "GET",
+    )
+
+
+def _parse_line(line):
+    match = COMBINED_LOG_PATTERN.match(line)
+    if not match:
+        return None
+    try:
+        timestamp = datetime.strptime(match["time"], COMBINED_TIME_FORMAT)
+    except ValueError:
+        timestamp = None
+    return timestamp, _event(
+        0.0,
+        match["ip"],
+        match["path"],
+        match["user_agent"] or "",
+        match["method"],
+    )
+
+
+def _event(offset, ip_address, path, user_agent, method="GET"):
+    return {
+        "offset": offset,
+        "ip_address": ip_address,
+        "method": method,
+        "path": path,
+        "user_agent": user_agent,
+    }
+
+
+def _ip(base, n):
+    return str(ipaddress.IPv4Address(base + n))
+
+
+def _offset(event):
+    return event["offset"]
+
+
+def shard_of(ip_address, shards):
+    """Stable shard for an IP, so one process sees all of an IP's requests"""
+    return zlib.crc32(ip_address.encode()) % shards
+
+
+class LoadReport:
+    """Request, status and latency counts, mergeable across processes"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.late = 0
+        self.ip_addresses = set()
+        self.elapsed = 0.0
+
+    def observe(self, ip_address, status, latency_ms):
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.latency_sum += latency_ms
+        self.latency_max = max(self.latency_max, latency_ms)
+        self.ip_addresses.add(ip_address)
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.latency_sum += other.latency_sum
+        self.latency_max = max(self.latency_max, other.latency_max)
+        self.late += other.late
+        self.ip_addresses |= other.ip_addresses
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the histogram bucket holding the percentile, in ms"""
+        rank = fraction * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.latency_max
+
+    def histogram(self):
+        """``[(label, count)]`` for every latency bucket"""
+        labels = [f"<= {bound} ms" for bound in LATENCY_BUCKETS_MS]
+        labels.append(f"> {LATENCY_BUCKETS_MS[-1]} ms")
+        return list(zip(labels, self.buckets))
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "late": self.late,
+            "elapsed": round(self.elapsed, 3),
+            "throughput": round(self.throughput, 1),
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+            "latency_ms": {
+                "mean": (
+                    round(self.latency_sum / self.requests, 3) if self.requests else 0.0
+                ),
+                "p50": self.percentile(0.50),
+                "p90": self.percentile(0.90),
+                "p99": self.percentile(0.99),
+                "max": round(self.latency_max, 3),
+            },
+            "histogram": dict(self.histogram()),
+        }
+
+
+def request_host():
+    """A Host header the site accepts, taken from ``ALLOWED_HOSTS``"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def run_load(events, threads=1, speedup=1.0, start_at=None, late_after=1.0):
+    """
+    Send ``events`` through the middleware stack from ``threads`` threads.
+
+    An event is sent ``offset / speedup`` seconds after ``start_at`` (a
+    ``time.time()`` value, default now); a ``speedup`` of 0 sends as fast
+    as possible. Events sent more than ``late_after`` seconds behind
+    schedule are counted as late, meaning the generator could not keep up.
+    Queued request logs are flushed before returning.
+    """
+    report = LoadReport()
+    events = iter(events)
+    lock = threading.Lock()
+    start_at = start_at or time.time()
+    host = request_host()
+
+    def worker():
+        client = Client(raise_request_exception=False, HTTP_HOST=host)
+        local = LoadReport()
+        try:
+            while True:
+                with lock:
+                    event = next(events, None)
+                if event is None:
+                    break
+                if speedup:
+                    delay = start_at + event["offset"] / speedup - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif -delay > late_after:
+                        local.late += 1
+                started = time.perf_counter()
+                try:
+                    response = client.generic(
+                        event["method"],
+                        event["path"],
+                        REMOTE_ADDR=event["ip_address"],
+                        HTTP_USER_AGENT=event["user_agent"],
+                    )
+                except Exception:
+                    local.errors += 1
+                    continue
+                local.observe(
+                    event["ip_address"],
+                    response.status_code,
+                    (time.perf_counter() - started) * 1000,
+                )
+        finally:
+            connection.close()
+            with lock:
+                report.merge(local)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.time()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    get_log_writer().flush()
+    report.elapsed = time.time() - max(started, start_at)
+    return report
+
+
+def run_shard(source, shard, shards, threads, speedup, start_at):
+    """
+    ``run_load`` over the events of ``source`` (a traffic generator or an
+    access-log path) that fall in ``shard``; the entry point of each
+    process in a multi-process run.
+    """
+    events = source if not isinstance(source, str) else read_access_log(source)
+    if shards > 1:
+        events = (
+            event for event in events if shard_of(event["ip_address"], shards) == shard
+        )
+    return run_load(events, threads=threads, speedup=speedup, start_at=start_at)
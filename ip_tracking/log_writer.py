@@ -0,0 +1,257 @@
+# ip_tracking/log_writer.py
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+
+
+class BufferedLogWriter:
+    """
+    Write-behind buffer for ``RequestLog`` rows.
+
+    Records are queued in memory and persisted with ``bulk_create`` by a
+    background thread once ``batch_size`` records are waiting or
+    ``flush_interval`` seconds have passed, whichever comes first. The
+    queue holds at most ``max_queue_size`` records; what happens when it
+    is full is decided by ``overflow_policy``:
+
+    - ``drop_newest``: discard the incoming record
+    - ``drop_oldest``: discard the oldest queued record
+    - ``block``: wait up to ``block_timeout`` seconds for room, then drop
+    """
+
+    def __init__(
+        self,
+        batch_size=500,
+        flush_interval=2.0,
+        max_queue_size=10000,
+        overflow_policy=OVERFLOW_DROP_NEWEST,
+        block_timeout=0.05,
+    ):
+        if overflow_policy not in (
+            OVERFLOW_DROP_NEWEST,
+            OVERFLOW_DROP_OLDEST,
+            OVERFLOW_BLOCK,
+        ):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = {"queued": 0, "flushed": 0, "dropped": 0, "failed": 0}
+
+    def write(self, **fields):
+        """Queue a RequestLog record without touching the database"""
+        # Stamp now; the row may only be inserted seconds later
+        fields.setdefault("timestamp", timezone.now())
+        self._ensure_started()
+        if self._put(fields):
+            self._incr("queued")
+            if self._queue.qsize() >= self.batch_size:
+                self._wakeup.set()
+        else:
+            self._incr("dropped")
+
+    async def awrite(self, **fields):
+        """Async variant; queueing never waits on the database"""
+        self.write(**fields)
+
+    def flush(self):
+        """Persist everything currently queued; returns the number of rows"""
+        from ip_tracking.models import RequestLog
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                rows = [RequestLog(**fields) for fields in batch]
+                try:
+                    RequestLog.objects.bulk_create(rows)
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to flush {len(rows)} request logs, "
+                        f"retrying one by one: {e}"
+                    )
+                    flushed = self._write_each(rows)
+                else:
+                    flushed = len(rows)
+                written += flushed
+                self._incr("flushed", flushed)
+        return written
+
+    def _write_each(self, rows):
+        """
+        Insert ``rows`` one at a time so a bad record, such as a malformed
+        IP the database rejects, only loses itself and not the batch
+        """
+        from ip_tracking.models import RequestLog
+
+        written = 0
+        for row in rows:
+            try:
+                RequestLog.objects.bulk_create([row])
+            except Exception as e:
+                self._incr("failed")
+                logger.error(f"Failed to write request log for {row.ip_address!r}: {e}")
+            else:
+                written += 1
+        return written
+
+    def stats(self):
+        """Counters of queued, flushed, dropped and failed records"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def shutdown(self):
+        """Stop the background thread and flush what is left"""
+        atexit.unregister(self.shutdown)
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        stats = self.stats()
+        if stats["dropped"] or stats["failed"]:
+            logger.warning(f"Request log writer stopped: {stats}")
+
+    def _put(self, fields):
+        try:
+            self._queue.put_nowait(fields)
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == OVERFLOW_DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self._incr("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(fields)
+                return True
+            except queue.Full:
+                return False
+
+        if self.overflow_policy == OVERFLOW_BLOCK:
+            self._wakeup.set()
+            try:
+                self._queue.put(fields, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                return False
+
+        return False
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _incr(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="request-log-writer", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue.qsize() < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping.is_set():
+                    break
+                self._wakeup.wait(remaining)
+                self._wakeup.clear()
+            if self._queue.qsize():
+                close_old_connections()
+                self.flush()
+        close_old_connections()
+
+
+class SyncLogWriter:
+    """Writes each RequestLog row immediately, one INSERT per request"""
+
+    def write(self, **fields):
+        from ip_tracking.models import RequestLog
+
+        RequestLog.objects.create(**fields)
+
+    async def awrite(self, **fields):
+        await sync_to_async(self.write)(**fields)
+
+    def flush(self):
+        return 0
+
+    def stats(self):
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Return the process-wide writer configured by the REQUEST_LOG_* settings"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                if getattr(settings, "REQUEST_LOG_WRITE_BEHIND", False):
+                    _writer = BufferedLogWriter(
+                        batch_size=getattr(settings, "REQUEST_LOG_BATCH_SIZE", 500),
+                        flush_interval=getattr(
+                            settings, "REQUEST_LOG_FLUSH_INTERVAL", 2.0
+                        ),
+                        max_queue_size=getattr(
+                            settings, "REQUEST_LOG_MAX_QUEUE_SIZE", 10000
+                        ),
+                        overflow_policy=getattr(
+                            settings,
+                            "REQUEST_LOG_OVERFLOW_POLICY",
+                            OVERFLOW_DROP_NEWEST,
+                        ),
+                    )
+                else:
+                    _writer = SyncLogWriter()
+    return _writer
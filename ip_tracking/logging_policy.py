@@ -0,0 +1,73 @@
+# ip_tracking/logging_policy.py
+import random
+
+from django.conf import settings
+
+
+class RequestLogPolicy:
+    """
+    Decides which requests ``IPLoggingMiddleware`` stores, compiled once
+    from the ``REQUEST_LOG_POLICY`` setting::
+
+        REQUEST_LOG_POLICY = {
+            "SKIP_PREFIXES": ["/static/", "/health/"],
+            "SAMPLE_RATES": {"/api/poll/": 0.05},
+            "ALWAYS_LOG_PREFIXES": SENSITIVE_PATHS,
+            "ALWAYS_LOG_FLAGGED_IPS": True,
+            "LOG_BLOCKED": True,
+        }
+
+    Always-log rules win over skips and sampling; among sample rates the
+    longest matching prefix wins. Sampled rows carry a weight of
+    ``1 / rate`` so counts can be estimated as ``Sum("sample_weight")``.
+    """
+
+    def __init__(
+        self,
+        skip_prefixes=(),
+        sample_rates=None,
+        always_log_prefixes=(),
+        always_log_flagged_ips=True,
+        log_blocked=False,
+    ):
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.always_log_prefixes = tuple(always_log_prefixes)
+        self.always_log_flagged_ips = always_log_flagged_ips
+        self.log_blocked = log_blocked
+        self.sample_rates = sorted(
+            (sample_rates or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        for prefix, rate in self.sample_rates:
+            if not 0 < rate <= 1:
+                raise ValueError(f"Sample rate for {prefix} must be in (0, 1]")
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "REQUEST_LOG_POLICY", {})
+        return cls(
+            skip_prefixes=config.get("SKIP_PREFIXES", ()),
+            sample_rates=config.get("SAMPLE_RATES", {}),
+            always_log_prefixes=config.get(
+                "ALWAYS_LOG_PREFIXES", getattr(settings, "SENSITIVE_PATHS", ())
+            ),
+            always_log_flagged_ips=config.get("ALWAYS_LOG_FLAGGED_IPS", True),
+            log_blocked=config.get("LOG_BLOCKED", False),
+        )
+
+    def sample_weight(self, path, flagged=False):
+        """
+        Weight to store the request with, or None to skip it. ``flagged``
+        is True for blocked or suspicious IPs.
+        """
+        if flagged and self.always_log_flagged_ips:
+            return 1.0
+        if self.always_log_prefixes and path.startswith(self.always_log_prefixes):
+            return 1.0
+        if self.skip_prefixes and path.startswith(self.skip_prefixes):
+            return None
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                if rate >= 1 or random.random() < rate:
+                    return 1.0 / rate
+                return None
+        return 1.0
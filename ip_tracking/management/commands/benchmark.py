@@ -0,0 +1,209 @@
+# ip_tracking/management/commands/benchmark.py
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from ip_tracking import benchmarks
+
+SUITES = ("middleware", "geolocation", "admin", "detection")
+ISOLATED_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": alias,
+    }
+    for alias in ("default", "ip_tracking_state")
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the ip_tracking hot paths in a throwaway test database and "
+        "fail if any result regressed against the saved JSON baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            action="append",
+            choices=SUITES,
+            help="Run only this suite (repeatable)",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=2000,
+            help="Timed calls per middleware and geolocation benchmark",
+        )
+        parser.add_argument(
+            "--admin-iterations",
+            type=int,
+            default=20,
+            help="Timed page renders per admin benchmark",
+        )
+        parser.add_argument(
+            "--admin-rows",
+            type=int,
+            default=1000000,
+            help="RequestLog rows behind the admin changelist",
+        )
+        parser.add_argument(
+            "--detection-rows",
+            type=int,
+            nargs="+",
+            default=[1000000, 10000000],
+            help="RequestLog table sizes to run detection against",
+        )
+        parser.add_argument(
+            "--geo-latency-ms",
+            type=float,
+            default=0.0,
+            help="Delay added by the stub geolocation API",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            help="Baseline JSON file (default BENCHMARK_BASELINE_PATH)",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help=(
+                "Write the results as the new baseline instead of comparing; "
+                "needed for the first run"
+            ),
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed slowdown against the baseline as a fraction",
+        )
+        parser.add_argument(
+            "--shared-cache",
+            action="store_true",
+            help=(
+                "Use the configured caches instead of a private in-memory one; "
+                "synthetic entries are then written to them"
+            ),
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database, and its tables, between runs",
+        )
+
+    def handle(self, *args, **options):
+        suites = options["only"] or SUITES
+        baseline_path = Path(
+            options["baseline"]
+            or getattr(
+                settings,
+                "BENCHMARK_BASELINE_PATH",
+                settings.BASE_DIR / "benchmark_baseline.json",
+            )
+        )
+        if options["iterations"] < 1 or options["admin_iterations"] < 1:
+            raise CommandError("Iterations must be positive")
+        if options["tolerance"] < 0:
+            raise CommandError("--tolerance must not be negative")
+
+        baseline = {}
+        if baseline_path.exists():
+            try:
+                baseline = json.loads(baseline_path.read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Error reading baseline {baseline_path}: {str(e)}")
+
+        if not baseline and not options["save"]:
+            raise CommandError(
+                f"No baseline at {baseline_path}; record one with --save first"
+            )
+
+        with benchmarks.throwaway_database("benchmark", options["keepdb"]):
+            if options["shared_cache"]:
+                results = self.run_suites(suites, options)
+            else:
+                with override_settings(CACHES=ISOLATED_CACHES):
+                    results = self.run_suites(suites, options)
+
+        environment = benchmarks.environment()
+        if options["save"]:
+            # Benchmarks left out of this run keep their saved results
+            report = {
+                "created_at": timezone.now().isoformat(),
+                "environment": environment,
+                "results": {**baseline.get("results", {}), **results},
+            }
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {baseline_path}"))
+            return
+
+        if baseline.get("environment") != environment:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Baseline was recorded on {baseline.get('environment')}; "
+                    "timings may not be comparable"
+                )
+            )
+        missing = sorted(set(results) - set(baseline.get("results", {})))
+        if len(missing) == len(results):
+            raise CommandError(
+                f"None of these benchmarks are in {baseline_path}; "
+                "record them with --save"
+            )
+        if missing:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Not in the baseline, so not compared: {', '.join(missing)}"
+                )
+            )
+        regressions = benchmarks.compare(baseline, results, options["tolerance"])
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark regressions against "
+                f"{baseline_path}:\n  " + "\n  ".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
+
+    def run_suites(self, suites, options):
+        results = {}
+        if "middleware" in suites:
+            results.update(
+                self.run(
+                    benchmarks.bench_middleware,
+                    options["iterations"],
+                    options["geo_latency_ms"] / 1000,
+                )
+            )
+        if "geolocation" in suites:
+            results.update(
+                self.run(
+                    benchmarks.bench_geolocation,
+                    options["iterations"],
+                    options["geo_latency_ms"] / 1000,
+                )
+            )
+        if "admin" in suites:
+            results.update(
+                self.run(
+                    benchmarks.bench_admin,
+                    options["admin_rows"],
+                    options["admin_iterations"],
+                )
+            )
+        if "detection" in suites:
+            for rows in options["detection_rows"]:
+                results.update(self.run(benchmarks.bench_detection, rows))
+        return results
+
+    def run(self, bench, *args):
+        results = bench(*args)
+        for name, metrics in results.items():
+            summary = ", ".join(f"{key}={value}" for key, value in metrics.items())
+            self.stdout.write(f"{name}: {summary}")
+        return results
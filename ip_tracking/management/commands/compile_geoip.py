@@ -0,0 +1,64 @@
+# ip_tracking/management/commands/compile_geoip.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ip_tracking.geoip import GeoIPDatabaseError, write_database
+from ip_tracking.iputils import ip_to_bytes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile a CSV of IP ranges (start, end, country, city, lat, lon) "
+        "into the binary database read by GEOIP_DATABASE_PATH"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", type=str, help="CSV file of IP ranges")
+        parser.add_argument("output", type=str, help="Path of the database to write")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ranges = []
+
+        try:
+            with open(options["csv_file"], newline="", encoding="utf-8") as f:
+                for line_number, row in enumerate(csv.reader(f), start=1):
+                    if not row or row[0].startswith("#"):
+                        continue
+                    try:
+                        ranges.append(self.parse_row(row))
+                    except ValueError as e:
+                        # Tolerate a header line, reject anything else
+                        if line_number == 1:
+                            continue
+                        raise CommandError(f"Line {line_number}: {e}")
+
+            count = write_database(options["output"], ranges)
+        except (OSError, GeoIPDatabaseError) as e:
+            raise CommandError(f"Error compiling geoip database: {str(e)}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compiled {count} IP ranges into {options['output']} "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        )
+
+    def parse_row(self, row):
+        if len(row) < 4:
+            raise ValueError("expected start, end, country, city[, lat, lon]")
+        start, end = ip_to_bytes(row[0].strip()), ip_to_bytes(row[1].strip())
+        if start > end:
+            raise ValueError(f"range start {row[0]} is after end {row[1]}")
+        latitude = float(row[4]) if len(row) > 4 and row[4].strip() else None
+        longitude = float(row[5]) if len(row) > 5 and row[5].strip() else None
+        return (
+            start,
+            end,
+            row[2].strip(),
+            row[3].strip(),
+            latitude,
+            longitude,
+        )
@@ -0,0 +1,39 @@
+# ip_tracking/management/commands/geo_stub_server.py
+from django.core.management.base import BaseCommand
+
+from ip_tracking.geo_stub import StubGeolocationServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local stand-in for the ip-api.com API, for benchmarking "
+        "the geolocation provider offline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=0.0,
+            help="Artificial delay added to every response",
+        )
+
+    def handle(self, *args, **options):
+        server = StubGeolocationServer(
+            options["host"], options["port"], latency=options["latency_ms"] / 1000
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stub geolocation API listening on {server.url}; point "
+                f'GEOLOCATION_PROVIDER OPTIONS["base_url"] at it'
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.ips_served} IPs in {server.calls}")
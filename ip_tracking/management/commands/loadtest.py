@@ -0,0 +1,247 @@
+# ip_tracking/management/commands/loadtest.py
+import json
+import logging
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+
+from ip_tracking.benchmarks import throwaway_database
+from ip_tracking.detection import detect_suspicious_activity
+from ip_tracking.geo_stub import StubGeolocationServer
+from ip_tracking.geolocation import reset_geolocation_provider
+from ip_tracking.loadgen import LoadReport, SyntheticTraffic, run_shard
+from ip_tracking.models import SuspiciousIP
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive synthetic traffic, or replay a JSONL or combined-format access "
+        "log, through the full middleware stack in-process against a throwaway "
+        "test database and report throughput and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--replay",
+            type=str,
+            help="Access log to replay instead of generating traffic",
+        )
+        parser.add_argument("--duration", type=float, default=60.0)
+        parser.add_argument(
+            "--rate", type=float, default=20.0, help="Normal requests per second"
+        )
+        parser.add_argument(
+            "--ips", type=int, default=10000, help="Distinct normal users"
+        )
+        parser.add_argument(
+            "--zipf", type=float, default=0.9, help="Zipf exponent of user activity"
+        )
+        parser.add_argument("--scanners", type=int, default=5)
+        parser.add_argument(
+            "--scanner-requests", type=int, default=300, help="Requests per scanner"
+        )
+        parser.add_argument(
+            "--burst-seconds", type=float, default=10.0, help="Length of a scan"
+        )
+        parser.add_argument("--probers", type=int, default=5)
+        parser.add_argument(
+            "--probe-requests",
+            type=int,
+            default=3,
+            help="Sensitive-path requests per prober",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Sending threads per process"
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Processes, each sending the requests of its share of IPs",
+        )
+        parser.add_argument(
+            "--speedup",
+            type=float,
+            default=1.0,
+            help="Time compression factor; 0 sends as fast as possible",
+        )
+        parser.add_argument(
+            "--real-geolocation",
+            action="store_true",
+            help=(
+                "Use the configured geolocation provider instead of a local "
+                "stub of ip-api.com"
+            ),
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help=(
+                "Run detection afterwards and fail unless it flags exactly the "
+                "injected scanners and probers"
+            ),
+        )
+        parser.add_argument("--output", type=str, help="Write the report as JSON")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the load-test database, and its rows, between runs",
+        )
+
+    def handle(self, *args, **options):
+        if options["threads"] < 1 or options["processes"] < 1:
+            raise CommandError("--threads and --processes must be positive")
+        if options["speedup"] < 0:
+            raise CommandError("--speedup must not be negative")
+
+        if options["replay"]:
+            if not os.path.isfile(options["replay"]):
+                raise CommandError(f"Access log {options['replay']} does not exist")
+            source = options["replay"]
+            attackers = None
+        else:
+            source = SyntheticTraffic(
+                duration=options["duration"],
+                rate=options["rate"],
+                ip_count=options["ips"],
+                zipf=options["zipf"],
+                scanners=options["scanners"],
+                scanner_requests=options["scanner_requests"],
+                burst_seconds=options["burst_seconds"],
+                probers=options["probers"],
+                probe_requests=options["probe_requests"],
+                seed=options["seed"],
+            )
+            attackers = source.attackers
+
+        with throwaway_database("loadtest", options["keepdb"]):
+            started_at = timezone.now()
+            report = self.run_quietly(source, options)
+            result = report.as_dict()
+            self.write_report(result)
+
+            mismatch = False
+            if options["verify"]:
+                result["detection"], mismatch = self.verify(
+                    report, attackers, started_at
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(result, f, indent=2)
+
+        if mismatch:
+            raise CommandError("Detection did not flag exactly the injected attackers")
+
+    def run_quietly(self, source, options):
+        """``run`` against the stub geolocation API unless told otherwise"""
+        # Every 404 and 429 would otherwise be logged as a warning
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            if options["real_geolocation"]:
+                return self.run(source, options)
+            with StubGeolocationServer() as server:
+                with override_settings(
+                    GEOLOCATION_PROVIDER={
+                        "BACKEND": "ip_tracking.geolocation.IPAPIProvider",
+                        "OPTIONS": {"base_url": server.url},
+                    }
+                ):
+                    reset_geolocation_provider()
+                    try:
+                        return self.run(source, options)
+                    finally:
+                        reset_geolocation_provider()
+        finally:
+            request_logger.setLevel(level)
+
+    def run(self, source, options):
+        processes = options["processes"]
+        if processes == 1:
+            return run_shard(source, 0, 1, options["threads"], options["speedup"], None)
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:
+            raise CommandError("--processes needs the fork start method")
+        start_at = time.time() + 1.0
+        with context.Pool(processes) as pool:
+            reports = pool.starmap(
+                run_shard,
+                [
+                    (source, shard, processes, options["threads"], options["speedup"])
+                    + (start_at,)
+                    for shard in range(processes)
+                ],
+            )
+        report = LoadReport()
+        for shard_report in reports:
+            report.merge(shard_report)
+        return report
+
+    def write_report(self, result):
+        latency = result["latency_ms"]
+        self.stdout.write(
+            f"{result['requests']} requests in {result['elapsed']:.2f}s "
+            f"({result['throughput']:.1f} req/s), {result['errors']} errors, "
+            f"{result['late']} sent late"
+        )
+        self.stdout.write(
+            "Statuses: "
+            + ", ".join(f"{status}={n}" for status, n in result["statuses"].items())
+        )
+        self.stdout.write(
+            f"Latency ms: mean={latency['mean']} p50<={latency['p50']} "
+            f"p90<={latency['p90']} p99<={latency['p99']} max={latency['max']}"
+        )
+        peak = max(result["histogram"].values(), default=0) or 1
+        for label, count in result["histogram"].items():
+            bar = "#" * round(40 * count / peak)
+            self.stdout.write(f"  {label:>12} {count:>8} {bar}")
+
+    def verify(self, report, attackers, started_at):
+        """
+        Run a full detection pass over the last hour and compare the IPs
+        it flagged among those sent with the injected ``attackers``.
+        """
+        # The requests were just logged; fold them in without waiting
+        with override_settings(REQUEST_ROLLUP_SETTLE_SECONDS=0):
+            detect_suspicious_activity(window=timedelta(hours=1), incremental=False)
+        flagged = {
+            ip: reason
+            for ip, reason in SuspiciousIP.objects.filter(
+                is_active=True, last_detected__gte=started_at
+            ).values_list("ip_address", "reason")
+            if ip in report.ip_addresses
+        }
+        self.stdout.write(f"Detection flagged {len(flagged)} of the IPs sent")
+        if attackers is None:
+            for ip, reason in sorted(flagged.items()):
+                self.stdout.write(f"  {ip}: {reason}")
+            return {"flagged": flagged}, False
+
+        missed = sorted(set(attackers) - set(flagged))
+        unexpected = sorted(set(flagged) - set(attackers))
+        self.stdout.write(
+            f"Injected {len(attackers)}: {len(attackers) - len(missed)} flagged, "
+            f"{len(missed)} missed, {len(unexpected)} flagged unexpectedly"
+        )
+        for ip in missed:
+            self.stdout.write(self.style.ERROR(f"  missed {ip} ({attackers[ip]})"))
+        for ip in unexpected:
+            self.stdout.write(self.style.WARNING(f"  unexpected {ip} ({flagged[ip]})"))
+        if not missed and not unexpected:
+            self.stdout.write(self.style.SUCCESS("Detection matched the injection"))
+        detection = {"flagged": flagged, "missed": missed, "unexpected": unexpected}
+        return detection, bool(missed or unexpected)
@@ -0,0 +1,67 @@
+# ip_tracking/management/commands/purge_request_logs.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ip_tracking.retention import archive_request_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive RequestLog rows older than the retention period to gzipped "
+        "NDJSON files and delete them in primary-key chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Retention period in days (default REQUEST_LOG_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            type=str,
+            help="Directory for the archive (default REQUEST_LOG_ARCHIVE_DIR)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, help="Rows archived and deleted per chunk"
+        )
+        parser.add_argument(
+            "--max-rows-per-second", type=float, help="Throttle the purge rate"
+        )
+        parser.add_argument(
+            "--max-batches", type=int, help="Stop after this many chunks"
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Delete expired rows without archiving them",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] is not None and options["days"] < 0:
+            raise CommandError("--days must not be negative")
+
+        try:
+            stats = archive_request_logs(
+                older_than=(
+                    timedelta(days=options["days"])
+                    if options["days"] is not None
+                    else None
+                ),
+                archive_dir=options["archive_dir"],
+                batch_size=options["batch_size"],
+                max_rows_per_second=options["max_rows_per_second"],
+                max_batches=options["max_batches"],
+                archive=not options["no_archive"],
+            )
+        except OSError as e:
+            raise CommandError(f"Error archiving request logs: {str(e)}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {stats['archived']} rows to {stats['files']} files and "
+                f"deleted {stats['deleted']} rows in {stats['elapsed']:.2f}s "
+                f"({stats['rows_per_second']:.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,338 @@
+# ip_tracking/metrics.py
+"""
+Per-stage latency histograms for ``IPLoggingMiddleware``.
+
+Each process records into an in-memory ``StageHistograms``; a background
+thread publishes them every ``METRICS_PUBLISH_INTERVAL`` seconds so the
+``/metrics`` endpoint can report totals for all workers:
+
+* by default, as counters in the shared cache, incremented with the
+  process's new observations (one pipelined round trip on Redis);
+* with ``METRICS_MULTIPROCESS_DIR`` set, as one JSON file per process in
+  that directory, summed when scraped.
+
+The request log writer's and geolocation cache's ``stats()`` counters
+are published the same way, next to the histograms.
+
+Durations are kept as integer nanoseconds so they can be added up in the
+cache.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from ip_tracking.cache import get_state_cache
+from ip_tracking.geocache import get_geolocation_cache
+from ip_tracking.log_writer import get_log_writer
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("blocklist", "suspicious", "view", "geolocation", "log_write")
+# Upper bounds in seconds; a final +Inf bucket catches everything slower
+BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+METRIC_NAME = "ip_tracking_stage_duration_seconds"
+CACHE_KEY_PREFIX = "ip_tracking_metrics"
+# Counter families: {name: (help, label, stats keys)}
+COUNTERS = {
+    "ip_tracking_request_log_records_total": (
+        "Request log records by what the writer did with them.",
+        "outcome",
+        ("queued", "flushed", "dropped", "failed"),
+    ),
+    "ip_tracking_geolocation_cache_events_total": (
+        "Geolocation cache lookups and housekeeping by kind.",
+        "event",
+        (
+            "local_hits",
+            "shared_hits",
+            "misses",
+            "negative_stores",
+            "coalesced",
+            "evictions",
+        ),
+    ),
+}
+
+
+class StageHistograms:
+    """
+    Histogram per stage of ``STAGES``: a count per bucket of ``BUCKETS``
+    plus one for +Inf, and the total time. Recording only touches one
+    bucket and the total; counts are derived when taking a snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {stage: [0] * (len(BUCKETS) + 1) for stage in STAGES}
+        self._sums = {stage: 0.0 for stage in STAGES}
+
+    def observe_many(self, timings):
+        """Record ``[(stage, seconds)]`` under a single lock acquisition"""
+        with self._lock:
+            for stage, seconds in timings:
+                self._buckets[stage][bisect.bisect_left(BUCKETS, seconds)] += 1
+                self._sums[stage] += seconds
+
+    def snapshot(self):
+        """``{stage: {"buckets", "sum_ns", "count"}}``"""
+        with self._lock:
+            buckets = {stage: list(counts) for stage, counts in self._buckets.items()}
+            sums = dict(self._sums)
+        return {
+            stage: {
+                "buckets": buckets[stage],
+                "sum_ns": round(sums[stage] * 1e9),
+                "count": sum(buckets[stage]),
+            }
+            for stage in STAGES
+        }
+
+
+class MetricsPublisher:
+    """Publishes a process's ``StageHistograms`` to where all workers meet"""
+
+    def __init__(
+        self, histograms, interval=10.0, directory=None, ttl=None, counters=None
+    ):
+        self.histograms = histograms
+        self.interval = interval
+        self.directory = Path(directory) if directory else None
+        self.ttl = ttl
+        # Callable returning ``{counter key: value}`` for this process
+        self.counters = counters or dict
+        self._published = _empty_totals()
+        self._publish_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-publisher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.publish)
+
+    def publish(self):
+        """Push what this process observed since the last publish"""
+        with self._publish_lock:
+            snapshot = self.histograms.snapshot()
+            snapshot["counters"] = dict(self.counters())
+            try:
+                if self.directory is not None:
+                    self._write_file(snapshot)
+                else:
+                    self._increment_cache(snapshot)
+            except Exception as e:
+                logger.error(f"Failed to publish middleware metrics: {e}")
+                return
+            self._published = snapshot
+
+    def collect(self):
+        """Totals across every worker that has published"""
+        self.publish()
+        if self.directory is not None:
+            return self._read_files()
+        return self._read_cache()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.publish()
+
+    def _increment_cache(self, snapshot):
+        amounts = {}
+        for stage in STAGES:
+            published = _flatten(stage, self._published[stage])
+            for key, value in _flatten(stage, snapshot[stage]).items():
+                delta = value - published[key]
+                if delta:
+                    amounts[key] = delta
+        published = self._published["counters"]
+        for key, value in snapshot["counters"].items():
+            # A counter that went down belongs to a replaced writer or cache
+            delta = value - published.get(key, 0)
+            if delta > 0:
+                amounts[_key("counter", key)] = delta
+        get_state_cache().incr_many(amounts, self.ttl)
+
+    def _read_cache(self):
+        counter_keys = {key: _key("counter", key) for key in _counter_keys()}
+        keys = [key for stage in STAGES for key in _flatten(stage, _empty())]
+        values = get_state_cache().get_many(keys + list(counter_keys.values()))
+        totals = {
+            "counters": {
+                key: values.get(cache_key, 0) for key, cache_key in counter_keys.items()
+            }
+        }
+        for stage in STAGES:
+            histogram = _empty()
+            for index in range(len(histogram["buckets"])):
+                histogram["buckets"][index] = values.get(_key(stage, index), 0)
+            histogram["sum_ns"] = values.get(_key(stage, "sum_ns"), 0)
+            histogram["count"] = values.get(_key(stage, "count"), 0)
+            totals[stage] = histogram
+        return totals
+
+    def _write_file(self, snapshot):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"metrics_{os.getpid()}.json"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(snapshot))
+        os.replace(temp_path, path)
+
+    def _read_files(self):
+        totals = _empty_totals()
+        counters = totals["counters"]
+        for path in self.directory.glob("metrics_*.json"):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for key, value in snapshot.get("counters", {}).items():
+                counters[key] = counters.get(key, 0) + value
+            for stage, histogram in snapshot.items():
+                if stage not in STAGES:
+                    continue
+                total = totals[stage]
+                total["buckets"] = [
+                    a + b for a, b in zip(total["buckets"], histogram["buckets"])
+                ]
+                total["sum_ns"] += histogram["sum_ns"]
+                total["count"] += histogram["count"]
+        return totals
+
+
+def _empty():
+    return {"buckets": [0] * (len(BUCKETS) + 1), "sum_ns": 0, "count": 0}
+
+
+def _empty_totals():
+    totals = {stage: _empty() for stage in STAGES}
+    totals["counters"] = {}
+    return totals
+
+
+def _counter_keys():
+    return [
+        f"{name}:{stat}" for name, (_, _, stats) in COUNTERS.items() for stat in stats
+    ]
+
+
+def _key(stage, field):
+    return f"{CACHE_KEY_PREFIX}:{stage}:{field}"
+
+
+def _flatten(stage, histogram):
+    flat = {
+        _key(stage, index): count for index, count in enumerate(histogram["buckets"])
+    }
+    flat[_key(stage, "sum_ns")] = histogram["sum_ns"]
+    flat[_key(stage, "count")] = histogram["count"]
+    return flat
+
+
+def render_prometheus(totals):
+    """Prometheus text exposition (version 0.0.4) of ``collect()`` totals"""
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in each IPLoggingMiddleware stage.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for stage in STAGES:
+        histogram = totals[stage]
+        cumulative = 0
+        bounds = [repr(bound) for bound in BUCKETS] + ["+Inf"]
+        for bound, count in zip(bounds, histogram["buckets"]):
+            cumulative += count
+            lines.append(
+                f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'{METRIC_NAME}_sum{{stage="{stage}"}} {histogram["sum_ns"] / 1e9!r}'
+        )
+        lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {histogram["count"]}')
+    counters = totals.get("counters", {})
+    for name, (description, label, stats) in COUNTERS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for stat in stats:
+            value = counters.get(f"{name}:{stat}", 0)
+            lines.append(f'{name}{{{label}="{stat}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def component_counters():
+    """
+    This process's request log writer and geolocation cache counters,
+    keyed ``"<family>:<stat>"``
+    """
+    sources = {
+        "ip_tracking_request_log_records_total": get_log_writer().stats(),
+        "ip_tracking_geolocation_cache_events_total": (get_geolocation_cache().stats()),
+    }
+    return {
+        f"{name}:{stat}": sources[name].get(stat, 0)
+        for name, (_, _, stats) in COUNTERS.items()
+        for stat in stats
+    }
+
+
+def server_timing(timings):
+    """``Server-Timing`` header value for ``[(stage, seconds)]``"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings)
+
+
+_histograms = StageHistograms()
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_stage_histograms():
+    """This process's histograms; the publisher starts on first use"""
+    get_metrics_publisher().ensure_started()
+    return _histograms
+
+
+def get_metrics_publisher():
+    """Process-wide publisher configured by the METRICS_* settings"""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = MetricsPublisher(
+                    _histograms,
+                    interval=getattr(settings, "METRICS_PUBLISH_INTERVAL", 10.0),
+                    directory=getattr(settings, "METRICS_MULTIPROCESS_DIR", None),
+                    ttl=getattr(settings, "METRICS_CACHE_TTL", 60 * 60 * 24 * 7),
+                    counters=component_counters,
+                )
+    return _publisher
@@ -1,53 +1,303 @@
 # ip_tracking/middleware.py
-from django.http import HttpResponseForbidden
+import time
 
-from ip_tracking.models import BlockedIP, RequestLog
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse
+
+from ip_tracking.blocking import remember_staff_ip
+from ip_tracking.blocklist import blocklist, suspicious_ips
+from ip_tracking.iputils import is_private_ip
+from ip_tracking.log_writer import get_log_writer
+from ip_tracking.logging_policy import RequestLogPolicy
+from ip_tracking.metrics import get_stage_histograms, server_timing
+from ip_tracking.models import RequestLog
+from ip_tracking.ratelimit import (
+    KEY_PREFIX,
+    get_rate_limiter,
+    load_rules,
+    parse_rate,
+    retry_after_header,
+)
+from ip_tracking.streaming import get_streaming_detector
 
 
 class IPLoggingMiddleware:
+    """
+    Blocks blacklisted IPs and logs requests as allowed by the
+    ``REQUEST_LOG_POLICY`` setting (see ``RequestLogPolicy``).
+
+    Supports both WSGI and ASGI stacks: under ASGI the middleware runs on
+    the event loop and only the blocking geolocation lookup (and, without
+    write-behind logging, the INSERT) is moved to a worker thread.
+
+    With ``GEOLOCATION_DEFERRED`` enabled, rows are written without geo
+    fields and filled in later by the ``enrich_request_log_geolocation``
+    task, so request latency never depends on geolocation. Rows for
+    blocked requests are always deferred like this.
+
+    With ``STREAMING_DETECTION_ENABLED``, allowed requests also feed the
+    in-process ``StreamingDetector``, which flags IPs within seconds.
+
+    Staff users seen on ``SENSITIVE_PATHS`` have their IP recorded with
+    ``remember_staff_ip``, so block escalation never locks them out.
+
+    Each stage (blocklist check, suspicious-IP check, the rest of the
+    stack as ``view``, geolocation and the log write) is timed into the
+    ``ip_tracking.metrics`` histograms unless ``METRICS_ENABLED`` is off,
+    and reported in a ``Server-Timing`` header with
+    ``SERVER_TIMING_ENABLED``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.defer_geolocation = getattr(settings, "GEOLOCATION_DEFERRED", False)
+        self.policy = RequestLogPolicy.from_settings()
+        self.detector = get_streaming_detector()
+        self.sensitive_paths = tuple(getattr(settings, "SENSITIVE_PATHS", []))
+        self.metrics = (
+            get_stage_histograms()
+            if getattr(settings, "METRICS_ENABLED", True)
+            else None
+        )
+        self.server_timing = getattr(settings, "SERVER_TIMING_ENABLED", False)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timer = time.perf_counter
+
         # Check if IP is blocked
         ip_address = self.get_client_ip(request)
+        started = timer()
+        blocked = blocklist.is_blocked(ip_address)
+        timings = [("blocklist", timer() - started)]
 
-        if BlockedIP.objects.filter(ip_address=ip_address).exists():
-            return HttpResponseForbidden(
-                "Access Denied: Your IP address has been blocked."
-            )
+        if blocked:
+            response = self.blocked_response()
+            if not self.policy.log_blocked:
+                return self.finish(response, timings)
+        else:
+            # Process request
+            started = timer()
+            response = self.get_response(request)
+            timings.append(("view", timer() - started))
+            if self.detector is not None:
+                self.detector.observe(ip_address, request.path)
+            if request.path.startswith(self.sensitive_paths):
+                # The admin has already resolved request.user by now
+                user = getattr(request, "user", None)
+                if user is not None and user.is_staff:
+                    remember_staff_ip(ip_address)
 
-        # Process request
-        response = self.get_response(request)
+        # Skip or sample the request according to the logging policy
+        flagged = blocked
+        if not flagged and self.policy.always_log_flagged_ips:
+            started = timer()
+            flagged = suspicious_ips.contains(ip_address)
+            timings.append(("suspicious", timer() - started))
+        sample_weight = self.policy.sample_weight(request.path, flagged)
+        if sample_weight is None:
+            return self.finish(response, timings)
 
-        # Get geolocation data
+        # Get geolocation data; blocked requests are answered without
+        # waiting on the provider and enriched later by the task
         geo_data = {}
-        if not ip_address.startswith(
-            ("127.", "10.", "192.168.", "172.")
-        ):  # Skip private IPs
+        if not blocked and self.should_geolocate(ip_address):
+            started = timer()
             geo_data = RequestLog.get_geolocation_data(ip_address)
+            timings.append(("geolocation", timer() - started))
 
-        # Log request details after response is processed
+        # Log the request (queued when write-behind logging is enabled)
+        started = timer()
+        get_log_writer().write(
+            **self.get_log_fields(request, ip_address, geo_data, sample_weight)
+        )
+        timings.append(("log_write", timer() - started))
+
+        return self.finish(response, timings)
+
+    async def __acall__(self, request):
+        timer = time.perf_counter
         ip_address = self.get_client_ip(request)
+        started = timer()
+        blocked = await blocklist.ais_blocked(ip_address)
+        timings = [("blocklist", timer() - started)]
+
+        if blocked:
+            response = self.blocked_response()
+            if not self.policy.log_blocked:
+                return self.finish(response, timings)
+        else:
+            started = timer()
+            response = await self.get_response(request)
+            timings.append(("view", timer() - started))
+            if self.detector is not None:
+                self.detector.observe(ip_address, request.path)
+            if request.path.startswith(self.sensitive_paths):
+                auser = getattr(request, "auser", None)
+                user = await auser() if auser is not None else None
+                if user is not None and user.is_staff:
+                    await sync_to_async(remember_staff_ip)(ip_address)
+
+        flagged = blocked
+        if not flagged and self.policy.always_log_flagged_ips:
+            started = timer()
+            flagged = await suspicious_ips.acontains(ip_address)
+            timings.append(("suspicious", timer() - started))
+        sample_weight = self.policy.sample_weight(request.path, flagged)
+        if sample_weight is None:
+            return self.finish(response, timings)
 
-        # Log the request
-        RequestLog.objects.create(
-            ip_address=ip_address,
-            path=request.path,
-            method=request.method,
-            user_agent=request.META.get("HTTP_USER_AGENT", ""),
-            country=geo_data.get("country"),
-            city=geo_data.get("city"),
-            latitude=geo_data.get("latitude"),
-            longitude=geo_data.get("longitude"),
+        geo_data = {}
+        if not blocked and self.should_geolocate(ip_address):
+            started = timer()
+            geo_data = await sync_to_async(
+                RequestLog.get_geolocation_data, thread_sensitive=False
+            )(ip_address)
+            timings.append(("geolocation", timer() - started))
+
+        started = timer()
+        await get_log_writer().awrite(
+            **self.get_log_fields(request, ip_address, geo_data, sample_weight)
         )
+        timings.append(("log_write", timer() - started))
+
+        return self.finish(response, timings)
 
+    def finish(self, response, timings):
+        """Record the stage timings, and report them if enabled"""
+        if self.metrics is not None:
+            self.metrics.observe_many(timings)
+        if self.server_timing:
+            value = server_timing(timings)
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = f"{existing}, {value}" if existing else value
         return response
 
+    def blocked_response(self):
+        return HttpResponseForbidden("Access Denied: Your IP address has been blocked.")
+
+    def get_log_fields(self, request, ip_address, geo_data, sample_weight=1.0):
+        return {
+            "ip_address": ip_address,
+            "path": request.path,
+            "method": request.method,
+            "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+            "country": geo_data.get("country"),
+            "city": geo_data.get("city"),
+            "latitude": geo_data.get("latitude"),
+            "longitude": geo_data.get("longitude"),
+            "sample_weight": sample_weight,
+        }
+
+    def should_geolocate(self, ip_address):
+        return not self.defer_geolocation and not is_private_ip(ip_address)
+
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(",")[0]
+        return get_client_ip(request)
+
+
+class RateLimitMiddleware:
+    """
+    Site-wide GCRA rate limiting driven by the ``RATELIMIT_RULES`` setting.
+
+    The longest matching path prefix picks the rule. Its rate is fixed, or
+    chosen per identity tier by the group's ``RATELIMIT_GROUP_HANDLERS``
+    function. Authenticated users are limited per account, anonymous
+    clients per IP: ``REMOTE_ADDR``, or behind ``RATELIMIT_TRUSTED_PROXIES``
+    proxies the address the outermost one saw, never a client-supplied
+    ``X-Forwarded-For`` entry. Each check is a single atomic Redis call (see
+    ``ip_tracking.ratelimit``); over-limit requests get a 429 with
+    ``Retry-After``. Must come after ``AuthenticationMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "RATELIMIT_ENABLE", True)
+        self.rules = load_rules()
+        self.trusted_proxies = getattr(settings, "RATELIMIT_TRUSTED_PROXIES", 0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        rule = self.match(request)
+        wait = self.check(request, rule) if rule is not None else 0
+        if wait:
+            return self.limited_response(wait)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Matching stays on the event loop; only requests under a rule
+        # need request.user and the limiter, which may block
+        rule = self.match(request)
+        wait = await sync_to_async(self.check)(request, rule) if rule is not None else 0
+        if wait:
+            return self.limited_response(wait)
+        return await self.get_response(request)
+
+    def match(self, request):
+        """The rule limiting this request, or None"""
+        if not self.enabled:
+            return None
+        return next((rule for rule in self.rules if rule.applies_to(request)), None)
+
+    def check(self, request, rule):
+        """Seconds the request must wait under ``rule``, or 0 if it may proceed"""
+        if request.user.is_authenticated:
+            identity = f"user:{request.user.pk}"
         else:
-            ip = request.META.get("REMOTE_ADDR")
-        return ip
+            identity = f"ip:{self.get_client_ip(request)}"
+        rate = rule.get_rate(request, identity)
+        if not rate:
+            return 0
+        count, period = parse_rate(rate)
+        return get_rate_limiter().hit(
+            f"{KEY_PREFIX}:{rule.group}:{identity}", count, period
+        )
+
+    def get_client_ip(self, request):
+        """
+        The address the outermost trusted proxy received the request from.
+        Each proxy appends its peer to ``X-Forwarded-For``, so only the last
+        ``trusted_proxies`` entries can be believed.
+        """
+        if self.trusted_proxies:
+            forwarded = [
+                ip.strip()
+                for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+                if ip.strip()
+            ]
+            if len(forwarded) >= self.trusted_proxies:
+                return forwarded[-self.trusted_proxies]
+        return request.META.get("REMOTE_ADDR")
+
+    def limited_response(self, wait):
+        response = JsonResponse(
+            {"error": "Rate limit exceeded. Please try again later."}, status=429
+        )
+        response["Retry-After"] = retry_after_header(wait)
+        return response
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(",")[0].strip()
+    else:
+        ip = request.META.get("REMOTE_ADDR")
+    return ip
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0005_suspiciousip"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="requestlog",
+            name="sample_weight",
+            field=models.FloatField(
+                default=1.0, help_text="Number of requests this sampled row stands for"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0006_requestlog_sample_weight"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcessingCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("position", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Processing Cursor",
+                "verbose_name_plural": "Processing Cursors",
+            },
+        ),
+        migrations.CreateModel(
+            name="RequestRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ip_address", models.GenericIPAddressField()),
+                ("bucket", models.DateTimeField(help_text="Start of the minute")),
+                (
+                    "path_class",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("request_count", models.FloatField(default=0)),
+            ],
+            options={
+                "verbose_name": "Request Rollup",
+                "verbose_name_plural": "Request Rollups",
+                "ordering": ["-bucket"],
+                "indexes": [
+                    models.Index(
+                        fields=["ip_address", "bucket"],
+                        name="ip_tracking_ip_addr_b1f44f_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("bucket", "ip_address", "path_class"),
+                        name="unique_request_rollup_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0007_requestrollup_processingcursor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blockedip",
+            name="block_count",
+            field=models.PositiveIntegerField(
+                default=1, help_text="How many times this IP has been blocked"
+            ),
+        ),
+        migrations.AddField(
+            model_name="blockedip",
+            name="expires_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the block lapses; empty is permanent",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blockedip",
+            index=models.Index(
+                fields=["is_active", "expires_at"],
+                name="ip_tracking_is_acti_5ab8b3_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0008_blockedip_expiry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BlockedNetwork",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "network",
+                    models.CharField(
+                        help_text="CIDR, e.g. 203.0.113.0/24",
+                        max_length=43,
+                        unique=True,
+                    ),
+                ),
+                ("network_start", models.BinaryField(max_length=16)),
+                ("network_end", models.BinaryField(max_length=16)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "reason",
+                    models.TextField(
+                        blank=True,
+                        help_text="Reason for blocking this network",
+                        null=True,
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True, help_text="Whether this network block is active"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Blocked Network",
+                "verbose_name_plural": "Blocked Networks",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["is_active", "network_start"],
+                        name="ip_tracking_is_acti_829ad9_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:39
+
+import ip_tracking.fields
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 2000
+
+
+def backfill_packed_ips(apps, schema_editor):
+    """Fill ip_packed in primary-key chunks, each committed on its own"""
+    for model_name in ("RequestLog", "BlockedIP", "SuspiciousIP"):
+        model = apps.get_model("ip_tracking", model_name)
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(id__gt=last_id, ip_packed__isnull=True)
+                .order_by("id")
+                .values_list("id", "ip_address")[:BACKFILL_CHUNK_SIZE]
+            )
+            if not rows:
+                break
+            model.objects.bulk_update(
+                [
+                    model(id=pk, ip_packed=ip_tracking.fields.pack_ip(ip_address))
+                    for pk, ip_address in rows
+                ],
+                ["ip_packed"],
+            )
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Let each backfill chunk commit separately instead of holding one
+    # transaction over the whole table
+    atomic = False
+
+    dependencies = [
+        ("ip_tracking", "0009_blockednetwork"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="requestlog",
+            name="ip_tracking_ip_addr_3489f7_idx",
+        ),
+        migrations.AddField(
+            model_name="blockedip",
+            name="ip_packed",
+            field=ip_tracking.fields.PackedIPField(
+                help_text="16-byte form of ip_address", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="ip_packed",
+            field=ip_tracking.fields.PackedIPField(
+                help_text="16-byte form of ip_address", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="suspiciousip",
+            name="ip_packed",
+            field=ip_tracking.fields.PackedIPField(
+                help_text="16-byte form of ip_address", null=True
+            ),
+        ),
+        # Build the indexes after the backfill rather than maintaining them
+        # row by row during it
+        migrations.RunPython(backfill_packed_ips, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="blockedip",
+            index=models.Index(
+                fields=["ip_packed"], name="ip_tracking_ip_pack_38b8f5_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["ip_packed"], name="ip_tracking_ip_pack_230f31_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="suspiciousip",
+            index=models.Index(
+                fields=["ip_packed"], name="ip_tracking_ip_pack_29d83b_idx"
+            ),
+        ),
+    ]
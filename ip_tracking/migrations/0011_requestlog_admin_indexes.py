@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0010_packed_ip_addresses"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["timestamp", "id"], name="ip_tracking_timesta_327e09_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["path"],
+                name="ip_tracking_path_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        # Dropped last so time-range queries always have an index to use
+        migrations.RemoveIndex(
+            model_name="requestlog",
+            name="ip_tracking_timesta_b1bb90_idx",
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ip_tracking", "0011_requestlog_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrafficRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField(help_text="Start of the minute")),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("total", "All requests"),
+                            ("path", "Path"),
+                            ("country", "Country"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("value", models.CharField(blank=True, default="", max_length=255)),
+                ("request_count", models.FloatField(default=0)),
+            ],
+            options={
+                "verbose_name": "Traffic Rollup",
+                "verbose_name_plural": "Traffic Rollups",
+                "ordering": ["-bucket"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "bucket", "value"),
+                        name="unique_traffic_rollup_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,15 +1,20 @@
 # ip_tracking/models.py
-from datetime import timedelta
+import ipaddress
+import logging
 
-from django.conf import settings
-from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Count
 from django.utils import timezone
-from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from ip_tracking.blocklist import blocklist, suspicious_ips
+from ip_tracking.fields import PackedIPField
+from ip_tracking.geocache import get_geolocation_cache
+from ip_tracking.geolocation import get_geolocation_provider
+from ip_tracking.iputils import network_to_bytes
+
+logger = logging.getLogger(__name__)
+
 
 class RequestLog(models.Model):
     """
@@ -18,6 +23,7 @@ class RequestLog(models.Model):
     """
 
     ip_address = models.GenericIPAddressField()
+    ip_packed = PackedIPField(null=True, help_text="16-byte form of ip_address")
     path = models.CharField(max_length=255)
     timestamp = models.DateTimeField(default=timezone.now)
     method = models.CharField(max_length=10)
@@ -26,15 +32,27 @@ class RequestLog(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    sample_weight = models.FloatField(
+        default=1.0, help_text="Number of requests this sampled row stands for"
+    )
 
     class Meta:
         ordering = ["-timestamp"]
         verbose_name = "Request Log"
         verbose_name_plural = "Request Logs"
         indexes = [
-            models.Index(fields=["ip_address"]),
+            # Fixed-width key; serves per-IP lookups and subnet ranges
+            models.Index(fields=["ip_packed"]),
             models.Index(fields=["country", "city"]),
-            models.Index(fields=["timestamp"]),
+            # Matches the admin's keyset order and serves time ranges
+            models.Index(fields=["timestamp", "id"]),
+            # Prefix searches on path (LIKE 'x%' needs pattern ops on
+            # PostgreSQL; other backends ignore the opclass)
+            models.Index(
+                fields=["path"],
+                name="ip_tracking_path_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
         ]
 
     def __str__(self):
@@ -42,41 +60,43 @@ class RequestLog(models.Model):
 
     @classmethod
     def get_geolocation_data(cls, ip_address):
-        """Get geolocation data from cache or API"""
-        cache_key = f"ip_geo_{ip_address}"
-        geo_data = cache.get(cache_key)
-
-        if geo_data is None:
-            try:
-                import requests
-
-                # Using ip-api.com (free tier)
-                response = requests.get(
-                    f"http://ip-api.com/json/{ip_address}?fields=status,message,country,city,lat,lon"
-                )
-                data = response.json()
-
-                if data.get("status") == "success":
-                    geo_data = {
-                        "country": data.get("country"),
-                        "city": data.get("city"),
-                        "latitude": data.get("lat"),
-                        "longitude": data.get("lon"),
-                    }
-                    # Cache for 24 hours
-                    cache.set(cache_key, geo_data, 60 * 60 * 24)
-                else:
-                    geo_data = {}
-
-            except Exception as e:
-                # Log error but don't fail the request
-                import logging
-
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to get geolocation for {ip_address}: {str(e)}")
-                geo_data = {}
-
-        return geo_data
+        """Get geolocation data from cache or the configured provider"""
+        provider = get_geolocation_provider()
+        if provider.cacheable:
+            return get_geolocation_cache().get(ip_address, provider.lookup)
+
+        try:
+            return provider.lookup(ip_address)
+        except Exception as e:
+            # Log error but don't fail the request
+            logger.error(f"Failed to get geolocation for {ip_address}: {str(e)}")
+            return {}
+
+    @classmethod
+    def get_geolocation_data_many(cls, ip_addresses, raise_errors=False):
+        """
+        Batched get_geolocation_data: returns ``{ip_address: geo_data}``
+        for the addresses that resolved, using one cache round-trip and
+        batched provider calls for the misses.
+
+        Provider errors are logged and leave the addresses out, like "no
+        data" answers; with ``raise_errors`` they propagate instead, so a
+        missing address is known to have no data.
+        """
+        provider = get_geolocation_provider()
+        if provider.cacheable:
+            results = get_geolocation_cache().get_many(
+                ip_addresses, provider.lookup_many, raise_errors=raise_errors
+            )
+            return {ip: geo_data for ip, geo_data in results.items() if geo_data}
+
+        try:
+            return provider.lookup_many(ip_addresses)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Failed to get geolocation for {len(ip_addresses)} IPs: {e}")
+            return {}
 
 
 class BlockedIP(models.Model):
@@ -86,6 +106,7 @@ class BlockedIP(models.Model):
     """
 
     ip_address = models.GenericIPAddressField(unique=True)
+    ip_packed = PackedIPField(null=True, help_text="16-byte form of ip_address")
     created_at = models.DateTimeField(auto_now_add=True)
     reason = models.TextField(
         blank=True, null=True, help_text="Reason for blocking this IP"
@@ -93,15 +114,34 @@ class BlockedIP(models.Model):
     is_active = models.BooleanField(
         default=True, help_text="Whether this IP block is active"
     )
+    expires_at = models.DateTimeField(
+        blank=True, null=True, help_text="When the block lapses; empty is permanent"
+    )
+    block_count = models.PositiveIntegerField(
+        default=1, help_text="How many times this IP has been blocked"
+    )
 
     class Meta:
         verbose_name = "Blocked IP"
         verbose_name_plural = "Blocked IPs"
         ordering = ["-created_at"]
+        indexes = [
+            # Upcoming expirations, scanned in order by expire_blocks()
+            models.Index(fields=["is_active", "expires_at"]),
+            models.Index(fields=["ip_packed"]),
+        ]
 
     def __str__(self):
         return f"{self.ip_address} (Blocked at: {self.created_at})"
 
+    @classmethod
+    def active(cls, at=None):
+        """Blocks in force at ``at`` (default now)"""
+        at = at or timezone.now()
+        return cls.objects.filter(is_active=True).filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=at)
+        )
+
     def save(self, *args, **kwargs):
         # Validate IP address
         try:
@@ -109,6 +149,61 @@ class BlockedIP(models.Model):
         except ValidationError as e:
             raise ValidationError(_(f"Invalid IP address: {self.ip_address}")) from e
         super().save(*args, **kwargs)
+        blocklist.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        blocklist.invalidate()
+        return result
+
+
+class BlockedNetwork(models.Model):
+    """
+    A blocked IPv4 or IPv6 network in CIDR notation. The first and last
+    addresses are stored in 16-byte form so the blocklist can load the
+    active ranges already sorted.
+    """
+
+    network = models.CharField(
+        max_length=43, unique=True, help_text="CIDR, e.g. 203.0.113.0/24"
+    )
+    network_start = models.BinaryField(max_length=16, editable=False)
+    network_end = models.BinaryField(max_length=16, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reason = models.TextField(
+        blank=True, null=True, help_text="Reason for blocking this network"
+    )
+    is_active = models.BooleanField(
+        default=True, help_text="Whether this network block is active"
+    )
+
+    class Meta:
+        verbose_name = "Blocked Network"
+        verbose_name_plural = "Blocked Networks"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["is_active", "network_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.network} (Blocked at: {self.created_at})"
+
+    def clean(self):
+        try:
+            self.network = str(ipaddress.ip_network(self.network, strict=False))
+        except ValueError:
+            raise ValidationError({"network": _("Enter a valid CIDR network.")})
+
+    def save(self, *args, **kwargs):
+        self.full_clean(exclude=["network_start", "network_end"])
+        self.network_start, self.network_end = network_to_bytes(self.network)
+        super().save(*args, **kwargs)
+        blocklist.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        blocklist.invalidate()
+        return result
 
 
 class SuspiciousIP(models.Model):
@@ -118,6 +213,7 @@ class SuspiciousIP(models.Model):
         MULTIPLE_VIOLATIONS = "multiple", "Multiple violations"
 
     ip_address = models.GenericIPAddressField(unique=True)
+    ip_packed = PackedIPField(null=True, help_text="16-byte form of ip_address")
     reason = models.CharField(max_length=20, choices=SuspicionReason.choices)
     first_detected = models.DateTimeField(auto_now_add=True)
     last_detected = models.DateTimeField(auto_now=True)
@@ -128,70 +224,121 @@ class SuspiciousIP(models.Model):
         verbose_name = "Suspicious IP"
         verbose_name_plural = "Suspicious IPs"
         ordering = ["-last_detected"]
+        indexes = [
+            models.Index(fields=["ip_packed"]),
+        ]
 
     def __str__(self):
         return f"{self.ip_address} - {self.get_reason_display()}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        suspicious_ips.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        suspicious_ips.invalidate()
+        return result
+
     @classmethod
     def detect_suspicious_activity(cls):
         """
         Detects suspicious IPs based on request patterns
         """
-        from ip_tracking.models import RequestLog
+        from ip_tracking.detection import detect_suspicious_activity
 
-        one_hour_ago = now() - timedelta(hours=1)
+        return detect_suspicious_activity()
 
-        # Detect high volume requests
-        high_volume_ips = (
-            RequestLog.objects.filter(timestamp__gte=one_hour_ago)
-            .values("ip_address")
-            .annotate(request_count=Count("id"))
-            .filter(request_count__gt=100)
-            .values_list("ip_address", flat=True)
-        )
 
-        for ip in high_volume_ips:
-            cls.objects.update_or_create(
-                ip_address=ip,
-                defaults={
-                    "reason": cls.SuspicionReason.HIGH_REQUEST_VOLUME,
-                    "details": {
-                        "request_count": RequestLog.objects.filter(
-                            ip_address=ip, timestamp__gte=one_hour_ago
-                        ).count()
-                    },
-                    "is_active": True,
-                },
-            )
+class RequestRollup(models.Model):
+    """
+    Per-minute request totals for each IP and path class, folded in
+    incrementally from RequestLog by ``compact_request_logs``.
+
+    ``path_class`` is the matched entry of ``SENSITIVE_PATHS`` for
+    sensitive requests and empty for everything else. ``request_count``
+    is the sum of the rows' sample weights.
+    """
+
+    ip_address = models.GenericIPAddressField()
+    bucket = models.DateTimeField(help_text="Start of the minute")
+    path_class = models.CharField(max_length=255, blank=True, default="")
+    request_count = models.FloatField(default=0)
 
-        # Detect access to sensitive paths
-        sensitive_paths = getattr(settings, "SENSITIVE_PATHS", ["/admin/", "/login/"])
-        suspicious_path_ips = (
-            RequestLog.objects.filter(
-                timestamp__gte=one_hour_ago, path__in=sensitive_paths
+    class Meta:
+        verbose_name = "Request Rollup"
+        verbose_name_plural = "Request Rollups"
+        ordering = ["-bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "ip_address", "path_class"],
+                name="unique_request_rollup_bucket",
             )
-            .values_list("ip_address", flat=True)
-            .distinct()
-        )
+        ]
+        indexes = [
+            models.Index(fields=["ip_address", "bucket"]),
+        ]
+
+    def __str__(self):
+        return f"{self.ip_address} - {self.bucket} - {self.request_count}"
+
 
-        for ip in suspicious_path_ips:
-            cls.objects.update_or_create(
-                ip_address=ip,
-                defaults={
-                    "reason": cls.SuspicionReason.SENSITIVE_PATH,
-                    "details": {
-                        "paths_accessed": list(
-                            RequestLog.objects.filter(
-                                ip_address=ip,
-                                timestamp__gte=one_hour_ago,
-                                path__in=sensitive_paths,
-                            )
-                            .values_list("path", flat=True)
-                            .distinct()
-                        )
-                    },
-                    "is_active": True,
-                },
+class TrafficRollup(models.Model):
+    """
+    Per-minute request totals along one reporting dimension, folded in
+    alongside RequestRollup and read by the analytics API.
+
+    ``value`` is the path or country for those dimensions and empty for
+    ``TOTAL``. Country is as known when the rows are folded, so rows
+    still awaiting deferred geolocation count under an empty country.
+    """
+
+    class Dimension(models.TextChoices):
+        TOTAL = "total", _("All requests")
+        PATH = "path", _("Path")
+        COUNTRY = "country", _("Country")
+
+    bucket = models.DateTimeField(help_text="Start of the minute")
+    dimension = models.CharField(max_length=10, choices=Dimension.choices)
+    value = models.CharField(max_length=255, blank=True, default="")
+    request_count = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = "Traffic Rollup"
+        verbose_name_plural = "Traffic Rollups"
+        ordering = ["-bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "bucket", "value"],
+                name="unique_traffic_rollup_bucket",
             )
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.value} - {self.bucket} - {self.request_count}"
+
 
-        return cls.objects.filter(is_active=True).count()
+class ProcessingCursor(models.Model):
+    """Persisted watermark of an incremental job over RequestLog ids"""
+
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Processing Cursor"
+        verbose_name_plural = "Processing Cursors"
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+    @classmethod
+    def get_position(cls, name):
+        return (
+            cls.objects.filter(name=name).values_list("position", flat=True).first()
+            or 0
+        )
+
+    @classmethod
+    def set_position(cls, name, position):
+        cls.objects.update_or_create(name=name, defaults={"position": position})
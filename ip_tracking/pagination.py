@@ -0,0 +1,106 @@
+# ip_tracking/pagination.py
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "cursor"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than ``count_cap`` rows.
+
+    Small results are counted exactly. Past the cap, an unfiltered table
+    on PostgreSQL reports the planner's row estimate, and anything else
+    reports ``count_cap`` itself, so ``count >= count_cap`` means "at
+    least this many".
+    """
+
+    def __init__(self, *args, count_cap=10000, **kwargs):
+        self.count_cap = count_cap
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        capped = queryset.order_by().values("pk")[: self.count_cap].count()
+        if capped < self.count_cap:
+            return capped
+        return max(self._estimate(queryset) or 0, self.count_cap)
+
+    def _estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Admin changelist paged by a ``(timestamp, id)`` cursor instead of an
+    OFFSET, so every page costs the same however deep it is. Expects the
+    admin to order by ``("-timestamp", "-id")`` and disable column sorting.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = parse_cursor(request.GET.get(CURSOR_VAR))
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+        # Filter and search links always start again from the newest rows
+        self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.cursor is not None:
+            timestamp, pk = self.cursor
+            queryset = queryset.filter(
+                Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk)
+            )
+        return queryset
+
+    def get_results(self, request):
+        self.page_num = 1
+        super().get_results(request)
+        self.result_list = list(self.result_list[: self.list_per_page])
+        self.result_count_is_estimate = self.result_count >= self.model_admin.count_cap
+        if len(self.result_list) == self.list_per_page:
+            last = self.result_list[-1]
+            self.next_cursor = f"{last.timestamp.isoformat()}_{last.pk}"
+
+    @property
+    def newest_page_query(self):
+        return self.get_query_string(remove=[CURSOR_VAR])
+
+    @property
+    def next_page_query(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+def parse_cursor(value):
+    """Parse a ``<iso timestamp>_<id>`` cursor; None if absent or invalid"""
+    if not value:
+        return None
+    timestamp, _, pk = value.rpartition("_")
+    try:
+        parsed = parse_datetime(timestamp)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if parsed is None:
+        return None
+    return parsed, pk
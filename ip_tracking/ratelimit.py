@@ -0,0 +1,187 @@
+# ip_tracking/ratelimit.py
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RATE_PATTERN = re.compile(r"^(\d+)/(\d*)([smhd])$")
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+KEY_PREFIX = "ip_tracking_rl"
+
+# GCRA over a stored "theoretical arrival time" (TAT), in milliseconds of
+# Redis server time so every worker shares one clock. A request is allowed
+# if it arrives no earlier than TAT + interval - period; allowing it moves
+# TAT forward by one interval. Returns the wait in ms, 0 when allowed.
+GCRA_SCRIPT = """
+local period = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+local tat = tonumber(redis.call("GET", KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local wait = new_tat - period - now
+if wait > 0 then
+    return math.ceil(wait)
+end
+redis.call("SET", KEYS[1], string.format("%.3f", new_tat),
+    "PX", math.ceil(new_tat - now))
+return 0
+"""
+
+
+def parse_rate(rate):
+    """Parse ``"5/m"`` or ``"100/10s"`` into ``(count, period_seconds)``"""
+    match = RATE_PATTERN.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate: {rate}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+class LocalRateLimiter:
+    """
+    In-process GCRA limiter used when the rate-limit cache is not Redis.
+    Limits are then enforced per worker process. Past ``max_keys`` the
+    least recently limited key is forgotten.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, count, period):
+        """Record one request; returns seconds to wait, 0 if allowed"""
+        interval = period / count
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            wait = tat + interval - period - now
+            if wait > 0:
+                # Clients being denied are the ones that must not be forgotten
+                self._tats.move_to_end(key)
+                return wait
+            self._tats[key] = tat + interval
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return 0
+
+
+class RedisRateLimiter:
+    """GCRA limiter doing one atomic EVALSHA round-trip per check"""
+
+    def __init__(self, client):
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    def hit(self, key, count, period):
+        wait_ms = self._script(keys=[key], args=[period * 1000, period * 1000 / count])
+        return int(wait_ms) / 1000
+
+
+class RateLimitRule:
+    """Limit for requests under ``prefix``, shared by every rule in ``group``"""
+
+    def __init__(self, prefix, group, rate=None, methods=None):
+        self.prefix = prefix
+        self.group = group
+        self.methods = {method.upper() for method in methods} if methods else None
+        self.rate = rate
+        self.handler = None
+        if rate is None:
+            handlers = getattr(settings, "RATELIMIT_GROUP_HANDLERS", {})
+            if group not in handlers:
+                raise ValueError(f"Rate limit group {group} has no rate or handler")
+            self.handler = import_string(handlers[group])
+
+    def applies_to(self, request):
+        return request.path.startswith(self.prefix) and (
+            self.methods is None or request.method in self.methods
+        )
+
+    def get_rate(self, request, identity):
+        """Fixed rate, or the group handler's choice for this identity tier"""
+        if self.handler is None:
+            return self.rate
+        return self.handler(
+            request, group=self.group, key=identity, rate=None, method=request.method
+        )
+
+
+def load_rules():
+    """Compile ``RATELIMIT_RULES``, longest prefix first"""
+    rules = [
+        RateLimitRule(
+            prefix=config["PREFIX"],
+            group=config["GROUP"],
+            rate=config.get("RATE"),
+            methods=config.get("METHODS"),
+        )
+        for config in getattr(settings, "RATELIMIT_RULES", [])
+    ]
+    return sorted(rules, key=lambda rule: len(rule.prefix), reverse=True)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def is_shared():
+    """Whether ``RATELIMIT_USE_CACHE`` names a django-redis cache"""
+    alias = getattr(settings, "RATELIMIT_USE_CACHE", "default")
+    return settings.CACHES[alias]["BACKEND"].startswith("django_redis.")
+
+
+def get_rate_limiter():
+    """
+    Process-wide limiter: Redis-backed when ``RATELIMIT_USE_CACHE`` names
+    a django-redis cache, in-process otherwise.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if is_shared():
+                    from django_redis import get_redis_connection
+
+                    alias = getattr(settings, "RATELIMIT_USE_CACHE", "default")
+                    _limiter = RedisRateLimiter(get_redis_connection(alias))
+                else:
+                    logger.warning(
+                        "Rate limits are enforced per process: with N workers "
+                        "clients get N times the configured rate"
+                    )
+                    _limiter = LocalRateLimiter()
+    return _limiter
+
+
+def check_rate_limiter(app_configs, **kwargs):
+    """System check warning when rate limits are not shared by workers"""
+    if not getattr(settings, "RATELIMIT_ENABLE", True) or is_shared():
+        return []
+    return [
+        checks.Warning(
+            "Rate limits are enforced per worker process, so N workers allow "
+            "N times the configured rates.",
+            hint=(
+                "Set REDIS_CACHE_URL, or point RATELIMIT_USE_CACHE at a "
+                "django-redis cache."
+            ),
+            id="ip_tracking.W001",
+        )
+    ]
+
+
+def retry_after_header(wait):
+    return str(max(1, math.ceil(wait)))
@@ -0,0 +1,120 @@
+# ip_tracking/retention.py
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from ip_tracking.export import DATASETS
+from ip_tracking.models import ProcessingCursor, RequestLog
+from ip_tracking.rollups import ROLLUP_CURSOR
+
+# Same columns as `export_logs requests`; ip_packed is derived and binary
+ARCHIVED_FIELDS = DATASETS["requests"][2]
+
+
+def archive_request_logs(
+    older_than=None,
+    archive_dir=None,
+    batch_size=None,
+    max_rows_per_second=None,
+    max_batches=None,
+    archive=True,
+):
+    """
+    Move RequestLog rows older than ``older_than`` (default
+    ``REQUEST_LOG_RETENTION_DAYS``) out of the table.
+
+    Rows are taken in primary-key order, ``batch_size`` at a time. Each
+    batch is written to gzipped NDJSON under ``archive_dir/YYYY-MM-DD/``
+    (one file per day and batch, named by id range) and then deleted by
+    primary key in its own short transaction. Since archived rows are
+    gone, an interrupted run simply picks up where it stopped; a batch
+    whose file was written but not deleted is rewritten to the same name.
+    Rows not yet folded into RequestRollup are left alone.
+
+    ``max_rows_per_second`` throttles the job by sleeping between batches.
+    Returns a dict of counters including ``rows_per_second``.
+    """
+    if older_than is None:
+        older_than = timedelta(days=getattr(settings, "REQUEST_LOG_RETENTION_DAYS", 30))
+    archive_dir = Path(
+        archive_dir
+        or getattr(settings, "REQUEST_LOG_ARCHIVE_DIR", settings.BASE_DIR / "archive")
+    )
+    batch_size = batch_size or getattr(settings, "REQUEST_LOG_PURGE_BATCH_SIZE", 5000)
+    if max_rows_per_second is None:
+        max_rows_per_second = getattr(
+            settings, "REQUEST_LOG_PURGE_MAX_ROWS_PER_SECOND", None
+        )
+
+    cutoff = timezone.now() - older_than
+    folded_upto = ProcessingCursor.get_position(ROLLUP_CURSOR)
+    expired = RequestLog.objects.filter(
+        timestamp__lt=cutoff, id__lte=folded_upto
+    ).order_by("id")
+
+    started = time.monotonic()
+    stats = {"archived": 0, "deleted": 0, "files": 0, "batches": 0}
+    while not max_batches or stats["batches"] < max_batches:
+        rows = list(expired.values(*ARCHIVED_FIELDS)[:batch_size])
+        if not rows:
+            break
+
+        if archive:
+            stats["archived"] += len(rows)
+            stats["files"] += _write_archive(archive_dir, rows)
+
+        ids = [row["id"] for row in rows]
+        with transaction.atomic():
+            deleted, _ = RequestLog.objects.filter(id__in=ids).delete()
+        stats["deleted"] += deleted
+        stats["batches"] += 1
+
+        if max_rows_per_second:
+            # Sleep off any lead over the allowed average rate
+            ahead = stats["deleted"] / max_rows_per_second - (
+                time.monotonic() - started
+            )
+            if ahead > 0:
+                time.sleep(ahead)
+
+    stats["elapsed"] = time.monotonic() - started
+    stats["rows_per_second"] = (
+        stats["deleted"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    )
+    return stats
+
+
+def _write_archive(archive_dir, rows):
+    """Write ``rows`` to one gzipped NDJSON file per day; returns the file count"""
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row["timestamp"].date(), []).append(row)
+
+    for day, day_rows in by_day.items():
+        partition = archive_dir / day.isoformat()
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / (
+            f"request_logs_{day_rows[0]['id']}_{day_rows[-1]['id']}.ndjson.gz"
+        )
+        temp_path = path.with_name(path.name + ".tmp")
+        try:
+            with open(temp_path, "wb") as raw:
+                with gzip.open(raw, "wt", encoding="utf-8") as f:
+                    for row in day_rows:
+                        f.write(json.dumps(row, cls=DjangoJSONEncoder))
+                        f.write("\n")
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+    return len(by_day)
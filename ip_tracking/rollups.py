@@ -0,0 +1,148 @@
+# ip_tracking/rollups.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+from ip_tracking.models import (
+    ProcessingCursor,
+    RequestLog,
+    RequestRollup,
+    TrafficRollup,
+)
+
+ROLLUP_CURSOR = "request_rollup"
+
+
+def sensitive_paths():
+    return list(getattr(settings, "SENSITIVE_PATHS", ["/admin/", "/login/"]))
+
+
+def compact_request_logs(batch_size=None, max_batches=None):
+    """
+    Fold RequestLog rows past the stored watermark into RequestRollup.
+
+    Rows are consumed in id order, ``batch_size`` at a time. Only rows
+    older than ``REQUEST_ROLLUP_SETTLE_SECONDS`` are taken, so inserts that
+    commit slightly out of id order (write-behind flushes from several
+    workers) are not skipped. Returns the number of rows folded in.
+    """
+    batch_size = batch_size or getattr(settings, "REQUEST_ROLLUP_BATCH_SIZE", 50000)
+    settle = timedelta(seconds=getattr(settings, "REQUEST_ROLLUP_SETTLE_SECONDS", 10))
+
+    position = ProcessingCursor.get_position(ROLLUP_CURSOR)
+    settled_upto = (
+        RequestLog.objects.filter(
+            id__gt=position, timestamp__lte=timezone.now() - settle
+        )
+        .order_by()
+        .aggregate(last_id=Max("id"))["last_id"]
+    )
+    if settled_upto is None:
+        return 0
+
+    folded = 0
+    batches = 0
+    while not max_batches or batches < max_batches:
+        with transaction.atomic():
+            # Row lock so concurrent runs cannot fold the same range twice
+            cursor, _ = ProcessingCursor.objects.select_for_update().get_or_create(
+                name=ROLLUP_CURSOR
+            )
+            if cursor.position >= settled_upto:
+                break
+            upper = min(cursor.position + batch_size, settled_upto)
+            folded += _fold_range(cursor.position, upper)
+            cursor.position = upper
+            cursor.save(update_fields=["position", "updated_at"])
+        batches += 1
+
+    _purge_expired_rollups()
+    return folded
+
+
+def _fold_range(lower, upper):
+    """Add the RequestLog rows with lower < id <= upper to the rollups"""
+    paths = sensitive_paths()
+    rows = RequestLog.objects.filter(id__gt=lower, id__lte=upper).order_by()
+    totals = (
+        rows.annotate(
+            bucket=TruncMinute("timestamp"),
+            path_class=Case(
+                When(path__in=paths, then=F("path")),
+                default=Value(""),
+            ),
+        )
+        .values("ip_address", "bucket", "path_class")
+        .annotate(total=Sum("sample_weight"), rows=Count("id"))
+    )
+    increments = {}
+    folded = 0
+    for row in totals:
+        increments[(row["bucket"], row["ip_address"], row["path_class"])] = row["total"]
+        folded += row["rows"]
+    _merge_increments(RequestRollup, ("bucket", "ip_address", "path_class"), increments)
+
+    # Per-dimension totals for the analytics API
+    traffic = {}
+    minutes = rows.annotate(bucket=TruncMinute("timestamp"))
+    for dimension, field in (
+        (TrafficRollup.Dimension.PATH, "path"),
+        (TrafficRollup.Dimension.COUNTRY, "country"),
+    ):
+        for row in minutes.values("bucket", field).annotate(total=Sum("sample_weight")):
+            key = (row["bucket"], dimension.value, row[field] or "")
+            traffic[key] = traffic.get(key, 0) + row["total"]
+    # Every row has exactly one country, so its totals double as the total
+    for (bucket, dimension, _), total in list(traffic.items()):
+        if dimension == TrafficRollup.Dimension.COUNTRY:
+            key = (bucket, TrafficRollup.Dimension.TOTAL.value, "")
+            traffic[key] = traffic.get(key, 0) + total
+    _merge_increments(TrafficRollup, ("bucket", "dimension", "value"), traffic)
+    return folded
+
+
+def _merge_increments(model, key_fields, increments):
+    """
+    Add ``{key: amount}`` to ``model.request_count``, where each key holds
+    the values of ``key_fields`` (starting with ``bucket``). Existing rows
+    are read and updated, and missing ones created, 500 keys at a time.
+    """
+    keys = list(increments)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start : start + 500]
+        lookups = {
+            f"{field}__in": {key[index] for key in chunk}
+            for index, field in enumerate(key_fields[1:], start=1)
+        }
+        existing = {
+            tuple(getattr(row, field) for field in key_fields): row
+            for row in model.objects.filter(
+                bucket__gte=min(key[0] for key in chunk),
+                bucket__lte=max(key[0] for key in chunk),
+                **lookups,
+            )
+        }
+        to_update = []
+        to_create = []
+        for key in chunk:
+            row = existing.get(key)
+            if row is None:
+                to_create.append(
+                    model(**dict(zip(key_fields, key)), request_count=increments[key])
+                )
+            else:
+                row.request_count += increments[key]
+                to_update.append(row)
+        model.objects.bulk_create(to_create)
+        model.objects.bulk_update(to_update, ["request_count"])
+
+
+def _purge_expired_rollups():
+    days = getattr(settings, "REQUEST_ROLLUP_RETENTION_DAYS", 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    RequestRollup.objects.filter(bucket__lt=cutoff).delete()
+    TrafficRollup.objects.filter(bucket__lt=cutoff).delete()
@@ -0,0 +1,190 @@
+# ip_tracking/streaming.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class _IPWindow:
+    """Ring of per-bucket request counts for one IP"""
+
+    __slots__ = ("counts", "last_bucket", "total", "over_threshold", "paths")
+
+    def __init__(self, size, bucket):
+        self.counts = [0.0] * size
+        self.last_bucket = bucket
+        self.total = 0.0
+        self.over_threshold = False
+        self.paths = set()
+
+    def add(self, bucket, weight):
+        size = len(self.counts)
+        elapsed = bucket - self.last_bucket
+        if elapsed >= size:
+            self.counts = [0.0] * size
+            self.total = 0.0
+        elif elapsed > 0:
+            # Each slot is cleared once per pass, so this is O(1) amortized
+            for expired in range(self.last_bucket + 1, bucket + 1):
+                slot = expired % size
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0.0
+        if elapsed > 0:
+            self.last_bucket = bucket
+        self.counts[bucket % size] += weight
+        self.total += weight
+
+
+class StreamingDetector:
+    """
+    Per-process sliding-window anomaly detector fed by IPLoggingMiddleware.
+
+    Keeps a ring of ``window / bucket_seconds`` counters per IP, so each
+    request costs O(1), and tracks at most ``max_tracked_ips`` IPs,
+    evicting the least recently seen. An IP is reported as soon as its
+    windowed count crosses ``threshold`` (re-armed once it drops back
+    below) or it hits a sensitive path it has not hit before. Reports are
+    written to SuspiciousIP on a background thread, batched so the table
+    is written, and the suspicious-IP set invalidated, at most once per
+    ``flush_interval`` seconds however many IPs are reported.
+
+    Counts are per worker process; the batch detector remains the
+    authority on totals across workers.
+    """
+
+    def __init__(
+        self,
+        threshold,
+        sensitive_paths,
+        window_seconds=3600,
+        bucket_seconds=60,
+        max_tracked_ips=100000,
+        flush_interval=1.0,
+    ):
+        self.threshold = threshold
+        self.sensitive_paths = frozenset(sensitive_paths)
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(1, window_seconds // bucket_seconds)
+        self.max_tracked_ips = max_tracked_ips
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_flush = time.monotonic()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="streaming-detector"
+        )
+        self.evictions = 0
+
+    def observe(self, ip_address, path, weight=1.0, now=None):
+        """Record one request; returns the finding if it triggered one"""
+        bucket = int((now or time.time()) // self.bucket_seconds)
+        finding = None
+
+        with self._lock:
+            window = self._windows.get(ip_address)
+            if window is None:
+                window = self._windows[ip_address] = _IPWindow(self.buckets, bucket)
+                if len(self._windows) > self.max_tracked_ips:
+                    self._windows.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._windows.move_to_end(ip_address)
+            window.add(bucket, weight)
+
+            if window.total > self.threshold:
+                if not window.over_threshold:
+                    window.over_threshold = True
+                    finding = self._finding(window, high_volume=True)
+            else:
+                window.over_threshold = False
+
+            if path in self.sensitive_paths and path not in window.paths:
+                window.paths.add(path)
+                finding = self._finding(window, high_volume=window.over_threshold)
+
+        if finding is not None:
+            self._emit(ip_address, finding)
+        return finding
+
+    def tracked_ips(self):
+        return len(self._windows)
+
+    def _finding(self, window, high_volume):
+        from ip_tracking.models import SuspiciousIP
+
+        reasons = []
+        details = {"source": "streaming"}
+        if high_volume:
+            reasons.append(SuspiciousIP.SuspicionReason.HIGH_REQUEST_VOLUME)
+            details["request_count"] = window.total
+            details["threshold"] = self.threshold
+        if window.paths:
+            reasons.append(SuspiciousIP.SuspicionReason.SENSITIVE_PATH)
+            details["paths_accessed"] = sorted(window.paths)
+        return {"reasons": reasons, "details": details}
+
+    def _emit(self, ip_address, finding):
+        """Queue a finding; an IP's later findings replace its earlier ones"""
+        with self._pending_lock:
+            self._pending[ip_address] = finding
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._executor.submit(self._flush)
+
+    def _flush(self):
+        from ip_tracking.detection import upsert_suspicious_ips
+
+        # Findings arriving meanwhile join this batch
+        delay = self._last_flush + self.flush_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        with self._pending_lock:
+            findings, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        self._last_flush = time.monotonic()
+
+        try:
+            close_old_connections()
+            upsert_suspicious_ips(findings)
+        except Exception as e:
+            logger.error(f"Failed to record {len(findings)} suspicious IPs: {str(e)}")
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_streaming_detector():
+    """Process-wide detector, or None unless STREAMING_DETECTION_ENABLED"""
+    global _detector
+    if not getattr(settings, "STREAMING_DETECTION_ENABLED", False):
+        return None
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = StreamingDetector(
+                    threshold=getattr(settings, "SUSPICIOUS_REQUEST_THRESHOLD", 100),
+                    sensitive_paths=getattr(
+                        settings, "SENSITIVE_PATHS", ["/admin/", "/login/"]
+                    ),
+                    bucket_seconds=getattr(
+                        settings, "STREAMING_DETECTION_BUCKET_SECONDS", 60
+                    ),
+                    max_tracked_ips=getattr(
+                        settings, "STREAMING_DETECTION_MAX_TRACKED_IPS", 100000
+                    ),
+                    flush_interval=getattr(
+                        settings, "STREAMING_DETECTION_FLUSH_INTERVAL", 1.0
+                    ),
+                )
+    return _detector
@@ -1,13 +1,15 @@
 # ip_tracking/tasks.py
-from datetime import timedelta
-
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from django.db.models import Count
-from django.utils import timezone
 
-from ip_tracking.models import RequestLog, SuspiciousIP
+from ip_tracking.blocking import escalate_suspicious_ips, expire_blocks
+from ip_tracking.detection import detect_suspicious_activity as run_detection
+from ip_tracking.fields import ips_matching
+from ip_tracking.iputils import is_private_ip
+from ip_tracking.models import RequestLog
+from ip_tracking.retention import archive_request_logs
+from ip_tracking.rollups import compact_request_logs
 
 logger = get_task_logger(__name__)
 
@@ -16,78 +18,111 @@ logger = get_task_logger(__name__)
 def detect_suspicious_activity():
     """
     Celery task to detect and log suspicious IP activity.
-    Runs hourly to check for anomalies.
+    Runs every minute and only re-checks IPs with new requests.
     """
     try:
-        # Get the threshold from settings or use default (100 requests/hour)
-        request_threshold = getattr(settings, "SUSPICIOUS_REQUEST_THRESHOLD", 100)
-        sensitive_paths = getattr(settings, "SENSITIVE_PATHS", ["/admin/", "/login/"])
-
-        # Calculate time window (last hour)
-        one_hour_ago = timezone.now() - timedelta(hours=1)
-
-        # Detect high volume requests
-        high_volume_ips = (
-            RequestLog.objects.filter(timestamp__gte=one_hour_ago)
-            .values("ip_address")
-            .annotate(request_count=Count("id"))
-            .filter(request_count__gt=request_threshold)
-            .values_list("ip_address", flat=True)
-        )
+        suspicious_count = run_detection()
+        logger.info(f"Detected {suspicious_count} suspicious IPs")
 
-        # Log high volume IPs
-        for ip in high_volume_ips:
-            SuspiciousIP.objects.update_or_create(
-                ip_address=ip,
-                defaults={
-                    "reason": "high_volume",
-                    "details": {
-                        "request_count": RequestLog.objects.filter(
-                            ip_address=ip, timestamp__gte=one_hour_ago
-                        ).count(),
-                        "threshold": request_threshold,
-                        "detected_at": timezone.now().isoformat(),
-                    },
-                    "is_active": True,
-                },
-            )
-
-        # Detect access to sensitive paths
-        suspicious_path_ips = (
-            RequestLog.objects.filter(
-                timestamp__gte=one_hour_ago, path__in=sensitive_paths
-            )
-            .values_list("ip_address", flat=True)
-            .distinct()
-        )
+        if getattr(settings, "BLOCK_ESCALATION_ENABLED", False):
+            blocked = escalate_suspicious_ips()
+            logger.info(f"Escalated {blocked} suspicious IPs to temporary blocks")
 
-        # Log suspicious path access
-        for ip in suspicious_path_ips:
-            paths_accessed = list(
-                RequestLog.objects.filter(
-                    ip_address=ip, timestamp__gte=one_hour_ago, path__in=sensitive_paths
-                )
-                .values_list("path", flat=True)
-                .distinct()
-            )
-
-            SuspiciousIP.objects.update_or_create(
-                ip_address=ip,
-                defaults={
-                    "reason": "sensitive_path",
-                    "details": {
-                        "paths_accessed": paths_accessed,
-                        "detected_at": timezone.now().isoformat(),
-                    },
-                    "is_active": True,
-                },
-            )
-
-        # Get count of active suspicious IPs
-        suspicious_count = SuspiciousIP.objects.filter(is_active=True).count()
-        logger.info(f"Detected {suspicious_count} suspicious IPs")
         return suspicious_count
 
     except Exception as e:
         logger.error(f"Error in detect_suspicious_activity: {str(e)}", exc_info=True)
         raise
+
+
+@shared_task(name="expire_blocks")
+def expire_blocked_ips():
+    """
+    Celery task to deactivate temporary IP blocks that have lapsed.
+    """
+    expired = expire_blocks()
+    logger.info(f"Expired {expired} IP blocks")
+    return expired
+
+
+@shared_task(name="compact_request_rollups")
+def compact_request_rollups():
+    """
+    Celery task to fold new RequestLog rows into the per-minute
+    RequestRollup table read by detection and reporting.
+    """
+    folded = compact_request_logs()
+    logger.info(f"Folded {folded} request logs into rollups")
+    return folded
+
+
+@shared_task(name="purge_request_logs")
+def purge_request_logs():
+    """
+    Celery task to archive and delete RequestLog rows older than
+    REQUEST_LOG_RETENTION_DAYS.
+    """
+    stats = archive_request_logs()
+    logger.info(
+        f"Archived {stats['archived']} and deleted {stats['deleted']} request "
+        f"logs ({stats['rows_per_second']:.0f} rows/s)"
+    )
+    return stats
+
+
+@shared_task(name="enrich_request_log_geolocation")
+def enrich_request_log_geolocation(batch_size=None):
+    """
+    Celery task to fill in geolocation for RequestLog rows written with
+    GEOLOCATION_DEFERRED enabled.
+
+    Each distinct IP with un-enriched rows is resolved once, and IPs that
+    share a result are updated together. IPs the provider has no data for
+    get an empty country so they are not looked up again. If the provider
+    fails, only private IPs are updated; the rest stay NULL and are
+    retried on the next run.
+    """
+    batch_size = batch_size or getattr(
+        settings, "GEOLOCATION_ENRICHMENT_BATCH_SIZE", 1000
+    )
+
+    ips = list(
+        RequestLog.objects.filter(country__isnull=True)
+        .order_by()
+        .values_list("ip_address", flat=True)
+        .distinct()[:batch_size]
+    )
+
+    public_ips = [ip for ip in ips if not is_private_ip(ip)]
+    try:
+        resolved = RequestLog.get_geolocation_data_many(public_ips, raise_errors=True)
+    except Exception as e:
+        logger.error(
+            f"Geolocation lookup failed, retrying {len(public_ips)} IPs "
+            f"on the next run: {str(e)}"
+        )
+        ips = [ip for ip in ips if is_private_ip(ip)]
+        resolved = {}
+
+    # Group IPs by lookup result so each distinct result is one UPDATE
+    ips_by_result = {}
+    for ip in ips:
+        geo_data = resolved.get(ip, {})
+        result = (
+            geo_data.get("country") or "",
+            geo_data.get("city"),
+            geo_data.get("latitude"),
+            geo_data.get("longitude"),
+        )
+        ips_by_result.setdefault(result, []).append(ip)
+
+    updated = 0
+    for (country, city, latitude, longitude), result_ips in ips_by_result.items():
+        for start in range(0, len(result_ips), 500):
+            updated += RequestLog.objects.filter(
+                ips_matching(result_ips[start : start + 500]),
+                country__isnull=True,
+            ).update(country=country, city=city, latitude=latitude, longitude=longitude)
+
+    logger.info(f"Enriched {updated} request logs from {len(ips)} distinct IPs")
+    return updated
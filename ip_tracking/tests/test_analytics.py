@@ -0,0 +1,94 @@
+# ip_tracking/tests/test_analytics.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from ip_tracking.analytics import window_bounds
+from ip_tracking.models import RequestRollup, TrafficRollup
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+TOP_IPS = "/ip-tracking/analytics/top-ips/"
+
+
+def add_rollup(ip_address, count, minutes_ago=2, path_class=""):
+    bucket = timezone.now().replace(second=0, microsecond=0)
+    RequestRollup.objects.create(
+        ip_address=ip_address,
+        bucket=bucket - timedelta(minutes=minutes_ago),
+        path_class=path_class,
+        request_count=count,
+    )
+
+
+class AnalyticsViewTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        staff = get_user_model().objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+
+    def get(self, url, **params):
+        headers = params.pop("headers", {})
+        return self.client.get(url, params, headers=headers, REMOTE_ADDR="10.0.0.1")
+
+    def test_top_ips_are_summed_over_the_window(self):
+        add_rollup("203.0.113.7", 5)
+        add_rollup("203.0.113.7", 3, path_class="/login/")
+        add_rollup("203.0.113.8", 4)
+        add_rollup("203.0.113.9", 9, minutes_ago=90)
+
+        response = self.get(TOP_IPS, limit=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"ip_address": "203.0.113.7", "requests": 8.0},
+                {"ip_address": "203.0.113.8", "requests": 4.0},
+            ],
+        )
+
+    def test_unchanged_results_get_an_empty_304(self):
+        add_rollup("203.0.113.7", 5)
+        etag = self.get(TOP_IPS)["ETag"]
+
+        response = self.get(TOP_IPS, headers={"If-None-Match": f'"other", {etag}'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_results_are_cached_between_polls(self):
+        add_rollup("203.0.113.7", 5)
+        first = self.get(TOP_IPS)
+        add_rollup("203.0.113.8", 50)
+
+        self.assertEqual(self.get(TOP_IPS).content, first.content)
+        self.assertNotEqual(self.get(TOP_IPS, limit=5)["ETag"], first["ETag"])
+
+    def test_request_rate_fills_empty_steps_with_zero(self):
+        start, _ = window_bounds("15m")
+        TrafficRollup.objects.create(
+            bucket=start + timedelta(minutes=1),
+            dimension=TrafficRollup.Dimension.TOTAL,
+            request_count=7,
+        )
+
+        response = self.get(
+            "/ip-tracking/analytics/request-rate/", window="15m", step=5
+        )
+
+        self.assertEqual(
+            [point["requests"] for point in response.json()["results"]],
+            [7.0, 0, 0],
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"window": "2h"}, {"limit": "0"}, {"limit": "many"}):
+            with self.subTest(**params):
+                self.assertEqual(self.get(TOP_IPS, **params).status_code, 400)
+
+    def test_non_staff_users_are_redirected_to_login(self):
+        self.client.logout()
+
+        self.assertEqual(self.get(TOP_IPS).status_code, 302)
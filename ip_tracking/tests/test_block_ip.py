@@ -0,0 +1,100 @@
+# ip_tracking/tests/test_block_ip.py
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+
+from ip_tracking.blocklist import blocklist
+from ip_tracking.models import BlockedIP, BlockedNetwork
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+
+class BlockIPCommandTests(IPTrackingTestCase):
+    def block_file(self, content, *args):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        path = directory / "blocklist.txt"
+        path.write_text(content)
+        stdout, stderr = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "block_ip", "--file", str(path), *args, stdout=stdout, stderr=stderr
+            )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_file_blocks_ips_and_networks(self):
+        stdout, _ = self.block_file(
+            "203.0.113.7,feed\n198.51.100.0/24\n2001:db8:1::1/48,range\n"
+        )
+
+        self.assertIn("Blocked 1 IPs and 2 networks", stdout)
+        self.assertEqual(
+            dict(BlockedNetwork.objects.values_list("network", "reason")),
+            {"198.51.100.0/24": None, "2001:db8:1::/48": "range"},
+        )
+        self.assertTrue(blocklist.is_blocked("203.0.113.7"))
+        self.assertTrue(blocklist.is_blocked("198.51.100.200"))
+        self.assertTrue(blocklist.is_blocked("2001:db8:1:ffff::1"))
+        self.assertFalse(blocklist.is_blocked("198.51.101.1"))
+
+    def test_invalid_lines_and_duplicates_are_skipped(self):
+        stdout, stderr = self.block_file(
+            "# feed export\n"
+            "203.0.113.7,first\n"
+            "\n"
+            "not-an-ip\n"
+            "2001:0db8::1\n"
+            "203.0.113.7,second\n"
+            "2001:db8::1\n",
+            "--reason",
+            "imported",
+            "--batch-size",
+            "1",
+        )
+
+        self.assertIn("Line 4: invalid IP address or network 'not-an-ip'", stderr)
+        self.assertIn("Blocked 2 IPs and 0 networks", stdout)
+        self.assertIn("skipped 1 invalid and 2 duplicate entries", stdout)
+        self.assertEqual(
+            dict(BlockedIP.objects.values_list("ip_address", "reason")),
+            {"203.0.113.7": "first", "2001:db8::1": "imported"},
+        )
+
+    def test_reimport_updates_existing_entries(self):
+        BlockedIP.objects.create(
+            ip_address="203.0.113.7", reason="old", is_active=False
+        )
+
+        self.block_file("203.0.113.7,new\n")
+
+        blocked = BlockedIP.objects.get()
+        self.assertEqual((blocked.reason, blocked.is_active), ("new", True))
+        self.assertTrue(blocklist.is_blocked("203.0.113.7"))
+
+    def test_entries_are_read_from_stdin(self):
+        stdout = StringIO()
+        with mock.patch("sys.stdin", StringIO("203.0.113.7\n203.0.113.8\n")):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("block_ip", "--file", "-", stdout=stdout)
+
+        self.assertIn("Blocked 2 IPs", stdout.getvalue())
+        self.assertTrue(blocklist.is_blocked("203.0.113.8"))
+
+    def test_missing_file_is_reported(self):
+        with self.assertRaisesMessage(CommandError, "Error reading"):
+            call_command("block_ip", "--file", "/nonexistent/blocklist.txt")
+
+    def test_networks_are_rejected_with_a_duration(self):
+        stdout, stderr = self.block_file(
+            "203.0.113.7\n198.51.100.0/24\n", "--duration", "15"
+        )
+
+        self.assertIn("Line 2: --duration cannot be used", stderr)
+        self.assertIn("skipped 1 invalid", stdout)
+        self.assertFalse(BlockedNetwork.objects.exists())
+        self.assertIsNotNone(BlockedIP.objects.get().expires_at)
+
+    def test_single_network_rejects_a_duration(self):
+        with self.assertRaisesMessage(CommandError, "--duration cannot be used"):
+            call_command("block_ip", "198.51.100.0/24", "--duration", "15")
@@ -0,0 +1,112 @@
+# ip_tracking/tests/test_blocking.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+
+from ip_tracking.blocking import escalate_suspicious_ips, remember_staff_ip
+from ip_tracking.models import BlockedIP, SuspiciousIP
+from ip_tracking.tasks import detect_suspicious_activity
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+Reason = SuspiciousIP.SuspicionReason
+
+
+@override_settings(
+    BLOCK_ESCALATION_ENABLED=True,
+    SUSPICIOUS_REQUEST_THRESHOLD=5,
+    REQUEST_ROLLUP_SETTLE_SECONDS=0,
+)
+class EscalationTests(IPTrackingTestCase):
+    def flag(self, ip_address, reason=Reason.HIGH_REQUEST_VOLUME):
+        SuspiciousIP.objects.create(ip_address=ip_address, reason=reason)
+
+    def blocked_ips(self):
+        return set(BlockedIP.active().values_list("ip_address", flat=True))
+
+    def test_staff_visiting_the_admin_are_not_blocked(self):
+        admin = get_user_model().objects.create_superuser("admin", "", "secret")
+        self.client.force_login(admin)
+
+        response = self.client.get("/admin/", REMOTE_ADDR="203.0.113.50")
+        self.assertEqual(response.status_code, 200)
+        detect_suspicious_activity()
+
+        self.assertTrue(SuspiciousIP.objects.filter(ip_address="203.0.113.50").exists())
+        self.assertEqual(self.blocked_ips(), set())
+        response = self.client.get("/admin/", REMOTE_ADDR="203.0.113.50")
+        self.assertEqual(response.status_code, 200)
+
+    def test_busy_staff_ips_are_not_blocked(self):
+        admin = get_user_model().objects.create_superuser("admin", "", "secret")
+        self.client.force_login(admin)
+
+        for _ in range(6):
+            self.client.get("/admin/", REMOTE_ADDR="203.0.113.50")
+        detect_suspicious_activity()
+
+        self.assertEqual(
+            SuspiciousIP.objects.get(ip_address="203.0.113.50").reason,
+            Reason.MULTIPLE_VIOLATIONS,
+        )
+        self.assertEqual(self.blocked_ips(), set())
+
+    def test_anonymous_high_volume_is_blocked(self):
+        add_request_logs("203.0.113.7", 6, path="/admin/")
+        detect_suspicious_activity()
+
+        self.assertEqual(self.blocked_ips(), {"203.0.113.7"})
+        self.assertEqual(
+            self.client.get("/", REMOTE_ADDR="203.0.113.7").status_code, 403
+        )
+
+    def test_sensitive_path_alone_is_not_escalated(self):
+        self.flag("203.0.113.7", Reason.SENSITIVE_PATH)
+
+        self.assertEqual(escalate_suspicious_ips(), 0)
+        self.assertTrue(SuspiciousIP.objects.get(ip_address="203.0.113.7").is_active)
+
+    def test_private_and_loopback_addresses_are_exempt(self):
+        for ip_address in ("10.1.2.3", "192.168.0.9", "127.0.0.1", "::1", "fd00::1"):
+            self.flag(ip_address)
+        self.flag("203.0.113.7")
+
+        self.assertEqual(escalate_suspicious_ips(), 1)
+        self.assertEqual(self.blocked_ips(), {"203.0.113.7"})
+
+    def test_remembered_staff_ips_are_exempt_in_any_spelling(self):
+        remember_staff_ip("2001:DB8::7")
+        self.flag("2001:db8:0:0:0:0:0:7")
+
+        self.assertEqual(escalate_suspicious_ips(), 0)
+
+    @override_settings(BLOCK_ESCALATION_EXEMPT_NETWORKS=[])
+    def test_exempt_networks_are_configurable(self):
+        self.flag("10.1.2.3")
+
+        self.assertEqual(escalate_suspicious_ips(), 1)
+
+    def test_repeat_offenders_are_blocked_for_longer(self):
+        self.flag("203.0.113.7")
+        escalate_suspicious_ips()
+        first = BlockedIP.objects.get(ip_address="203.0.113.7")
+        self.assertFalse(SuspiciousIP.objects.get(ip_address="203.0.113.7").is_active)
+
+        first.expires_at = timezone.now() - timedelta(seconds=1)
+        first.save()
+        SuspiciousIP.objects.filter(ip_address="203.0.113.7").update(is_active=True)
+        escalate_suspicious_ips()
+
+        second = BlockedIP.objects.get(ip_address="203.0.113.7")
+        self.assertEqual(second.block_count, 2)
+        self.assertAlmostEqual(
+            (second.expires_at - timezone.now()).total_seconds(), 60 * 60, delta=60
+        )
+
+    @override_settings(BLOCK_ESCALATION_ENABLED=False)
+    def test_detection_task_leaves_ips_unblocked_when_disabled(self):
+        add_request_logs("203.0.113.7", 6)
+        detect_suspicious_activity()
+
+        self.assertEqual(self.blocked_ips(), set())
@@ -0,0 +1,186 @@
+# ip_tracking/tests/test_blocklist.py
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.utils import timezone
+
+from ip_tracking.blocking import expire_blocks
+from ip_tracking.blocklist import Blocklist, NetworkMatcher, SuspiciousIPSet, blocklist
+from ip_tracking.iputils import network_to_bytes
+from ip_tracking.models import BlockedIP, BlockedNetwork, SuspiciousIP
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+
+class BlocklistTests(IPTrackingTestCase):
+    def test_blocked_ip_is_matched(self):
+        BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+
+        self.assertTrue(blocklist.is_blocked("203.0.113.7"))
+        self.assertFalse(blocklist.is_blocked("203.0.113.8"))
+
+    def test_ipv6_spellings_match_the_same_block(self):
+        BlockedIP.objects.create(ip_address="2001:DB8::1", reason="test")
+
+        for spelling in ("2001:db8::1", "2001:DB8::1", "2001:db8:0:0:0:0:0:1"):
+            with self.subTest(spelling=spelling):
+                self.assertTrue(blocklist.is_blocked(spelling))
+        self.assertFalse(blocklist.is_blocked("2001:db8::2"))
+
+    def test_malformed_addresses_are_not_blocked(self):
+        BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+
+        self.assertFalse(blocklist.is_blocked("not-an-ip"))
+        self.assertFalse(blocklist.is_blocked(None))
+
+    def is_blocked_after_reload(self, worker, ip_address):
+        """
+        Check ``ip_address`` once any reload the check starts is done. The
+        reload runs inline, as a thread could not see the test's
+        uncommitted rows.
+        """
+        with mock.patch.object(worker, "_start_reload") as start_reload:
+            worker.is_blocked(ip_address)
+        if start_reload.called:
+            worker._reload(*start_reload.call_args.args)
+        return worker.is_blocked(ip_address)
+
+    def test_other_processes_see_changes_after_invalidation(self):
+        # A second instance stands in for another worker's copy
+        worker = Blocklist()
+        self.assertFalse(worker.is_blocked("203.0.113.7"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            block = BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+        self.assertTrue(self.is_blocked_after_reload(worker, "203.0.113.7"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            block.delete()
+        self.assertFalse(self.is_blocked_after_reload(worker, "203.0.113.7"))
+
+    def test_previous_copy_is_served_while_reloading(self):
+        worker = Blocklist()
+        worker.is_blocked("203.0.113.7")
+        with self.captureOnCommitCallbacks(execute=True):
+            BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+
+        with mock.patch.object(worker, "_start_reload") as start_reload:
+            with self.assertNumQueries(0):
+                self.assertFalse(worker.is_blocked("203.0.113.7"))
+        start_reload.assert_called_once()
+
+        worker._reload(*start_reload.call_args.args)
+        self.assertTrue(worker.is_blocked("203.0.113.7"))
+
+    def test_reload_started_before_a_local_invalidation_is_discarded(self):
+        worker = Blocklist()
+        worker.is_blocked("203.0.113.7")
+        BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+        generation = worker._generation
+
+        worker.clear_local()
+        worker.is_blocked("203.0.113.7")
+        with mock.patch.object(worker, "_load", return_value=({}, NetworkMatcher([]))):
+            worker._reload("stale", generation)
+
+        self.assertTrue(worker.is_blocked("203.0.113.7"))
+
+    def test_version_is_published_only_on_commit(self):
+        worker = Blocklist()
+        worker.is_blocked("203.0.113.7")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+                # Another worker checking now must not file the old rows
+                # under the new version
+                self.assertFalse(self.is_blocked_after_reload(worker, "203.0.113.7"))
+        self.assertTrue(self.is_blocked_after_reload(worker, "203.0.113.7"))
+
+    def test_stale_copy_is_kept_until_the_check_interval(self):
+        worker = Blocklist()
+        worker.is_blocked("203.0.113.7")
+
+        with self.settings(BLOCKLIST_VERSION_CHECK_INTERVAL=3600):
+            BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+            with self.assertNumQueries(0):
+                self.assertFalse(worker.is_blocked("203.0.113.7"))
+
+    def test_unchanged_version_does_not_reload(self):
+        BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+        blocklist.is_blocked("203.0.113.7")
+
+        with self.assertNumQueries(0):
+            self.assertTrue(blocklist.is_blocked("203.0.113.7"))
+
+    def test_block_lapses_at_expiry_without_a_reload(self):
+        expires_at = timezone.now() + timedelta(minutes=15)
+        BlockedIP.objects.create(
+            ip_address="203.0.113.7", reason="test", expires_at=expires_at
+        )
+        self.assertTrue(blocklist.is_blocked("203.0.113.7"))
+
+        later = expires_at.timestamp() + 1
+        with mock.patch("ip_tracking.blocklist.time.time", return_value=later):
+            with self.assertNumQueries(0):
+                self.assertFalse(blocklist.is_blocked("203.0.113.7"))
+
+    def test_expired_blocks_are_deactivated(self):
+        BlockedIP.objects.create(
+            ip_address="203.0.113.7",
+            reason="test",
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        BlockedIP.objects.create(ip_address="203.0.113.8", reason="test")
+
+        self.assertFalse(blocklist.is_blocked("203.0.113.7"))
+        self.assertEqual(expire_blocks(), 1)
+        self.assertFalse(BlockedIP.objects.get(ip_address="203.0.113.7").is_active)
+        self.assertTrue(blocklist.is_blocked("203.0.113.8"))
+
+    def test_networks_are_matched_by_cidr(self):
+        BlockedNetwork.objects.create(network="198.51.100.0/24", reason="test")
+        BlockedNetwork.objects.create(network="2001:db8:1::/48", reason="test")
+
+        self.assertTrue(blocklist.is_blocked("198.51.100.0"))
+        self.assertTrue(blocklist.is_blocked("198.51.100.255"))
+        self.assertFalse(blocklist.is_blocked("198.51.101.0"))
+        self.assertTrue(blocklist.is_blocked("2001:DB8:1:ffff::1"))
+        self.assertFalse(blocklist.is_blocked("2001:db8:2::1"))
+
+    def test_inactive_networks_are_ignored(self):
+        BlockedNetwork.objects.create(
+            network="198.51.100.0/24", reason="test", is_active=False
+        )
+
+        self.assertFalse(blocklist.is_blocked("198.51.100.1"))
+
+
+class NetworkMatcherTests(IPTrackingTestCase):
+    def test_overlapping_and_nested_ranges(self):
+        matcher = NetworkMatcher(
+            sorted(
+                network_to_bytes(network)
+                for network in ("10.0.0.0/8", "10.1.0.0/16", "10.2.0.0/24")
+            )
+        )
+
+        self.assertIn("10.2.0.1", matcher)
+        self.assertIn("10.255.255.255", matcher)
+        self.assertNotIn("11.0.0.0", matcher)
+        self.assertNotIn("9.255.255.255", matcher)
+
+    def test_empty_matcher(self):
+        self.assertNotIn("10.0.0.1", NetworkMatcher([]))
+
+
+class SuspiciousIPSetTests(IPTrackingTestCase):
+    def test_only_active_rows_are_members(self):
+        suspicious = SuspiciousIPSet()
+        SuspiciousIP.objects.create(ip_address="2001:db8::5", reason="high_volume")
+        SuspiciousIP.objects.create(
+            ip_address="203.0.113.9", reason="high_volume", is_active=False
+        )
+
+        self.assertTrue(suspicious.contains("2001:DB8:0::5"))
+        self.assertFalse(suspicious.contains("203.0.113.9"))
@@ -0,0 +1,92 @@
+# ip_tracking/tests/test_detection.py
+from datetime import timedelta
+
+from django.test import override_settings
+
+from ip_tracking.blocklist import suspicious_ips
+from ip_tracking.detection import DETECTION_CURSOR, detect_suspicious_activity
+from ip_tracking.models import ProcessingCursor, RequestLog, SuspiciousIP
+from ip_tracking.rollups import ROLLUP_CURSOR
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+Reason = SuspiciousIP.SuspicionReason
+
+
+@override_settings(
+    SUSPICIOUS_REQUEST_THRESHOLD=5,
+    SENSITIVE_PATHS=["/admin/"],
+    REQUEST_ROLLUP_SETTLE_SECONDS=0,
+)
+class DetectionTests(IPTrackingTestCase):
+    def reasons(self):
+        return dict(
+            SuspiciousIP.objects.filter(is_active=True).values_list(
+                "ip_address", "reason"
+            )
+        )
+
+    def test_rules(self):
+        add_request_logs("203.0.113.1", 6)
+        add_request_logs("203.0.113.2", 1, path="/admin/")
+        add_request_logs("203.0.113.3", 6, path="/admin/")
+        add_request_logs("203.0.113.4", 5)
+
+        self.assertEqual(detect_suspicious_activity(incremental=False), 3)
+        self.assertEqual(
+            self.reasons(),
+            {
+                "203.0.113.1": Reason.HIGH_REQUEST_VOLUME,
+                "203.0.113.2": Reason.SENSITIVE_PATH,
+                "203.0.113.3": Reason.MULTIPLE_VIOLATIONS,
+            },
+        )
+        self.assertTrue(suspicious_ips.contains("203.0.113.1"))
+
+    def test_requests_outside_the_window_are_ignored(self):
+        add_request_logs("203.0.113.1", 6, age=timedelta(hours=2))
+
+        self.assertEqual(detect_suspicious_activity(incremental=False), 0)
+
+    def test_watermark_follows_the_rollup(self):
+        add_request_logs("203.0.113.1", 6)
+        detect_suspicious_activity()
+
+        last_id = RequestLog.objects.order_by("-id").values_list("id", flat=True)[0]
+        self.assertEqual(ProcessingCursor.get_position(ROLLUP_CURSOR), last_id)
+        self.assertEqual(ProcessingCursor.get_position(DETECTION_CURSOR), last_id)
+
+    def test_incremental_run_only_judges_ips_with_new_requests(self):
+        add_request_logs("203.0.113.1", 6)
+        add_request_logs("203.0.113.2", 6)
+        detect_suspicious_activity()
+        SuspiciousIP.objects.update(is_active=False)
+
+        # Nothing new: both IPs were already judged
+        self.assertEqual(detect_suspicious_activity(), 0)
+
+        add_request_logs("203.0.113.2", 1)
+        self.assertEqual(detect_suspicious_activity(), 1)
+        self.assertEqual(self.reasons(), {"203.0.113.2": Reason.HIGH_REQUEST_VOLUME})
+
+    def test_incremental_run_sees_totals_across_runs(self):
+        add_request_logs("203.0.113.1", 3)
+        self.assertEqual(detect_suspicious_activity(), 0)
+
+        add_request_logs("203.0.113.1", 3)
+        self.assertEqual(detect_suspicious_activity(), 1)
+
+    def test_run_without_new_requests_skips_the_rules(self):
+        add_request_logs("203.0.113.1", 6)
+        detect_suspicious_activity()
+
+        # Cursor reads, the settled-rows check and the active count only
+        with self.assertNumQueries(5):
+            self.assertEqual(detect_suspicious_activity(), 1)
+
+    def test_unsettled_rows_wait_for_the_next_run(self):
+        add_request_logs("203.0.113.1", 6, age=timedelta(seconds=0))
+        with self.settings(REQUEST_ROLLUP_SETTLE_SECONDS=60):
+            self.assertEqual(detect_suspicious_activity(), 0)
+        self.assertEqual(ProcessingCursor.get_position(DETECTION_CURSOR), 0)
+
+        self.assertEqual(detect_suspicious_activity(), 1)
@@ -0,0 +1,119 @@
+# ip_tracking/tests/test_export.py
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from ip_tracking.export import stream_export
+from ip_tracking.models import SuspiciousIP
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+
+def read_ndjson(data):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+class StreamExportTests(IPTrackingTestCase):
+    def test_ndjson_rows_are_exported_in_id_order(self):
+        add_request_logs("203.0.113.7", 2, path="/a/", country="NL")
+        add_request_logs("203.0.113.8", 1, path="/b/")
+
+        rows = read_ndjson(b"".join(stream_export("requests")))
+
+        self.assertEqual(
+            [(row["ip_address"], row["path"]) for row in rows],
+            [("203.0.113.7", "/a/"), ("203.0.113.7", "/a/"), ("203.0.113.8", "/b/")],
+        )
+        self.assertEqual(rows[0]["country"], "NL")
+
+    def test_csv_has_a_header_and_json_encoded_details(self):
+        SuspiciousIP.objects.create(
+            ip_address="203.0.113.7", reason="test", details={"requests": 120}
+        )
+
+        data = b"".join(stream_export("suspicious", format="csv")).decode()
+        header, row = csv.reader(io.StringIO(data))
+
+        self.assertEqual(header[:3], ["id", "ip_address", "reason"])
+        self.assertEqual(json.loads(row[header.index("details")]), {"requests": 120})
+
+    def test_compressed_output_is_a_single_gzip_stream(self):
+        add_request_logs("203.0.113.7", 50)
+
+        with mock.patch("ip_tracking.export.WRITE_BUFFER_SIZE", 256):
+            chunks = list(stream_export("requests", compress=True, chunk_size=10))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(read_ndjson(gzip.decompress(b"".join(chunks)))), 50)
+
+    def test_range_includes_since_and_excludes_until(self):
+        add_request_logs("203.0.113.1", 1, age=timedelta(hours=3))
+        add_request_logs("203.0.113.2", 1, age=timedelta(hours=2))
+        add_request_logs("203.0.113.3", 1, age=timedelta(minutes=2))
+        now = timezone.now()
+
+        rows = read_ndjson(
+            b"".join(
+                stream_export(
+                    "requests",
+                    since=now - timedelta(hours=2, minutes=1),
+                    until=now - timedelta(hours=1),
+                )
+            )
+        )
+
+        self.assertEqual([row["ip_address"] for row in rows], ["203.0.113.2"])
+
+    def test_unknown_dataset_or_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(stream_export("users"))
+        with self.assertRaises(ValueError):
+            list(stream_export("requests", format="xml"))
+
+
+class ExportLogsCommandTests(IPTrackingTestCase):
+    def test_gz_output_name_implies_compression(self):
+        add_request_logs("203.0.113.7", 3)
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        path = directory / "requests.ndjson.gz"
+        stderr = io.StringIO()
+
+        call_command("export_logs", "--output", str(path), stderr=stderr)
+
+        self.assertEqual(len(read_ndjson(gzip.decompress(path.read_bytes()))), 3)
+        self.assertIn("Exported requests", stderr.getvalue())
+
+    def test_invalid_dates_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date or datetime"):
+            call_command("export_logs", "--since", "yesterday")
+
+
+class ExportLogsViewTests(IPTrackingTestCase):
+    def test_staff_download_is_gzipped_by_default(self):
+        add_request_logs("203.0.113.7", 2)
+        staff = get_user_model().objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get("/ip-tracking/export/", REMOTE_ADDR="203.0.113.50")
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="requests.ndjson.gz"', response["Content-Disposition"])
+        rows = read_ndjson(gzip.decompress(b"".join(response.streaming_content)))
+        # The download request itself is logged as well
+        self.assertEqual(
+            [row["ip_address"] for row in rows],
+            ["203.0.113.7", "203.0.113.7", "203.0.113.50"],
+        )
+
+    def test_non_staff_users_are_redirected_to_login(self):
+        response = self.client.get("/ip-tracking/export/", REMOTE_ADDR="203.0.113.50")
+
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,85 @@
+# ip_tracking/tests/test_fields.py
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.test import SimpleTestCase
+
+from ip_tracking.fields import in_network, ips_matching, pack_ip
+from ip_tracking.models import BlockedIP, RequestLog
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+packed_ip_addresses = importlib.import_module(
+    "ip_tracking.migrations.0010_packed_ip_addresses"
+)
+
+
+class PackIPTests(SimpleTestCase):
+    def test_ipv4_is_mapped_into_the_ipv6_space(self):
+        self.assertEqual(pack_ip("203.0.113.7"), pack_ip("::ffff:203.0.113.7"))
+        self.assertEqual(pack_ip("0.0.0.1")[:12], bytes(10) + b"\xff\xff")
+
+    def test_packed_form_sorts_like_the_address(self):
+        addresses = ["2001:db8::1", "10.0.0.2", "::1", "9.255.255.255", "10.0.0.10"]
+
+        self.assertEqual(
+            sorted(addresses, key=pack_ip),
+            ["::1", "9.255.255.255", "10.0.0.2", "10.0.0.10", "2001:db8::1"],
+        )
+
+    def test_empty_or_malformed_values_pack_to_none(self):
+        for value in ("", None, "unknown", "203.0.113.300"):
+            self.assertIsNone(pack_ip(value))
+
+
+class PackedIPFieldTests(IPTrackingTestCase):
+    def test_bulk_created_rows_are_packed(self):
+        add_request_logs("203.0.113.7", 2)
+
+        self.assertEqual(
+            set(RequestLog.objects.values_list("ip_packed", flat=True)),
+            {pack_ip("203.0.113.7")},
+        )
+
+    def test_network_lookups_are_ranges_over_the_packed_column(self):
+        for ip_address in ("198.51.100.1", "198.51.100.255", "198.51.101.0"):
+            add_request_logs(ip_address, 1)
+
+        matched = RequestLog.objects.filter(in_network("198.51.100.0/24"))
+
+        self.assertEqual(
+            sorted(matched.values_list("ip_address", flat=True)),
+            ["198.51.100.1", "198.51.100.255"],
+        )
+
+    def test_malformed_values_fall_back_to_the_text_column(self):
+        add_request_logs("203.0.113.7", 1)
+        add_request_logs("unknown", 1)
+        add_request_logs("203.0.113.8", 1)
+
+        matched = RequestLog.objects.filter(ips_matching(["203.0.113.7", "unknown"]))
+
+        self.assertEqual(
+            sorted(matched.values_list("ip_address", flat=True)),
+            ["203.0.113.7", "unknown"],
+        )
+
+
+class PackedIPBackfillTests(IPTrackingTestCase):
+    def test_existing_rows_are_backfilled_in_chunks(self):
+        add_request_logs("203.0.113.7", 3)
+        add_request_logs("2001:db8::1", 1)
+        BlockedIP.objects.create(ip_address="198.51.100.1", reason="test")
+        # Queryset updates bypass pre_save, like rows written before 0010
+        RequestLog.objects.update(ip_packed=None)
+        BlockedIP.objects.update(ip_packed=None)
+
+        with mock.patch.object(packed_ip_addresses, "BACKFILL_CHUNK_SIZE", 2):
+            packed_ip_addresses.backfill_packed_ips(apps, None)
+
+        self.assertFalse(RequestLog.objects.filter(ip_packed__isnull=True).exists())
+        self.assertEqual(
+            RequestLog.objects.get(ip_address="2001:db8::1").ip_packed,
+            pack_ip("2001:db8::1"),
+        )
+        self.assertEqual(BlockedIP.objects.get().ip_packed, pack_ip("198.51.100.1"))
@@ -0,0 +1,87 @@
+# ip_tracking/tests/test_geocache.py
+import threading
+from unittest import mock
+
+from ip_tracking.geocache import GeolocationCache
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+NL = {"country": "NL", "city": "Amsterdam", "latitude": None, "longitude": None}
+
+
+class GeolocationCacheTests(IPTrackingTestCase):
+    def test_answers_are_kept_in_both_tiers(self):
+        loader = mock.Mock(return_value=NL)
+        cache = GeolocationCache()
+
+        self.assertEqual(cache.get("203.0.113.7", loader), NL)
+        self.assertEqual(cache.get("203.0.113.7", loader), NL)
+        # Another worker finds the answer in the shared cache
+        self.assertEqual(GeolocationCache().get("203.0.113.7", loader), NL)
+
+        loader.assert_called_once_with("203.0.113.7")
+        self.assertEqual(cache.stats()["local_hits"], 1)
+
+    def test_errors_are_cached_as_empty_for_the_negative_ttl(self):
+        loader = mock.Mock(side_effect=OSError("unreachable"))
+        cache = GeolocationCache(negative_ttl=300)
+
+        with self.assertLogs("ip_tracking.geocache", "ERROR"):
+            self.assertEqual(cache.get("203.0.113.7", loader), {})
+        self.assertEqual(cache.get("203.0.113.7", loader), {})
+
+        loader.assert_called_once()
+        self.assertEqual(cache.stats()["negative_stores"], 1)
+        with mock.patch.object(cache._local, "set") as set_local:
+            cache.clear_local()
+            cache.get("203.0.113.7", loader)
+        # An empty shared answer is kept locally no longer than the negative TTL
+        self.assertEqual(set_local.call_args.args[2], 300)
+
+    def test_concurrent_misses_share_one_lookup(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_loader(ip_address):
+            started.set()
+            release.wait(5)
+            return NL
+
+        loader = mock.Mock(side_effect=slow_loader)
+        cache = GeolocationCache()
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(cache.get("203.0.113.7", loader))
+        )
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(
+            target=lambda: results.append(cache.get("203.0.113.7", loader))
+        )
+        follower.start()
+        while not cache.stats()["coalesced"]:
+            threading.Event().wait(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(results, [NL, NL])
+        loader.assert_called_once()
+
+    def test_get_many_loads_only_the_misses(self):
+        cache = GeolocationCache()
+        cache.get("203.0.113.7", mock.Mock(return_value=NL))
+        loader = mock.Mock(return_value={"203.0.113.8": NL})
+
+        results = cache.get_many(["203.0.113.7", "203.0.113.8", "203.0.113.9"], loader)
+
+        loader.assert_called_once_with(["203.0.113.8", "203.0.113.9"])
+        self.assertEqual(
+            results, {"203.0.113.7": NL, "203.0.113.8": NL, "203.0.113.9": {}}
+        )
+
+    def test_local_tier_is_bounded(self):
+        cache = GeolocationCache(max_entries=2)
+        for i in range(3):
+            cache.get(f"203.0.113.{i}", mock.Mock(return_value=NL))
+
+        self.assertEqual(cache.stats()["local_entries"], 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
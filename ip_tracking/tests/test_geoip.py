@@ -0,0 +1,79 @@
+# ip_tracking/tests/test_geoip.py
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from ip_tracking.geoip import GeoIPDatabase, GeoIPDatabaseError, write_database
+from ip_tracking.iputils import ip_to_bytes
+
+RANGES_CSV = """start,end,country,city,latitude,longitude
+203.0.113.0,203.0.113.255,NL,Amsterdam,52.37,4.89
+198.51.100.0,198.51.100.127,US,,,
+2001:db8::,2001:db8::ffff,DE,Berlin,52.52,13.40
+"""
+
+
+class GeoIPDatabaseTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def compile(self, content):
+        source = self.directory / "ranges.csv"
+        source.write_text(content)
+        output = self.directory / "geoip.db"
+        call_command("compile_geoip", str(source), str(output), stdout=StringIO())
+        database = GeoIPDatabase(output)
+        self.addCleanup(database.close)
+        return database
+
+    def test_lookups_find_the_covering_range(self):
+        database = self.compile(RANGES_CSV)
+
+        self.assertEqual(database.record_count, 3)
+        self.assertEqual(
+            database.lookup("203.0.113.200"),
+            {
+                "country": "NL",
+                "city": "Amsterdam",
+                "latitude": 52.37,
+                "longitude": 4.89,
+            },
+        )
+        self.assertEqual(database.lookup("2001:DB8::1")["city"], "Berlin")
+
+    def test_missing_fields_come_back_as_none(self):
+        database = self.compile(RANGES_CSV)
+
+        self.assertEqual(
+            database.lookup("198.51.100.1"),
+            {"country": "US", "city": None, "latitude": None, "longitude": None},
+        )
+
+    def test_uncovered_and_malformed_addresses(self):
+        database = self.compile(RANGES_CSV)
+
+        for address in ("198.51.100.128", "10.0.0.1", "2001:db8::1:0", "bogus"):
+            with self.subTest(address=address):
+                self.assertIsNone(database.lookup(address))
+
+    def test_bad_rows_are_rejected_with_their_line(self):
+        with self.assertRaisesMessage(CommandError, "Line 5: range start"):
+            self.compile(RANGES_CSV + "203.0.113.9,203.0.113.1,NL,Amsterdam\n")
+
+    def test_overlapping_ranges_are_rejected(self):
+        ranges = [
+            (ip_to_bytes("10.0.0.0"), ip_to_bytes("10.0.0.255"), "NL", "", None, None),
+            (ip_to_bytes("10.0.0.128"), ip_to_bytes("10.0.1.0"), "NL", "", None, None),
+        ]
+        with self.assertRaises(GeoIPDatabaseError):
+            write_database(self.directory / "geoip.db", ranges)
+
+    def test_other_files_are_not_opened(self):
+        path = self.directory / "other.db"
+        path.write_bytes(b"not a geoip database")
+
+        with self.assertRaises(GeoIPDatabaseError):
+            GeoIPDatabase(path)
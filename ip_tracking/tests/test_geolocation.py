@@ -0,0 +1,48 @@
+# ip_tracking/tests/test_geolocation.py
+import requests
+from django.test import SimpleTestCase
+
+from ip_tracking.geo_stub import StubGeolocationServer, stub_geolocation
+from ip_tracking.geolocation import IPAPIProvider
+
+
+class IPAPIProviderTests(SimpleTestCase):
+    def serve(self, **kwargs):
+        return self.enterContext(StubGeolocationServer(**kwargs))
+
+    def test_single_lookup(self):
+        server = self.serve()
+        provider = IPAPIProvider(base_url=server.url)
+
+        geo_data = provider.lookup("203.0.113.7")
+
+        expected = stub_geolocation("203.0.113.7")
+        self.assertEqual(geo_data["country"], expected["country"])
+        self.assertEqual(geo_data["latitude"], expected["lat"])
+        self.assertEqual(server.calls, {"json": 1, "batch": 0})
+
+    def test_lookup_many_posts_deduplicated_batches(self):
+        server = self.serve()
+        provider = IPAPIProvider(base_url=server.url, batch_size=100)
+        ips = [f"203.0.{i // 256}.{i % 256}" for i in range(250)]
+
+        results = provider.lookup_many(ips + ips[:10])
+
+        self.assertEqual(set(results), set(ips))
+        self.assertEqual(server.calls, {"json": 0, "batch": 3})
+        self.assertEqual(server.ips_served, 250)
+
+    def test_slow_responses_time_out(self):
+        server = self.serve(latency=0.5)
+        provider = IPAPIProvider(base_url=server.url, read_timeout=0.05)
+
+        with self.assertRaises(requests.Timeout):
+            provider.lookup_many(["203.0.113.7"])
+
+    def test_http_errors_are_raised(self):
+        server = self.serve()
+        # The stub answers 422 above 100 IPs, like ip-api.com
+        provider = IPAPIProvider(base_url=server.url, batch_size=101)
+
+        with self.assertRaises(requests.HTTPError):
+            provider.lookup_many([f"203.0.113.{i}" for i in range(101)])
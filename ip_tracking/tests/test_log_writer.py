@@ -0,0 +1,127 @@
+# ip_tracking/tests/test_log_writer.py
+from unittest import mock
+
+from django.db import DatabaseError
+
+from ip_tracking.log_writer import (
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    BufferedLogWriter,
+)
+from ip_tracking.models import RequestLog
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+
+class BufferedLogWriterTests(IPTrackingTestCase):
+    def make_writer(self, **kwargs):
+        writer = BufferedLogWriter(**kwargs)
+        # The flush thread would write through its own connection, outside
+        # the test's transaction; flushes are made explicitly instead
+        patcher = mock.patch.object(writer, "_ensure_started")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return writer
+
+    def write(self, writer, path):
+        writer.write(ip_address="203.0.113.7", path=path, method="GET")
+
+    def test_writes_are_queued_until_flushed(self):
+        writer = self.make_writer()
+        for i in range(3):
+            self.write(writer, f"/{i}")
+
+        self.assertFalse(RequestLog.objects.exists())
+        self.assertEqual(writer.stats()["pending"], 3)
+
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(RequestLog.objects.count(), 3)
+        self.assertEqual(
+            writer.stats(),
+            {"queued": 3, "flushed": 3, "dropped": 0, "failed": 0, "pending": 0},
+        )
+
+    def test_flush_writes_in_batches(self):
+        writer = self.make_writer(batch_size=2)
+        for i in range(5):
+            self.write(writer, f"/{i}")
+
+        with self.assertNumQueries(3):
+            self.assertEqual(writer.flush(), 5)
+
+    def test_rows_keep_the_time_they_were_queued(self):
+        writer = self.make_writer()
+        self.write(writer, "/")
+        queued_at = writer._queue.queue[0]["timestamp"]
+
+        writer.flush()
+        self.assertEqual(RequestLog.objects.get().timestamp, queued_at)
+
+    def test_drop_newest_when_full(self):
+        writer = self.make_writer(
+            max_queue_size=2, overflow_policy=OVERFLOW_DROP_NEWEST
+        )
+        for i in range(4):
+            self.write(writer, f"/{i}")
+        writer.flush()
+
+        self.assertEqual(
+            sorted(RequestLog.objects.values_list("path", flat=True)), ["/0", "/1"]
+        )
+        self.assertEqual(writer.stats()["dropped"], 2)
+
+    def test_drop_oldest_when_full(self):
+        writer = self.make_writer(
+            max_queue_size=2, overflow_policy=OVERFLOW_DROP_OLDEST
+        )
+        for i in range(4):
+            self.write(writer, f"/{i}")
+        writer.flush()
+
+        self.assertEqual(
+            sorted(RequestLog.objects.values_list("path", flat=True)), ["/2", "/3"]
+        )
+        self.assertEqual(writer.stats()["dropped"], 2)
+
+    def test_failed_batches_are_counted_not_raised(self):
+        writer = self.make_writer()
+        self.write(writer, "/")
+
+        with mock.patch.object(
+            RequestLog.objects, "bulk_create", side_effect=DatabaseError("down")
+        ), self.assertLogs("ip_tracking.log_writer", "ERROR"):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.stats()["failed"], 1)
+        self.assertEqual(writer.stats()["pending"], 0)
+
+    def test_a_bad_row_does_not_lose_the_rest_of_its_batch(self):
+        writer = self.make_writer()
+        for ip_address in ("203.0.113.7", "unknown", "203.0.113.8"):
+            writer.write(ip_address=ip_address, path="/", method="GET")
+        bulk_create = RequestLog.objects.bulk_create
+
+        def reject_malformed_ips(rows, *args, **kwargs):
+            # PostgreSQL's inet column rejects the whole statement
+            if any(row.ip_address == "unknown" for row in rows):
+                raise DatabaseError("invalid input syntax for type inet")
+            return bulk_create(rows, *args, **kwargs)
+
+        with mock.patch.object(
+            RequestLog.objects, "bulk_create", side_effect=reject_malformed_ips
+        ), self.assertLogs("ip_tracking.log_writer", "ERROR"):
+            self.assertEqual(writer.flush(), 2)
+        self.assertEqual(
+            set(RequestLog.objects.values_list("ip_address", flat=True)),
+            {"203.0.113.7", "203.0.113.8"},
+        )
+        self.assertEqual(writer.stats()["failed"], 1)
+
+    def test_shutdown_flushes_what_is_left(self):
+        writer = self.make_writer()
+        self.write(writer, "/")
+
+        writer.shutdown()
+        self.assertEqual(RequestLog.objects.count(), 1)
+
+    def test_unknown_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            BufferedLogWriter(overflow_policy="spill")
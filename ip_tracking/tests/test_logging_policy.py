@@ -0,0 +1,75 @@
+# ip_tracking/tests/test_logging_policy.py
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ip_tracking.logging_policy import RequestLogPolicy
+from ip_tracking.models import RequestLog
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+
+class RequestLogPolicyTests(SimpleTestCase):
+    def test_skipped_prefixes_are_not_logged(self):
+        policy = RequestLogPolicy(skip_prefixes=["/static/"])
+
+        self.assertIsNone(policy.sample_weight("/static/app.css"))
+        self.assertEqual(policy.sample_weight("/login/"), 1.0)
+
+    def test_sampled_rows_carry_the_inverse_rate(self):
+        policy = RequestLogPolicy(sample_rates={"/api/poll/": 0.25})
+
+        with mock.patch("ip_tracking.logging_policy.random.random", return_value=0.1):
+            self.assertEqual(policy.sample_weight("/api/poll/42"), 4.0)
+        with mock.patch("ip_tracking.logging_policy.random.random", return_value=0.3):
+            self.assertIsNone(policy.sample_weight("/api/poll/42"))
+
+    def test_longest_sample_prefix_wins(self):
+        policy = RequestLogPolicy(sample_rates={"/api/": 0.5, "/api/poll/": 1})
+
+        self.assertEqual(policy.sample_weight("/api/poll/42"), 1.0)
+
+    def test_always_log_rules_win_over_skips_and_sampling(self):
+        policy = RequestLogPolicy(
+            skip_prefixes=["/"],
+            sample_rates={"/admin/": 0.01},
+            always_log_prefixes=["/admin/login/"],
+        )
+
+        with mock.patch("ip_tracking.logging_policy.random.random", return_value=0.5):
+            self.assertEqual(policy.sample_weight("/admin/login/"), 1.0)
+            self.assertEqual(policy.sample_weight("/", flagged=True), 1.0)
+        self.assertIsNone(policy.sample_weight("/"))
+
+    def test_flagged_ips_can_be_sampled_like_anyone_else(self):
+        policy = RequestLogPolicy(skip_prefixes=["/"], always_log_flagged_ips=False)
+
+        self.assertIsNone(policy.sample_weight("/", flagged=True))
+
+    def test_rates_outside_the_unit_interval_are_rejected(self):
+        for rate in (0, 1.5):
+            with self.assertRaises(ValueError):
+                RequestLogPolicy(sample_rates={"/api/": rate})
+
+    @override_settings(
+        REQUEST_LOG_POLICY={"SKIP_PREFIXES": ["/health/"]},
+        SENSITIVE_PATHS=["/login/"],
+    )
+    def test_always_log_prefixes_default_to_sensitive_paths(self):
+        policy = RequestLogPolicy.from_settings()
+
+        self.assertEqual(policy.skip_prefixes, ("/health/",))
+        self.assertEqual(policy.always_log_prefixes, ("/login/",))
+        self.assertFalse(policy.log_blocked)
+
+
+class RequestLogPolicyMiddlewareTests(IPTrackingTestCase):
+    @override_settings(REQUEST_LOG_POLICY={"SAMPLE_RATES": {"/reports/": 0.5}})
+    def test_sampled_requests_are_stored_with_their_weight(self):
+        with mock.patch("ip_tracking.logging_policy.random.random", return_value=0.1):
+            self.client.get("/reports/", REMOTE_ADDR="203.0.113.7")
+        with mock.patch("ip_tracking.logging_policy.random.random", return_value=0.9):
+            self.client.get("/reports/", REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(
+            list(RequestLog.objects.values_list("sample_weight", flat=True)), [2.0]
+        )
@@ -0,0 +1,67 @@
+# ip_tracking/tests/test_metrics.py
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from ip_tracking.log_writer import BufferedLogWriter
+from ip_tracking.metrics import MetricsPublisher, StageHistograms
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+RECORDS = "ip_tracking_request_log_records_total"
+
+
+class MetricsPublisherTests(IPTrackingTestCase):
+    def test_counters_are_published_as_increments(self):
+        first_counters = {f"{RECORDS}:queued": 5, f"{RECORDS}:dropped": 1}
+        second_counters = {f"{RECORDS}:queued": 10, f"{RECORDS}:dropped": 1}
+        first = MetricsPublisher(StageHistograms(), counters=lambda: first_counters)
+        second = MetricsPublisher(StageHistograms(), counters=lambda: second_counters)
+        first.publish()
+        second.publish()
+        first_counters[f"{RECORDS}:queued"] = 7
+        first.publish()
+
+        totals = second.collect()["counters"]
+        self.assertEqual(totals[f"{RECORDS}:queued"], 17)
+        self.assertEqual(totals[f"{RECORDS}:dropped"], 2)
+        self.assertEqual(totals[f"{RECORDS}:flushed"], 0)
+
+    def test_counters_summed_over_process_files(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        counters = {f"{RECORDS}:flushed": 4}
+        publisher = MetricsPublisher(
+            StageHistograms(), directory=directory, counters=lambda: counters
+        )
+        (directory / "metrics_1.json").write_text(
+            '{"counters": {"%s:flushed": 6}}' % RECORDS
+        )
+
+        self.assertEqual(publisher.collect()["counters"][f"{RECORDS}:flushed"], 10)
+
+
+class MetricsViewTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        writer = BufferedLogWriter()
+        self.enterContext(mock.patch.object(writer, "_ensure_started"))
+        self.enterContext(mock.patch("ip_tracking.log_writer._writer", writer))
+        self.enterContext(mock.patch("ip_tracking.metrics._publisher", None))
+        self.writer = writer
+
+    def test_exposes_writer_and_geolocation_counters(self):
+        for _ in range(3):
+            self.writer.write(ip_address="203.0.113.7", path="/", method="GET")
+        self.writer.flush()
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("# TYPE ip_tracking_stage_duration_seconds histogram", body)
+        self.assertIn(f"# TYPE {RECORDS} counter", body)
+        self.assertIn(f'{RECORDS}{{outcome="queued"}} 3', body)
+        self.assertIn(f'{RECORDS}{{outcome="flushed"}} 3', body)
+        # The geolocation cache is process-wide, so only its presence is checked
+        self.assertIn(
+            'ip_tracking_geolocation_cache_events_total{event="misses"}', body
+        )
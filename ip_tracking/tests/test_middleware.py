@@ -0,0 +1,78 @@
+# ip_tracking/tests/test_middleware.py
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from ip_tracking.blocklist import blocklist
+from ip_tracking.middleware import IPLoggingMiddleware
+from ip_tracking.models import BlockedIP, RequestLog
+from ip_tracking.tests.utils import FakeGeolocationProvider, IPTrackingTestCase
+
+
+class IPLoggingMiddlewareTests(IPTrackingTestCase):
+    def test_requests_are_logged_with_geolocation(self):
+        FakeGeolocationProvider.answers = {"203.0.113.7": {"country": "NL"}}
+
+        self.client.get("/admin/", REMOTE_ADDR="203.0.113.7")
+
+        log = RequestLog.objects.get()
+        self.assertEqual((log.ip_address, log.path), ("203.0.113.7", "/admin/"))
+        self.assertEqual(log.country, "NL")
+
+    def test_blocked_requests_are_logged_without_waiting_on_geolocation(self):
+        BlockedIP.objects.create(ip_address="203.0.113.7", reason="test")
+
+        response = self.client.get("/admin/", REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(FakeGeolocationProvider.calls, [])
+        # Left NULL for enrich_request_log_geolocation
+        self.assertIsNone(RequestLog.objects.get().country)
+
+
+class AsyncIPLoggingMiddlewareTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.views = 0
+        self.middleware = IPLoggingMiddleware(self.view)
+
+    async def view(self, request):
+        self.views += 1
+        return HttpResponse("ok")
+
+    def request(self, ip_address, path="/"):
+        request = RequestFactory().get(path, REMOTE_ADDR=ip_address)
+        request.user = AnonymousUser()
+        return request
+
+    def test_runs_as_a_coroutine_under_an_async_stack(self):
+        self.assertTrue(iscoroutinefunction(self.middleware))
+
+    async def test_requests_are_logged_with_geolocation(self):
+        FakeGeolocationProvider.answers = {"203.0.113.7": {"country": "NL"}}
+
+        response = await self.middleware(self.request("203.0.113.7", "/admin/"))
+
+        self.assertEqual(response.status_code, 200)
+        log = await RequestLog.objects.aget()
+        self.assertEqual((log.path, log.country), ("/admin/", "NL"))
+
+    async def test_blocked_requests_never_reach_the_view(self):
+        await BlockedIP.objects.acreate(ip_address="203.0.113.7", reason="test")
+
+        response = await self.middleware(self.request("203.0.113.7"))
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.views, 0)
+
+    async def test_fresh_blocklist_is_checked_on_the_event_loop(self):
+        await sync_to_async(blocklist.is_blocked)("10.0.0.1")
+
+        with self.settings(BLOCKLIST_VERSION_CHECK_INTERVAL=3600):
+            with mock.patch("ip_tracking.blocklist.sync_to_async") as to_thread:
+                self.assertFalse(await blocklist.ais_blocked("10.0.0.1"))
+
+        to_thread.assert_not_called()
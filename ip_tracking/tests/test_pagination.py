@@ -0,0 +1,99 @@
+# ip_tracking/tests/test_pagination.py
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from ip_tracking.admin import RequestLogAdmin
+from ip_tracking.models import RequestLog
+from ip_tracking.pagination import EstimatedCountPaginator, parse_cursor
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+CHANGELIST = "/admin/ip_tracking/requestlog/"
+
+
+class ParseCursorTests(SimpleTestCase):
+    def test_cursor_is_a_timestamp_and_id(self):
+        timestamp, pk = parse_cursor("2026-10-18T03:39:00+00:00_42")
+
+        self.assertEqual((timestamp.hour, timestamp.minute, pk), (3, 39, 42))
+
+    def test_malformed_cursors_are_ignored(self):
+        for value in (None, "", "42", "yesterday_42", "2026-10-18T03:39:00_x"):
+            self.assertIsNone(parse_cursor(value))
+
+
+class EstimatedCountPaginatorTests(IPTrackingTestCase):
+    def test_small_results_are_counted_exactly(self):
+        add_request_logs("203.0.113.7", 3)
+        paginator = EstimatedCountPaginator(RequestLog.objects.all(), 2, count_cap=5)
+
+        self.assertEqual(paginator.count, 3)
+
+    def test_counting_stops_at_the_cap(self):
+        add_request_logs("203.0.113.7", 8)
+        paginator = EstimatedCountPaginator(RequestLog.objects.all(), 2, count_cap=5)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 5)
+
+
+class KeysetChangeListTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = get_user_model().objects.create_superuser("admin", "", "secret")
+        self.client.force_login(admin)
+        self.enterContext(mock.patch.object(RequestLogAdmin, "list_per_page", 2))
+        # Rows sharing a timestamp are ordered by id
+        now = timezone.now()
+        for minutes, ip_address in ((5, "203.0.113.1"), (4, "203.0.113.2")):
+            add_request_logs(ip_address, 1, age=timedelta(minutes=minutes))
+        RequestLog.objects.bulk_create(
+            RequestLog(
+                ip_address="203.0.113.3",
+                path=f"/{i}/",
+                method="GET",
+                timestamp=now - timedelta(minutes=3),
+            )
+            for i in range(3)
+        )
+
+    def changelist(self, **params):
+        # Searching the test network keeps the admin's own logged requests out
+        response = self.client.get(
+            CHANGELIST, {"q": "203.0.113.0/24", **params}, REMOTE_ADDR="198.51.100.9"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    def test_pages_follow_the_cursor_without_gaps_or_repeats(self):
+        seen = []
+        cursor = None
+        for _ in range(5):
+            changelist = self.changelist(**({"cursor": cursor} if cursor else {}))
+            seen.extend(log.pk for log in changelist.result_list)
+            cursor = changelist.next_cursor
+            if cursor is None:
+                break
+
+        expected = RequestLog.objects.filter(
+            ip_address__startswith="203.0.113."
+        ).order_by("-timestamp", "-id")
+        self.assertEqual(seen, list(expected.values_list("pk", flat=True)))
+
+    def test_filter_links_drop_the_cursor(self):
+        first = self.changelist()
+        second = self.changelist(cursor=first.next_cursor)
+
+        self.assertNotIn("cursor", second.get_query_string({"method": "GET"}))
+        self.assertNotIn("cursor", second.newest_page_query)
+        self.assertIn("cursor=", second.next_page_query)
+
+    def test_search_matches_an_exact_ip(self):
+        changelist = self.changelist(q="203.0.113.3")
+
+        self.assertEqual(
+            {log.ip_address for log in changelist.result_list}, {"203.0.113.3"}
+        )
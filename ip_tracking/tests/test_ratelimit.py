@@ -0,0 +1,237 @@
+# ip_tracking/tests/test_ratelimit.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from ip_tracking.middleware import RateLimitMiddleware
+from ip_tracking.ratelimit import (
+    LocalRateLimiter,
+    check_rate_limiter,
+    parse_rate,
+    retry_after_header,
+)
+from ip_tracking.tests.utils import IPTrackingTestCase
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_rates(self):
+        self.assertEqual(parse_rate("5/m"), (5, 60))
+        self.assertEqual(parse_rate("100/10s"), (100, 10))
+        self.assertEqual(parse_rate("1000/d"), (1000, 86400))
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            parse_rate("5 per minute")
+
+    def test_retry_after_is_whole_seconds_and_at_least_one(self):
+        self.assertEqual(retry_after_header(0.2), "1")
+        self.assertEqual(retry_after_header(29.1), "30")
+
+
+class LocalRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch(
+            "ip_tracking.ratelimit.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_the_limit_then_deny(self):
+        limiter = LocalRateLimiter()
+
+        self.assertEqual(limiter.hit("key", 2, 60), 0)
+        self.assertEqual(limiter.hit("key", 2, 60), 0)
+        self.assertAlmostEqual(limiter.hit("key", 2, 60), 30)
+
+    def test_denied_requests_do_not_consume_capacity(self):
+        limiter = LocalRateLimiter()
+        limiter.hit("key", 2, 60)
+        limiter.hit("key", 2, 60)
+        for _ in range(5):
+            limiter.hit("key", 2, 60)
+
+        self.now += 30
+        self.assertEqual(limiter.hit("key", 2, 60), 0)
+        self.assertAlmostEqual(limiter.hit("key", 2, 60), 30)
+
+    def test_capacity_is_regained_at_the_emission_interval(self):
+        limiter = LocalRateLimiter()
+        for _ in range(4):
+            limiter.hit("key", 4, 60)
+
+        self.now += 15
+        self.assertEqual(limiter.hit("key", 4, 60), 0)
+        self.assertAlmostEqual(limiter.hit("key", 4, 60), 15)
+
+    def test_keys_are_independent(self):
+        limiter = LocalRateLimiter()
+        limiter.hit("a", 1, 60)
+
+        self.assertEqual(limiter.hit("b", 1, 60), 0)
+        self.assertGreater(limiter.hit("a", 1, 60), 0)
+
+    def test_least_recently_limited_key_is_evicted(self):
+        limiter = LocalRateLimiter(max_keys=2)
+        limiter.hit("a", 1, 60)
+        limiter.hit("b", 1, 60)
+        limiter.hit("a", 1, 60)
+        limiter.hit("c", 1, 60)
+
+        self.assertEqual(limiter.hit("b", 1, 60), 0)
+        self.assertGreater(limiter.hit("c", 1, 60), 0)
+
+
+class RateLimiterCheckTests(SimpleTestCase):
+    def test_warns_when_limits_are_per_process(self):
+        caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        with self.settings(CACHES=caches, RATELIMIT_USE_CACHE="default"):
+            warnings = check_rate_limiter(None)
+
+        self.assertEqual([warning.id for warning in warnings], ["ip_tracking.W001"])
+
+    def test_silent_with_redis(self):
+        caches = {"default": {"BACKEND": "django_redis.cache.RedisCache"}}
+        with self.settings(CACHES=caches, RATELIMIT_USE_CACHE="default"):
+            self.assertEqual(check_rate_limiter(None), [])
+
+
+class RateLimitMiddlewareTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        # The process-wide limiter keeps state between tests
+        patcher = mock.patch(
+            "ip_tracking.middleware.get_rate_limiter", return_value=LocalRateLimiter()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_over_limit_requests_get_429_with_retry_after(self):
+        rules = [{"PREFIX": "/limited/", "GROUP": "test", "RATE": "2/m"}]
+        with self.settings(RATELIMIT_RULES=rules):
+            statuses = [
+                self.client.get("/limited/", REMOTE_ADDR="203.0.113.7").status_code
+                for _ in range(2)
+            ]
+            response = self.client.get("/limited/", REMOTE_ADDR="203.0.113.7")
+
+        self.assertNotIn(429, statuses)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_anonymous_clients_are_limited_per_ip(self):
+        rules = [{"PREFIX": "/limited/", "GROUP": "test", "RATE": "1/m"}]
+        with self.settings(RATELIMIT_RULES=rules):
+            self.client.get("/limited/", REMOTE_ADDR="203.0.113.7")
+            other = self.client.get("/limited/", REMOTE_ADDR="203.0.113.8")
+            same = self.client.get("/limited/", REMOTE_ADDR="203.0.113.7")
+
+        self.assertNotEqual(other.status_code, 429)
+        self.assertEqual(same.status_code, 429)
+
+    def test_spoofed_forwarded_for_headers_share_one_bucket(self):
+        rules = [{"PREFIX": "/limited/", "GROUP": "test", "RATE": "2/m"}]
+        with self.settings(RATELIMIT_RULES=rules):
+            statuses = [
+                self.client.get(
+                    "/limited/",
+                    REMOTE_ADDR="203.0.113.7",
+                    HTTP_X_FORWARDED_FOR=f"198.51.100.{i}",
+                ).status_code
+                for i in range(4)
+            ]
+
+        self.assertEqual(statuses.count(429), 2)
+
+    def test_trusted_proxies_key_on_the_address_they_saw(self):
+        rules = [{"PREFIX": "/limited/", "GROUP": "test", "RATE": "1/m"}]
+        with self.settings(RATELIMIT_RULES=rules, RATELIMIT_TRUSTED_PROXIES=1):
+            first = self.client.get(
+                "/limited/",
+                REMOTE_ADDR="10.0.0.2",
+                HTTP_X_FORWARDED_FOR="198.51.100.1, 203.0.113.7",
+            )
+            spoofed = self.client.get(
+                "/limited/",
+                REMOTE_ADDR="10.0.0.2",
+                HTTP_X_FORWARDED_FOR="198.51.100.2, 203.0.113.7",
+            )
+            other = self.client.get(
+                "/limited/",
+                REMOTE_ADDR="10.0.0.2",
+                HTTP_X_FORWARDED_FOR="203.0.113.8",
+            )
+
+        self.assertNotEqual(first.status_code, 429)
+        self.assertEqual(spoofed.status_code, 429)
+        self.assertNotEqual(other.status_code, 429)
+
+    def test_authenticated_users_are_limited_per_account(self):
+        user = get_user_model().objects.create_user("alice", password="secret")
+        self.client.force_login(user)
+        rules = [{"PREFIX": "/limited/", "GROUP": "test", "RATE": "1/m"}]
+        with self.settings(RATELIMIT_RULES=rules):
+            self.client.get("/limited/", REMOTE_ADDR="203.0.113.7")
+            response = self.client.get("/limited/", REMOTE_ADDR="203.0.113.8")
+
+        self.assertEqual(response.status_code, 429)
+
+    def test_rules_match_by_method_and_path(self):
+        rules = [
+            {"PREFIX": "/limited/", "GROUP": "test", "RATE": "1/m", "METHODS": ["POST"]}
+        ]
+        with self.settings(RATELIMIT_RULES=rules):
+            gets = [self.client.get("/limited/").status_code for _ in range(3)]
+            others = [self.client.post("/elsewhere/").status_code for _ in range(3)]
+
+        self.assertNotIn(429, gets + others)
+
+    def test_group_handler_picks_the_rate(self):
+        rules = [{"PREFIX": "/limited/", "GROUP": "login"}]
+        with self.settings(RATELIMIT_RULES=rules):
+            statuses = [self.client.get("/limited/").status_code for _ in range(6)]
+
+        # login_handler allows anonymous clients 5 requests a minute
+        self.assertEqual(statuses.count(429), 1)
+        self.assertEqual(statuses[-1], 429)
+
+
+class AsyncRateLimitMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch(
+            "ip_tracking.middleware.get_rate_limiter", return_value=LocalRateLimiter()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.settings(
+            RATELIMIT_RULES=[{"PREFIX": "/limited/", "GROUP": "test", "RATE": "1/m"}]
+        ):
+            self.middleware = RateLimitMiddleware(self.view)
+
+    async def view(self, request):
+        return HttpResponse("ok")
+
+    def request(self, path):
+        request = RequestFactory().get(path, REMOTE_ADDR="203.0.113.7")
+        request.user = AnonymousUser()
+        return request
+
+    async def test_unlimited_paths_stay_on_the_event_loop(self):
+        with mock.patch("ip_tracking.middleware.sync_to_async") as to_thread:
+            response = await self.middleware(self.request("/elsewhere/"))
+
+        to_thread.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+
+    async def test_limited_paths_are_checked(self):
+        first = await self.middleware(self.request("/limited/"))
+        second = await self.middleware(self.request("/limited/"))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(second["Retry-After"], "60")
@@ -0,0 +1,90 @@
+# ip_tracking/tests/test_retention.py
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from ip_tracking.models import ProcessingCursor, RequestLog
+from ip_tracking.retention import archive_request_logs
+from ip_tracking.rollups import ROLLUP_CURSOR
+from ip_tracking.tests.utils import IPTrackingTestCase, add_request_logs
+
+
+class ArchiveRequestLogsTests(IPTrackingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+
+    def fold_all(self):
+        last_id = RequestLog.objects.order_by("-id").values_list("id", flat=True)[0]
+        ProcessingCursor.set_position(ROLLUP_CURSOR, last_id)
+
+    def archived_rows(self):
+        rows = []
+        for path in sorted(self.archive_dir.glob("*/*.ndjson.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                rows.extend(json.loads(line) for line in f)
+        return rows
+
+    def test_old_rows_are_archived_then_deleted(self):
+        old = add_request_logs("2001:db8::1", 3, age=timedelta(days=40))
+        add_request_logs("203.0.113.7", 2, age=timedelta(days=1))
+        self.fold_all()
+
+        stats = archive_request_logs(archive_dir=self.archive_dir, batch_size=2)
+
+        self.assertEqual(stats["archived"], 3)
+        self.assertEqual(stats["deleted"], 3)
+        self.assertEqual(stats["batches"], 2)
+        self.assertEqual(RequestLog.objects.count(), 2)
+        rows = self.archived_rows()
+        self.assertEqual([row["id"] for row in rows], [log.id for log in old])
+        self.assertEqual(rows[0]["ip_address"], "2001:db8::1")
+        self.assertNotIn("ip_packed", rows[0])
+        self.assertEqual(list(self.archive_dir.glob("*/*.tmp")), [])
+
+    def test_rows_not_yet_folded_are_kept(self):
+        add_request_logs("203.0.113.7", 2, age=timedelta(days=40))
+        self.fold_all()
+        add_request_logs("203.0.113.8", 1, age=timedelta(days=40))
+
+        archive_request_logs(archive_dir=self.archive_dir)
+        self.assertEqual(
+            list(RequestLog.objects.values_list("ip_address", flat=True)),
+            ["203.0.113.8"],
+        )
+
+    def test_files_are_partitioned_by_day(self):
+        add_request_logs("203.0.113.7", 1, age=timedelta(days=40))
+        add_request_logs("203.0.113.7", 1, age=timedelta(days=41))
+        self.fold_all()
+
+        stats = archive_request_logs(archive_dir=self.archive_dir)
+        self.assertEqual(stats["files"], 2)
+        self.assertEqual(len(list(self.archive_dir.iterdir())), 2)
+
+    def test_delete_without_archiving(self):
+        add_request_logs("203.0.113.7", 2, age=timedelta(days=40))
+        self.fold_all()
+
+        stats = archive_request_logs(archive_dir=self.archive_dir, archive=False)
+        self.assertEqual(stats["deleted"], 2)
+        self.assertFalse(RequestLog.objects.exists())
+        self.assertEqual(list(self.archive_dir.iterdir()), [])
+
+    def test_purge_command(self):
+        add_request_logs("203.0.113.7", 2, age=timedelta(days=10))
+        self.fold_all()
+        out = StringIO()
+
+        call_command(
+            "purge_request_logs", days=7, archive_dir=str(self.archive_dir), stdout=out
+        )
+        self.assertIn("Archived 2 rows to 1 files", out.getvalue())
+        self.assertEqual(len(self.archived_rows()), 2)
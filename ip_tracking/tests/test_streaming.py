@@ -0,0 +1,79 @@
+# ip_tracking/tests/test_streaming.py
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ip_tracking.models import SuspiciousIP
+from ip_tracking.streaming import StreamingDetector
+
+Reason = SuspiciousIP.SuspicionReason
+NOW = 1_700_000_040  # on a bucket boundary
+
+
+class StreamingDetectorTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("ip_tracking.detection.upsert_suspicious_ips")
+        self.upsert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_detector(self, **kwargs):
+        kwargs.setdefault("flush_interval", 0.05)
+        detector = StreamingDetector(threshold=3, sensitive_paths=["/admin/"], **kwargs)
+        self.addCleanup(detector._executor.shutdown)
+        return detector
+
+    def wait_for_flushes(self, detector):
+        detector._executor.submit(lambda: None).result()
+
+    def test_crossing_the_threshold_reports_once(self):
+        detector = self.make_detector()
+        findings = [detector.observe("203.0.113.7", "/", now=NOW) for _ in range(6)]
+
+        self.assertEqual(findings[:3], [None, None, None])
+        self.assertEqual(findings[3]["reasons"], [Reason.HIGH_REQUEST_VOLUME])
+        self.assertEqual(findings[4:], [None, None])
+
+    def test_counts_slide_out_of_the_window(self):
+        detector = self.make_detector(window_seconds=120, bucket_seconds=60)
+        for _ in range(3):
+            detector.observe("203.0.113.7", "/", now=NOW)
+
+        self.assertIsNone(detector.observe("203.0.113.7", "/", now=NOW + 120))
+        self.assertIsNone(detector.observe("203.0.113.7", "/", now=NOW + 121))
+
+    def test_each_new_sensitive_path_is_reported(self):
+        detector = self.make_detector()
+
+        finding = detector.observe("203.0.113.7", "/admin/", now=NOW)
+        self.assertEqual(finding["reasons"], [Reason.SENSITIVE_PATH])
+        self.assertIsNone(detector.observe("203.0.113.7", "/admin/", now=NOW))
+
+    def test_findings_are_written_in_one_batch(self):
+        detector = self.make_detector()
+        for i in range(50):
+            detector.observe(f"203.0.113.{i}", "/admin/", now=NOW)
+        self.wait_for_flushes(detector)
+
+        self.upsert.assert_called_once()
+        (findings,), _ = self.upsert.call_args
+        self.assertEqual(len(findings), 50)
+
+    def test_writes_are_spaced_by_the_flush_interval(self):
+        detector = self.make_detector(flush_interval=0.2)
+        detector.observe("203.0.113.1", "/admin/", now=NOW)
+        self.wait_for_flushes(detector)
+        detector.observe("203.0.113.2", "/admin/", now=NOW)
+        detector.observe("203.0.113.3", "/admin/", now=NOW)
+        self.wait_for_flushes(detector)
+
+        self.assertEqual(
+            [len(call.args[0]) for call in self.upsert.call_args_list], [1, 2]
+        )
+
+    def test_least_recently_seen_ips_are_evicted(self):
+        detector = self.make_detector(max_tracked_ips=2)
+        for ip_address in ("203.0.113.1", "203.0.113.2", "203.0.113.3"):
+            detector.observe(ip_address, "/", now=NOW)
+
+        self.assertEqual(detector.tracked_ips(), 2)
+        self.assertEqual(detector.evictions, 1)
@@ -0,0 +1,83 @@
+# ip_tracking/tests/test_tasks.py
+import requests
+
+from ip_tracking.models import RequestLog
+from ip_tracking.tasks import enrich_request_log_geolocation
+from ip_tracking.tests.utils import (
+    FakeGeolocationProvider,
+    IPTrackingTestCase,
+    add_request_logs,
+)
+
+PARIS = {"country": "France", "city": "Paris", "latitude": 48.85, "longitude": 2.35}
+
+
+class EnrichRequestLogGeolocationTests(IPTrackingTestCase):
+    def locations(self):
+        return dict(RequestLog.objects.values_list("ip_address", "country"))
+
+    def test_rows_are_filled_in_per_distinct_ip(self):
+        FakeGeolocationProvider.answers = {"203.0.113.7": PARIS}
+        add_request_logs("203.0.113.7", 3)
+        add_request_logs("203.0.113.8", 1)
+        add_request_logs("10.0.0.1", 1)
+
+        self.assertEqual(enrich_request_log_geolocation(), 5)
+        self.assertEqual(
+            self.locations(),
+            {"203.0.113.7": "France", "203.0.113.8": "", "10.0.0.1": ""},
+        )
+        log = RequestLog.objects.filter(ip_address="203.0.113.7").first()
+        self.assertEqual((log.city, log.latitude), ("Paris", 48.85))
+        # Private addresses are never sent to the provider
+        self.assertEqual(
+            FakeGeolocationProvider.calls, [["203.0.113.7", "203.0.113.8"]]
+        )
+
+    def test_enriched_rows_are_not_looked_up_again(self):
+        FakeGeolocationProvider.answers = {"203.0.113.7": PARIS}
+        add_request_logs("203.0.113.7", 1)
+        enrich_request_log_geolocation()
+        FakeGeolocationProvider.calls = []
+
+        self.assertEqual(enrich_request_log_geolocation(), 0)
+        self.assertEqual(FakeGeolocationProvider.calls, [])
+
+    def test_rows_logged_with_geolocation_are_left_alone(self):
+        add_request_logs("203.0.113.7", 1, country="Spain")
+
+        self.assertEqual(enrich_request_log_geolocation(), 0)
+        self.assertEqual(self.locations(), {"203.0.113.7": "Spain"})
+
+    def test_batch_size_limits_distinct_ips(self):
+        add_request_logs("203.0.113.7", 2)
+        add_request_logs("203.0.113.8", 2)
+
+        self.assertEqual(enrich_request_log_geolocation(batch_size=1), 2)
+        self.assertEqual(RequestLog.objects.filter(country__isnull=True).count(), 2)
+
+    def test_provider_outage_leaves_rows_for_the_next_run(self):
+        FakeGeolocationProvider.error = requests.ConnectionError("down")
+        add_request_logs("203.0.113.7", 2)
+        add_request_logs("10.0.0.1", 1)
+
+        with self.assertLogs("ip_tracking.tasks", "ERROR"):
+            self.assertEqual(enrich_request_log_geolocation(), 1)
+        self.assertEqual(self.locations(), {"203.0.113.7": None, "10.0.0.1": ""})
+
+        FakeGeolocationProvider.error = None
+        FakeGeolocationProvider.answers = {"203.0.113.7": PARIS}
+        self.assertEqual(enrich_request_log_geolocation(), 2)
+        self.assertEqual(self.locations(), {"203.0.113.7": "France", "10.0.0.1": ""})
+
+    def test_errors_cached_by_requests_are_looked_up_again(self):
+        # A request during the outage caches an empty negative result
+        FakeGeolocationProvider.error = requests.ConnectionError("down")
+        with self.assertLogs("ip_tracking.geocache", "ERROR"):
+            RequestLog.get_geolocation_data_many(["203.0.113.7"])
+        FakeGeolocationProvider.error = None
+        FakeGeolocationProvider.answers = {"203.0.113.7": PARIS}
+        add_request_logs("203.0.113.7", 1)
+
+        enrich_request_log_geolocation()
+        self.assertEqual(self.locations(), {"203.0.113.7": "France"})
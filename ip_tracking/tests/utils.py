@@ -0,0 +1,83 @@
+# ip_tracking/tests/utils.py
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ip_tracking.blocklist import blocklist, suspicious_ips
+from ip_tracking.cache import get_cache, get_state_cache
+from ip_tracking.geocache import get_geolocation_cache
+from ip_tracking.geolocation import GeolocationProvider, reset_geolocation_provider
+from ip_tracking.log_writer import SyncLogWriter
+from ip_tracking.models import RequestLog
+
+
+class FakeGeolocationProvider(GeolocationProvider):
+    """Answers from ``answers``; raises ``error`` instead when it is set"""
+
+    answers = {}
+    error = None
+    calls = []
+
+    def lookup_many(self, ip_addresses):
+        self.calls.append(list(ip_addresses))
+        if self.error is not None:
+            raise self.error
+        return {ip: self.answers[ip] for ip in ip_addresses if ip in self.answers}
+
+
+@override_settings(
+    CACHES={
+        alias: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": alias,
+        }
+        for alias in ("default", "ip_tracking_state")
+    },
+    BLOCKLIST_VERSION_CHECK_INTERVAL=0,
+    METRICS_ENABLED=False,
+    GEOLOCATION_PROVIDER={"BACKEND": "ip_tracking.tests.utils.FakeGeolocationProvider"},
+)
+class IPTrackingTestCase(TestCase):
+    """
+    Runs against a private in-memory cache and a fake geolocation
+    provider, with request logs written synchronously so they are visible
+    to the test as soon as the response is returned.
+
+    Blocklist changes are only published on commit, so tests that change
+    blocks after a lookup wrap them in ``captureOnCommitCallbacks``.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        get_cache().local.clear()
+        get_state_cache().local.clear()
+        get_geolocation_cache().clear_local()
+        blocklist.clear_local()
+        suspicious_ips.clear_local()
+        FakeGeolocationProvider.answers = {}
+        FakeGeolocationProvider.error = None
+        FakeGeolocationProvider.calls = []
+        reset_geolocation_provider()
+        self.addCleanup(reset_geolocation_provider)
+        patcher = mock.patch("ip_tracking.log_writer._writer", SyncLogWriter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def add_request_logs(ip_address, count, path="/", age=timedelta(minutes=2), **fields):
+    """Insert ``count`` RequestLog rows for ``ip_address`` ``age`` ago"""
+    timestamp = timezone.now() - age
+    return RequestLog.objects.bulk_create(
+        RequestLog(
+            ip_address=ip_address,
+            path=path,
+            method="GET",
+            timestamp=timestamp,
+            **fields,
+        )
+        for _ in range(count)
+    )
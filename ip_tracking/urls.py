@@ -1,9 +1,26 @@
 # ip_tracking/urls.py
 from django.urls import path
 
-from ip_tracking.views import TestGeoLocationView, RateLimitedLoginView
+from ip_tracking.views import (
+    CountriesView,
+    RateLimitedLoginView,
+    RequestRateView,
+    TestGeoLocationView,
+    TopIPsView,
+    TopPathsView,
+    export_logs,
+)
 
 urlpatterns = [
     path("test-geo/", TestGeoLocationView.as_view(), name="test_geo"),
     path('login/', RateLimitedLoginView.as_view(), name='login'),
+    path("export/", export_logs, name="export_logs"),
+    path("analytics/top-ips/", TopIPsView.as_view(), name="analytics_top_ips"),
+    path("analytics/top-paths/", TopPathsView.as_view(), name="analytics_top_paths"),
+    path("analytics/countries/", CountriesView.as_view(), name="analytics_countries"),
+    path(
+        "analytics/request-rate/",
+        RequestRateView.as_view(),
+        name="analytics_request_rate",
+    ),
 ]
@@ -1,12 +1,41 @@
 # ip_tracking/views.py
 import json
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.views import LoginView
-from django.http import JsonResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
-from django_ratelimit.decorators import ratelimit
+from django.views.decorators.http import require_GET
+
+from ip_tracking.analytics import (
+    MAX_LIMIT,
+    SERIES_STEPS,
+    WINDOWS,
+    cached_payload,
+    request_rate,
+    top_ips,
+    top_values,
+    window_bounds,
+)
+from ip_tracking.export import (
+    CONTENT_TYPES,
+    DATASETS,
+    FORMATS,
+    parse_export_time,
+    stream_export,
+)
+from ip_tracking.metrics import get_metrics_publisher, render_prometheus
+from ip_tracking.models import TrafficRollup
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -16,21 +45,8 @@ class TestGeoLocationView(View):
     GET: Returns the request's geolocation data
     POST: Allows testing with custom X-Forwarded-For header
     """
-    
-    @method_decorator(ratelimit(key='ip', rate='5/m', group='geo_test'))
-    @method_decorator(ratelimit(key='user', rate='10/m', group='geo_test'))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
 
     def get(self, request):
-        was_limited = getattr(request, 'limited', False)
-        if was_limited:
-            return JsonResponse(
-                {'error': 'Rate limit exceeded. Please try again later.'},
-                status=429
-            )
-            
-
         ip = self.get_client_ip(request)
         return JsonResponse(
             {
@@ -61,16 +77,154 @@ class TestGeoLocationView(View):
 
 
 class RateLimitedLoginView(LoginView):
-    """Login view with rate limiting"""
-
-    @method_decorator(ratelimit(key="ip", rate="5/m", method="POST", group="login"))
-    @method_decorator(ratelimit(key="user", rate="10/m", method="POST", group="login"))
-    def post(self, request, *args, **kwargs):
-        # Handle rate limit exceeded
-        was_limited = getattr(request, "limited", False)
-        if was_limited:
+    """
+    Login view; POSTs are rate limited by RateLimitMiddleware under the
+    "login" group (see RATELIMIT_RULES).
+    """
+
+
+@require_GET
+@staff_member_required
+def export_logs(request):
+    """
+    Staff-only streaming export, the HTTP counterpart of ``export_logs``.
+    Query parameters: dataset, format, since, until, gzip (default 1).
+    """
+    dataset = request.GET.get("dataset", "requests")
+    export_format = request.GET.get("format", "ndjson")
+    if dataset not in DATASETS or export_format not in FORMATS:
+        return JsonResponse({"error": "Unknown dataset or format."}, status=400)
+
+    try:
+        since = request.GET.get("since")
+        until = request.GET.get("until")
+        since = parse_export_time(since) if since else None
+        until = parse_export_time(until) if until else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    compress = request.GET.get("gzip", "1") not in ("0", "false")
+    filename = f"{dataset}.{export_format}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        stream_export(
+            dataset,
+            format=export_format,
+            compress=compress,
+            since=since,
+            until=until,
+        ),
+        content_type=("application/gzip" if compress else CONTENT_TYPES[export_format]),
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus scrape target for the middleware stage histograms and the
+    log writer and geolocation cache counters, summed over all workers.
+    Open to ``METRICS_ALLOWED_IPS`` and staff users.
+    """
+    allowed_ips = getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+    if request.META.get("REMOTE_ADDR") not in allowed_ips and not (
+        request.user.is_authenticated and request.user.is_staff
+    ):
+        return HttpResponseForbidden("Access Denied")
+    return HttpResponse(
+        render_prometheus(get_metrics_publisher().collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class AnalyticsView(View):
+    """
+    Base for the read-only analytics endpoints. Results come from the
+    rollup tables, are cached for ANALYTICS_CACHE_TTL seconds and carry
+    an ETag, so unchanged polls get an empty 304.
+
+    Query parameters: window (15m, 1h, 6h, 24h, 7d) and limit.
+    """
+
+    name = None
+
+    def get(self, request):
+        window = request.GET.get("window", "1h")
+        if window not in WINDOWS:
             return JsonResponse(
-                {"error": "Too many login attempts. Please try again later."},
-                status=429,
+                {"error": f"window must be one of {', '.join(WINDOWS)}."}, status=400
             )
-        return super().post(request, *args, **kwargs)
+        try:
+            params = self.get_params(request, window)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        start, end = window_bounds(window)
+        key = ":".join([self.name, window, *map(str, params.values())])
+        body, etag = cached_payload(
+            key,
+            lambda: {
+                "window": window,
+                "from": start,
+                "to": end,
+                "results": self.get_results(start, end, **params),
+            },
+        )
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = (
+            f"private, max-age={getattr(settings, 'ANALYTICS_CACHE_TTL', 15)}"
+        )
+        return response
+
+    def get_params(self, request, window):
+        limit = int(request.GET.get("limit", 10))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}.")
+        return {"limit": limit}
+
+    def get_results(self, start, end, **params):
+        raise NotImplementedError
+
+
+class TopIPsView(AnalyticsView):
+    name = "top_ips"
+
+    def get_results(self, start, end, limit):
+        return top_ips(start, end, limit)
+
+
+class TopPathsView(AnalyticsView):
+    name = "top_paths"
+
+    def get_results(self, start, end, limit):
+        return top_values(TrafficRollup.Dimension.PATH, start, end, limit)
+
+
+class CountriesView(AnalyticsView):
+    name = "countries"
+
+    def get_results(self, start, end, limit):
+        return top_values(TrafficRollup.Dimension.COUNTRY, start, end, limit)
+
+
+class RequestRateView(AnalyticsView):
+    """Request counts per step; ``step`` is in minutes"""
+
+    name = "request_rate"
+
+    def get_params(self, request, window):
+        step = int(request.GET.get("step", SERIES_STEPS[window]))
+        if not 1 <= step <= 24 * 60:
+            raise ValueError("step must be between 1 and 1440 minutes.")
+        if WINDOWS[window].total_seconds() / 60 / step > 2000:
+            raise ValueError("step is too small for this window.")
+        return {"step": step}
+
+    def get_results(self, start, end, step):
+        return request_rate(start, end, step)